@@ -1,554 +1,56 @@
-import re, jaconv, sys, os, csv, builtins, pandas as pd, platform, subprocess, numpy as np
+import sys, os, time, multiprocessing
+STARTUP_MARKS = [('', time.perf_counter())] # --profile-startup 용: (단계 이름, 끝난 시각)
 
-from fugashi import Tagger
 from PyQt6.QtGui import *
 from PyQt6.QtWidgets import *
 from PyQt6.QtCore import *
+STARTUP_MARKS.append(('import PyQt6', time.perf_counter()))
 
-from openpyxl import *
-from openpyxl.styles import Font
-
-# 후리가나 붙이기 ------------------------------------------------------------------
-def process_japanese_text(text, exclude_text='', kana_mode='hiragana'):
-    CJK_Unified_Ideographs = r'[\u4E00-\u9FFF]+'
-
-    def split_into_blocks(word: str):
-        """
-        주어진 문자열(word)을 '연속된 한자' 블록(K)과
-        '연속된 그 외 문자(주로 히라가나 등)' 블록(H)으로 나누어 리스트로 반환.
-        
-        예: 
-            "問題視する" -> [("K", "問題"), ("K", "視"), ("H", "する")]
-            "ご飯" -> [("H", "ご"), ("K", "飯")]
-            "忘れ去る" -> [("K", "忘"), ("H", "れ"), ("K", "去"), ("H", "る")]
-        """
-        blocks = []
-        if not word:
-            return blocks
-        
-        # 현재 블록의 종류(K or H), 내용
-        current_type = None
-        current_buf = []
-        
-        def flush_buffer():
-            """누적된 버퍼를 blocks 리스트에 추가하고 비움"""
-            nonlocal current_type, current_buf, blocks
-            if current_buf:
-                blocks.append((current_type, ''.join(current_buf)))
-                current_buf = []
-        
-        for ch in word:
-            if re.compile(CJK_Unified_Ideographs).match(ch):
-                # 현재 문자가 한자
-                if current_type == 'K':  # 이전도 한자 블록
-                    current_buf.append(ch)
-                else:
-                    # 블록 타입이 바뀌므로 flush 후 새 블록 시작
-                    flush_buffer()
-                    current_type = 'K'
-                    current_buf.append(ch)
-            # 々에 대한 처리
-            elif re.compile('々').match(ch):
-                if current_type == 'K':
-                    current_buf.append(ch)
-                else:
-                    flush_buffer()
-                    current_type = 'K'
-                    current_buf.append(ch)
-            else:
-                # 현재 문자는 한자가 아님(히라가나, 가타카나, 알파벳, 기타 등)
-                if current_type == 'H':
-                    current_buf.append(ch)
-                else:
-                    flush_buffer()
-                    current_type = 'H'
-                    current_buf.append(ch)
-        
-        # 마지막 누적 블록 flush
-        flush_buffer()
-        return blocks
-
-
-    def align_word_with_furigana(word: str, reading: str) -> str:
-        """
-        word(실제 표기)와 reading(전체 후리가나)을 받아
-        다음 예시처럼 한자 블록마다 후리가나를 할당하여 변환:
-        
-        1) "ご飯" + "ごはん"            -> "ご 飯[はん]"
-        2) "忘れ去る" + "わすれさる"    -> "忘[わす]れ 去[さ]る"
-        3) "問題視する" + "もんだいしする" -> "問題[もんだい] 視[し]する"
-        
-        구현 아이디어(단순/예시용):
-        - word를 '연속된 한자(K) / 그 외(H)' 블록 리스트로 분할
-        - reading에서 각 블록에 대응하는 후리가나를 조금씩 소진하면서 할당
-            * 한자(K) 블록은 그 다음 블록(특히 H 블록)이 reading 상에 등장하기 직전까지를 통째로 할당
-            * H 블록은 가능하면 reading에서도 동일하게 소진(예: 'ご' ↔ 'ご')
-        - 블록 사이에서 K→H, H→K 등으로 전환될 때 적절히 공백 삽입
-        """
-        # 가타카나 모드일 경우 히라가나로 변환
-        if kana_mode == 'katakana':
-            reading = jaconv.kata2hira(reading)
-
-        # 결과 문자열을 쌓을 리스트
-        result = []
-        cnt = 0
-
-        # 단어에 ・ 또는 ∙ 이 있을경우 분리
-        for x in word.split('・'):
-            for y in x.split('∙'):
-                if cnt != 0:
-                    result.append('・ ')
-
-                # 1) 단어를 블록 리스트로 분할
-                blocks = split_into_blocks(y)
-                
-                # reading 소비 인덱스
-                r_idx = 0
-                
-                # 다음 블록의 문자열이 reading 내에 있는지 찾는 헬퍼 함수
-                def find_next_block_in_reading(next_block_str):
-                    """reading[r_idx:]에서 next_block_str이 등장하는 첫 위치를 찾는다.
-                    없으면 -1 반환"""
-                    if not next_block_str:
-                        return -1
-                    return reading.find(next_block_str, r_idx)
-                
-                prev_type = None
-                
-                for i, (btype, btext) in enumerate(blocks):
-                    if btype == 'H':
-                        # H(히라가나/기타) 블록
-                        # 가능하면 reading에서도 btext가 일치하면 소비
-                        length = len(btext)
-                        # reading[r_idx : r_idx+length]와 btext가 같으면 그대로 소비
-                        if reading[r_idx:r_idx+length] == btext:
-                            # 그대로 사용
-                            result.append(btext)
-                            r_idx += length
-                        else:
-                            # 일치하지 않으면 그냥 원문 출력 (후리가나 소비는 없음)
-                            result.append(btext)
-                        
-                        prev_type = 'H'
-                    
-                    else:
-                        # K(한자) 블록
-                        # 다음 블록이 있다면 그 블록의 텍스트가 reading 상 어느 위치에 나오는지를 확인
-                        if (i + 1) < len(blocks):
-                            next_btype, next_btext = blocks[i+1]
-                        else:
-                            next_btype, next_btext = None, ''
-                        
-                        # next_btext가 혹시 reading에서 r_idx 이후에 등장한다면
-                        # 그 위치를 찾아서 그 직전까지를 이 한자 블록의 후리가나로 할당
-                        pos_next = -1
-                        if next_btype == 'H' and next_btext:
-                            # 다음 블록이 H라면, reading 상에 exact match로 등장할 수 있으니 찾아봄
-                            pos_next = find_next_block_in_reading(next_btext)
-                        
-                        if pos_next >= 0:
-                            # next_btext가 r_idx 이후에 있다면, 그 직전까지를 한자 블록 후리가나로 할당
-                            allocated = reading[r_idx:pos_next]
-                            r_idx = pos_next
-                        else:
-                            # 없다면 남은 reading 전부 할당
-                            allocated = reading[r_idx:]
-                            r_idx = len(reading)
-                        
-                        # 앞 블록이 H였으면 한자 블록 앞에 공백 삽입 (질문 예시 규칙)
-                        if prev_type == 'H' and len(result) > 0 and result[-1] != ' ':
-                            result.append(' ')
-                        
-                        # "한자블록[후리가나]" 형태로 변환
-                        if allocated:
-                            if kana_mode == 'katakana':
-                                result.append(f"{btext}[{jaconv.hira2kata(allocated)}]")
-                            else:
-                                result.append(f"{btext}[{allocated}]")
-                        else:
-                            # 후리가나가 아예 없으면 그냥 한자 블록만 출력
-                            result.append(btext)
-                        
-                        prev_type = 'K'
-
-                cnt+=1
-                
-        return ''.join(result)
-
-    # 이 함수는 "문장 내 여러 '단어[후리가나]' 패턴"을 찾아 변환해 주는 예시
-    # 정규식: ([^\s\[\]]+) => 공백/대괄호 제외 1글자 이상
-    #        \[([ぁ-んァ-ン]+)\] => 대괄호 안 히라가나 또는 가타카나 1글자 이상
-    WORD_READING_PATTERN = re.compile(r'([^\s\[\]]+)\[([ぁ-んァ-ン]+)\]')
-
-    def convert_text(text: str) -> str:
-        """문장 전체에서 '단어[후리가나]' 형태를 찾아 변환"""
-        def repl_func(m: re.Match) -> str:
-            word = m.group(1)    # 대괄호 앞 실제 단어
-            reading = m.group(2) # 대괄호 안 히라가나
-
-            return align_word_with_furigana(word, reading)
-        
-        return WORD_READING_PATTERN.sub(repl_func, text)
-
-    def add_furigana_with_fugashi(_text, _exclude_text='', _kana_mode='hiragana'):
-        excluded_kanji_set = set(ch for ch in exclude_text if re.search(CJK_Unified_Ideographs, ch))
-        tagger = Tagger()
-        tokens = tagger(text)
-
-        result = []
-        for token in tokens:
-            surface = token.surface
-            # exclude_text에 있는 한자가 하나라도 포함되어 있으면 후리가나 생략
-            if any(ch in excluded_kanji_set for ch in surface):
-                result.append(surface)
-            else:
-                # 그 외 일반적인 경우만 후리가나 부착
-                if bool(re.compile(CJK_Unified_Ideographs).search(surface)):
-                    kana = token.feature.kana
-                    if kana:
-                        if kana_mode == 'katakana':
-                            result.append(f" {surface}[{kana}]")
-                        else:  # 기본: 히라가나
-                            result.append(f" {surface}[{jaconv.kata2hira(kana)}]")
-                    else:
-                        result.append(surface)
-                else:
-                    # 한자 이외(히라가나, 가타카나, 알파벳 등)는 그대로 이어붙임
-                    result.append(surface)
-
-        msg = "".join(result)
-        if msg.startswith(' '):
-            msg = msg[1:]
-
-        return msg
-        
-    return convert_text(add_furigana_with_fugashi(text, exclude_text, kana_mode))
-'''
-japanese_text = "詐欺に遭い憤った被害者達が会社を相手に抗議活動を行った。あの人が言うと、褒め言葉も嫌味に聞こえる。"
-print(process_japanese_text(japanese_text))
-'''
-
-#-----------------------------------------------------------------------------------
-def column_to_number(column_name):
-    # 엑셀 열 이름을 숫자로 변환
-    column_number = 0
-    for i, char in enumerate(reversed(column_name.upper())):
-        column_number += (ord(char) - ord('A') + 1) * (26 ** i)
-    return column_number
-
-def number_to_column(column_number):
-    # 숫자를 엑셀 열 이름으로 변환
-    column_name = []
-    while column_number > 0:
-        column_number -= 1  # 1을 빼서 0부터 시작하도록 조정
-        column_name.append(chr(column_number % 26 + ord('A')))
-        column_number //= 26
-    return ''.join(reversed(column_name))
-
-def check_file_is_open(file_path):
-    # 파일이 열려있는지 확인하는 함수
-    if platform.system() == "Windows":
-        try:
-            with builtins.open(file_path, 'a'):
-                return False
-        except IOError:
-            return True
-    else:
-        try:
-            result = subprocess.run(['lsof', file_path], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            return bool(result.stdout)
-        except FileNotFoundError:
-            #print("lsof 명령어를 사용할 수 없습니다.")
-            return False
-
-def parse_mixed_input(input_str):
-    # 튜플 패턴 찾기 (괄호 안의 내용 추출)
-    tuple_pattern = re.compile(r'\([^()]*\)')
-
-    def safe_eval(match):
-        # 괄호 제거
-        if match.group(0)[0]==',':
-            content = match.group(0)[2:-1]
-        else:
-            content = match.group(0)[1:-1]
-
-        items = [item.strip() for item in content.split(',') if item.strip()]
-        
-        # 요소가 하나만 있을 경우 튜플로 반환되도록 처리
-        if len(items) == 1:
-            return (items[0],)
-        return tuple(items)
-
-    # 튜플을 파싱하여 리스트로 저장
-    tuples = []
-    # finditer를 사용하여 input_str에서 패턴에 일치하는 모든 match 객체 검색
-    for match in tuple_pattern.finditer(input_str):
-        # 매칭된 결과(match)를 safe_eval 함수로 처리
-        evaluated_value = safe_eval(match)
-        
-        # 결과를 리스트에 추가
-        tuples.append(evaluated_value)
-    
-    # 문자열에서 튜플 패턴 제거 후 남은 요소 처리
-    remaining_str = tuple_pattern.sub('tuple', input_str)
-    
-    remaining_elements = []  # 빈 리스트 초기화
-    # 남은 문자열을 리스트로 변환, 빈 문자열 처리
-    if remaining_str:
-        split_items = remaining_str.split(',')  # 쉼표로 문자열 나누기
-        for item in split_items:  # stripped_items 리스트의 각 요소를 순회
-            if item is None or item.strip() == '':
-                remaining_elements.append('')
-            elif item != 'tuple':
-                remaining_elements.append(item)
-                
-    else:
-        remaining_elements = []
-
-    return tuples, remaining_elements if remaining_elements else []
+from furigana_job import (check_file_is_open, parse_mixed_input, validate_columns, parse_sheet_names, find_workbooks,
+                          warm_up, FuriganaJob, FuriganaBatch)
+STARTUP_MARKS.append(('import furigana_job', time.perf_counter()))
 
 # UI 만들기 ------------------------------------------------------------------------
 class Thread(QThread):
-    fault_message = ''
     fault_signal = pyqtSignal(int)
-    continue_signal = pyqtSignal()
+    progress_signal = pyqtSignal(int, int, float, float) # 완료 수, 전체 수, 초당 처리 수, 남은 시간(초)
 
-    def __init__(self, parent, filepath, columns):
+    def __init__(self, parent, filepaths, columns):
         super().__init__()
         self.parent = parent
-        self.filepath = filepath
-        self.columns = columns
-        
-    def get_multiple_columns_with_rows(self, columns):
-        result = {}
-
-        try:
-            if self.filepath.endswith('.xlsx') or self.filepath.endswith('.xlsm'):
-                self.workbook = load_workbook(self.filepath)
-                self.sheet = self.workbook.active
-
-                for column_letter in columns:
-                    result[column_letter] = []
-                    for cell in self.sheet[column_letter]:
-                        if cell.value is not None:
-                            result[column_letter].append((cell.row, str(cell.value)))
-                return result
-            
-            elif self.filepath.endswith('.csv'):
-                columns_list = []
-                for x in columns:
-                    columns_list.append(column_to_number(x))
-
-                column_headers = []
-                for x in range(max(columns_list)):
-                    column_headers.append(number_to_column(x))
-
-                with builtins.open(self.filepath, 'r', encoding='utf-8') as file:
-                    csv_reader = csv.DictReader(file, fieldnames=column_headers)
-                    
-                    # CSV 데이터를 리스트로 저장
-                    data = list(csv_reader)
-
-                    # 열별 데이터 출력
-                    for x in columns:
-                        column_data = []
-                        for y in range(len(data)):
-                            value = data[y].get(number_to_column(column_to_number(x)-1))
-                            if value is not None and value.strip() != '':
-                                column_data.append((y+1, value.replace('\ufeff','')))
-
-                        result[x] = column_data
-                return result
+        self.confirmed = False # 덮어쓰기 확인 후 다시 start()하면 확인 단계를 건너뛰고 변환을 이어감
+        # 실제 작업은 Qt와 무관한 FuriganaJob(파일이 여러 개면 FuriganaBatch)이 하고, 상태 코드와 진행 상황만 시그널로 전달
+        if len(filepaths) == 1:
+            self.job = FuriganaJob(parent, filepaths[0], columns, notify=self.fault_signal.emit, progress=self.progress_signal.emit)
+        else:
+            self.job = FuriganaBatch(parent, filepaths, columns, notify=self.fault_signal.emit, progress=self.progress_signal.emit)
 
-            else:
-                self.fault_signal.emit(4)
-                self.fault_message = 'ファイルの形式が間違っています。'
-        except:
-            self.fault_signal.emit(2)
-            self.fault_message = 'ファイルを開けません。\nファイルの経路や名前を確認してください。'
+    @property
+    def fault_message(self):
+        return self.job.fault_message
 
     def run(self):
-        self.input_columns_array = []
-        self.tuples, self.lists = parse_mixed_input(self.columns)
-        
-        # 리스트 처리
-        for item in self.lists:
-            self.input_columns_array.append(item)
-        
-        # 튜플 처리
-        for item in self.tuples:
-            for element in item:
-                self.input_columns_array.append(element)
-        
-        self.output_columns_array = [number_to_column(column_to_number(item) + 1) for item in self.input_columns_array]
-        Existing_data = self.get_multiple_columns_with_rows(self.output_columns_array)
-        
-        Existed_column_list = []
-        for x in self.output_columns_array:
-            if Existing_data[x]:
-                for y in Existing_data[x]:
-                    if y[1] != '':
-                        if x not in Existed_column_list:
-                            Existed_column_list.append(x)
-
-        if Existed_column_list and self.parent.overWrite_mode == True:
-            # 열이 겹치는 경우 시그널로 메시지 전송
-            self.fault_signal.emit(1)
-            self.fault_message = '出力しようとする'+'、'.join(Existed_column_list) + '列に既にデータがあります。進めますか？'
+        # 변환은 항상 이 작업 스레드에서 실행 (GUI 스레드에서 실행하면 변환 중 창이 멈춤)
+        if self.confirmed:
+            self.job.continue_process()
         else:
-            self.continue_process()
-        
-    def continue_process(self):
-        def _should_update(current_val):
-            # 값이 이미 존재하고, 덮어쓰기 모드(overWrite_mode)가 꺼져있으면 업데이트 하지 않음 (False 반환)
-            # 그 외의 경우(값이 없거나, 덮어쓰기 모드인 경우) 업데이트 진행 (True 반환)
-            
-            # 문자열로 변환하여 체크 ('nan', 'None', 공백 등 처리)
-            str_val = str(current_val).strip()
-            is_empty = (current_val is None) or (str_val == '') or (str_val == 'None') or (str_val == 'nan')
-            
-            # 값이 있는데 덮어쓰기 모드가 꺼져있다면 -> 업데이트 스킵
-            if not is_empty and self.parent.overWrite_mode is False:
-                return False
-            return True
+            self.job.run()
 
-        
-        # 1. Excel 파일 처리 (XLSX, XLSM)
-        if self.filepath.endswith(('.xlsx', '.xlsm')):
-            is_modified = False # 변경 사항이 있을 때만 저장하기 위한 플래그
-
-            # 1-1. 단일 리스트 처리 (self.lists)
-            if self.lists:
-                for col_char in self.lists:
-                    col_idx = column_to_number(col_char) + 1 # openpyxl은 1-based index
-                    col_data = self.get_multiple_columns_with_rows(col_char)[col_char]
-                    
-                    for row_idx, text in col_data:
-                        cell_ref = self.sheet.cell(row=row_idx, column=col_idx) # 셀 직접 접근이 더 빠름
-                        cell_font_name = cell_ref.font.name # cell에 적용된 폰트 이름 확인
-
-                        if _should_update(cell_ref.value):
-                            cell_ref.value = process_japanese_text(text=text, kana_mode=self.parent.kana_mode)  
-                            cell_ref.font = Font(name=cell_font_name) # cell에 폰트 적용
-                            is_modified = True
-
-            # 1-2. 튜플 처리 (self.tuples: 단어-문장 쌍)
-            if self.tuples:
-                for word_col, sent_col in self.tuples:
-                    word_col_idx = column_to_number(word_col) + 1
-                    sent_col_idx = column_to_number(sent_col) + 1
-
-                    # 데이터 가져오기
-                    word_data = self.get_multiple_columns_with_rows(word_col)[word_col]
-                    sent_data = self.get_multiple_columns_with_rows(sent_col)[sent_col]
-
-                    # Lookup Dictionary 생성: {row_index: text}
-                    word_map = {row: text for row, text in word_data}
-
-                    # 문장(Sentence) 처리
-                    for row_idx, sent_text in sent_data:
-                        cell_ref = self.sheet.cell(row=row_idx, column=sent_col_idx)
-                        cell_font_name = cell_ref.font.name # cell에 적용된 폰트 이름 확인
-                        
-                        if _should_update(cell_ref.value):
-                            # 같은 행(row_idx)에 단어가 존재하면 exclude_text로 사용
-                            exclude = word_map.get(row_idx) 
-                            cell_ref.value = process_japanese_text(text=sent_text, exclude_text=exclude, kana_mode=self.parent.kana_mode)
-                            cell_ref.font = Font(name=cell_font_name) # cell에 폰트 적용
-                            is_modified = True
-                    
-                    # 단어(Word) 처리
-                    for row_idx, word_text in word_data:
-                        cell_ref = self.sheet.cell(row=row_idx, column=word_col_idx)
-                        
-                        if _should_update(cell_ref.value):
-                            cell_ref.value = process_japanese_text(
-                                text=word_text, 
-                                kana_mode=self.parent.kana_mode
-                            )
-                            is_modified = True
-
-            # [I/O 최적화] 모든 작업이 끝난 후 한 번만 저장
-            if is_modified:
-                self.workbook.save(self.filepath)
-
-        # 2. CSV 파일 처리
-        elif self.filepath.endswith('.csv'):
-            # dtype=str 대신 object나 생략 권장(pandas 버전에 따라 다름), 여기선 유지
-            df = pd.read_csv(self.filepath, encoding='utf-8', header=None, dtype=str)
-            
-            # 필요한 컬럼 수 확보
-            required_cols = max([column_to_number(x) for x in self.output_columns_array])
-            current_cols = len(df.columns)
-            if current_cols <= required_cols:
-                # 한 번에 필요한 만큼 컬럼 추가 (반복문 제거)
-                for i in range(current_cols, required_cols + 1):
-                    df[i] = np.nan # 혹은 None
-
-            is_modified = False
-
-            # 2-1. 단일 리스트 처리
-            if self.lists:
-                for col_char in self.lists:
-                    col_idx = column_to_number(col_char)
-                    col_data = self.get_multiple_columns_with_rows(col_char)[col_char]
-
-                    for row_idx, text in col_data:
-                        df_row = row_idx - 1 # DataFrame은 0-based index
-                        current_val = df.iloc[df_row, col_idx]
-
-                        if _should_update(current_val):
-                            df.iloc[df_row, col_idx] = process_japanese_text(text=text, kana_mode=self.parent.kana_mode)
-                            is_modified = True
-
-            # 2-2. 튜플 처리
-            if self.tuples:
-                for word_col, sent_col in self.tuples:
-                    word_col_idx = column_to_number(word_col)
-                    sent_col_idx = column_to_number(sent_col)
-
-                    word_data = self.get_multiple_columns_with_rows(word_col)[word_col]
-                    sent_data = self.get_multiple_columns_with_rows(sent_col)[sent_col]
-
-                    # Dictionary Lookup 생성
-                    word_map = {row: text for row, text in word_data}
-
-                    # 문장 처리
-                    for row_idx, sent_text in sent_data:
-                        df_row = row_idx - 1
-                        current_val = df.iloc[df_row, sent_col_idx]
-
-                        if _should_update(current_val):
-                            exclude = word_map.get(row_idx)
-                            df.iloc[df_row, sent_col_idx] = process_japanese_text(
-                                text=sent_text, 
-                                exclude_text=exclude, 
-                                kana_mode=self.parent.kana_mode
-                            )
-                            is_modified = True
-
-                    # 단어 처리
-                    for row_idx, word_text in word_data:
-                        df_row = row_idx - 1
-                        current_val = df.iloc[df_row, word_col_idx]
-
-                        if _should_update(current_val):
-                            df.iloc[df_row, word_col_idx] = process_japanese_text(text=word_text, kana_mode=self.parent.kana_mode)
-                            is_modified = True
-
-            # [I/O 최적화] 저장
-            if is_modified:
-                df.to_csv(self.filepath, encoding='utf-8-sig', index=False, header=None)
-
-        # 3. 예외 처리 및 완료 신호
-        else:
-            self.fault_signal.emit(4)
-            self.fault_message = 'ファイルの形式が間違っています。'
-            return # 에러 시 함수 종료
-
-        self.fault_message = '完了しました。'
-        self.fault_signal.emit(3)
+    def cancel(self):
+        # terminate()와 달리 묶음 사이에서 멈추므로 파일이 중간까지만 쓰이지 않음
+        self.job.cancel()
     
+class WarmUpThread(QThread):
+    # 창이 뜬 뒤 pandas, openpyxl, 사전을 백그라운드에서 미리 읽어 첫 변환을 빠르게 함
+    timings = []
+
+    def run(self):
+        try:
+            self.timings = warm_up()
+        except Exception:
+            # 미리 읽기에 실패해도 실제 변환 때 다시 시도하므로 무시
+            self.timings = []
+
 class AutoLineEdit(QLineEdit):
     def __init__(self):
         super().__init__()
@@ -668,6 +170,16 @@ class MainWindow(QWidget):
     window_height = 400
     kana_mode = 'hiragana'
     overWrite_mode = False
+    parallel_mode = False
+    worker_count = os.cpu_count() or 1
+    cache_mode = True
+    stream_mode = False
+    incremental_mode = False
+    profile_mode = False
+    trace_path = None
+    sheet_names = None
+    apkg_mode = False
+    overrides_path = None
 
     def __init__(self):
         super(MainWindow, self).__init__()
@@ -688,50 +200,13 @@ class MainWindow(QWidget):
         self.msg_bracket_is_not_close = '括弧が閉じていません。'
         self.alert_bracket_overflow = 0
         self.msg_bracket_overflow = '括弧の中に二つ以内の列を入力してください。'
+        self.alert_unknown_format = 0
+        self.msg_unknown_format = '出力形式は anki、html、kana、json の中から選んでください。'
         
         self.initUI()
 
     def check_contains_strange(self, tuples=[], lists=[]):
-        all_columns = []
-
-        # 리스트 처리
-        for item in lists:
-            if item is None or item.strip() == '':
-                return 1
-            else:
-                all_columns.append(item)
-        
-        # 튜플 처리
-        for item in tuples:
-            for element in item:
-                if element is None or element.strip() == '':
-                    return 1
-                else:
-                    all_columns.append(element)
-            try:
-                if item[2]:
-                    return 5
-            except:
-                pass
-            
-        
-        # 공통 처리
-        for x in range(len(all_columns)):
-            # 괄호가 닫히지 않았는지 확인
-            if all_columns[x][0] == '(' or all_columns[x][len(all_columns[x])-1] == ')':
-                return 4
-
-            # 열 입력 범위 제한
-            elif not column_to_number('A') <= column_to_number(all_columns[x]) <= column_to_number('XFD'):
-                return 2
-            
-            # 열 겹침 방지
-            elif len(all_columns) != 1:
-                for y in range(len(all_columns)):
-                    if abs(column_to_number(all_columns[x])-column_to_number(all_columns[y])) == 1:
-                        return 3
-                                
-        return 0
+        return validate_columns(tuples, lists)
     
     def check_columns_text(self, text):
         if text == '':
@@ -760,6 +235,9 @@ class MainWindow(QWidget):
             elif alert == 5:
                 self.label_alert.setText(self.msg_bracket_overflow)
                 self.alert_bracket_overflow = 1
+            elif alert == 6:
+                self.label_alert.setText(self.msg_unknown_format)
+                self.alert_unknown_format = 1
             else:
                 self.label_alert.setText('')
                 self.alert_columns_contains_null = 0
@@ -767,11 +245,30 @@ class MainWindow(QWidget):
                 self.alert_column_overlap = 0
                 self.alert_bracket_is_not_close = 0
                 self.alert_bracket_overflow = 0
+                self.alert_unknown_format = 0
         
     def SelctFilePath(self):
         filepath = QFileDialog.getOpenFileName(self, 'ファイル選択', '','Excel Files (*.xlsx *.xlsm *.csv)')
         self.qle_file_path.setText(filepath[0])
 
+    def SelectFolderPath(self):
+        # 폴더를 고르면 폴더 안의 xlsx, xlsm, csv 파일을 모두 처리
+        folder = QFileDialog.getExistingDirectory(self, 'フォルダ選択', '')
+        if folder:
+            self.qle_file_path.setText(folder)
+
+    def get_sheet_names(self, text):
+        self.sheet_names = parse_sheet_names(text)
+
+    def SelectOverridesPath(self):
+        filepath = QFileDialog.getOpenFileName(self, '読み方辞書選択', '', 'Text Files (*.txt *.tsv *.csv)')
+        if filepath[0]:
+            self.qle_overrides_path.setText(filepath[0])
+
+    def get_overrides_path(self, text):
+        # 빈칸이면 읽기 덮어쓰기 사전을 쓰지 않음
+        self.overrides_path = text.strip() or None
+
     def Start(self):
         old_alert_start = self.alert_start
         self.alert_start = 1
@@ -790,6 +287,18 @@ class MainWindow(QWidget):
         elif filepath == '':
             msg_box.setText('ファイルの位置を確認してください。')
             msg_box.exec()
+
+        elif os.path.isdir(filepath):
+            filepaths = find_workbooks(filepath)
+            opened = [os.path.basename(path) for path in filepaths if check_file_is_open(path)]
+            if not filepaths:
+                msg_box.setText('フォルダにExcel（xlsx、xlsm）・csvファイルがありません。')
+                msg_box.exec()
+            elif opened:
+                msg_box.setText('ファイルが開けています。閉じてください。\n' + '、'.join(opened))
+                msg_box.exec()
+            else:
+                self.start_thread(filepaths)
             
         elif check_file_is_open(filepath):
             msg_box.setText('ファイルが開けています。閉じてください。')
@@ -797,24 +306,41 @@ class MainWindow(QWidget):
 
         else:
             if os.path.exists(filepath):
-                self.th = Thread(self, filepath, self.column_input.text())
-                self.th.fault_signal.connect(self.show_message_box)
-                self.th.continue_signal.connect(self.th.continue_process)
-                self.th.start()
+                self.start_thread([filepath])
             else:
                 msg_box.setText('ファイルを開けません。\nファイルの経路や名前を確認してください。')
                 msg_box.exec()
 
+    def start_thread(self, filepaths):
+        self.th = Thread(self, filepaths, self.column_input.text())
+        self.th.fault_signal.connect(self.show_message_box)
+        self.th.progress_signal.connect(self.show_progress)
+        self.progress_bar.setValue(0)
+        self.label_progress.setText('')
+        self.btn_cancel.setEnabled(True)
+        self.th.start()
+
+
+    def show_progress(self, done, total, rate, eta):
+        self.progress_bar.setMaximum(max(total, 1))
+        self.progress_bar.setValue(done)
+        self.label_progress.setText(f'{done}/{total}（{rate:.0f}件/秒、残り約{eta:.0f}秒）')
+
+    def Cancel(self):
+        self.btn_cancel.setEnabled(False)
+        self.label_progress.setText('中止しています…')
+        self.th.cancel()
 
     def show_message_box(self, signal):
         msg_box = QMessageBox(self)
         msg_box.setWindowTitle('警告')
         
+        # 작업은 시그널을 보낸 뒤 바로 끝나므로 스레드를 강제로 멈추지 않음
+        if signal != 1:
+            self.btn_cancel.setEnabled(False)
         if signal == 1:
             msg_box.addButton(QMessageBox.StandardButton.No).setText('いいえ')
-        elif signal in (2, 4):
-            self.th.terminate()
-        elif signal == 3:
+        elif signal in (3, 5):
             msg_box.setWindowTitle('報告')
         
         msg_box.setText(self.th.fault_message)
@@ -822,9 +348,12 @@ class MainWindow(QWidget):
 
         response = msg_box.exec()
         if response == QMessageBox.StandardButton.Yes and signal == 1:  # signal이 1이면서 경고창에서 YES를 클릭한 경우
-            self.th.continue_signal.emit()
+            # 확인 단계까지 마친 스레드가 끝나기를 기다렸다가 같은 작업으로 다시 시작
+            self.th.wait()
+            self.th.confirmed = True
+            self.th.start()
         elif response == QMessageBox.StandardButton.No and signal == 1:
-            self.th.terminate()
+            self.btn_cancel.setEnabled(False)
 
     def get_selected_value(self):
         if self.hiragana_btn.isChecked():
@@ -837,6 +366,28 @@ class MainWindow(QWidget):
             self.overWrite_mode = True
         else:
             self.overWrite_mode = False
+
+    def get_parallel_btn_value(self):
+        self.parallel_mode = self.parallel_btn.isChecked()
+        self.worker_spin.setEnabled(self.parallel_mode)
+
+    def get_worker_count(self, value):
+        self.worker_count = value
+
+    def get_cache_btn_value(self):
+        self.cache_mode = self.cache_btn.isChecked()
+
+    def get_stream_btn_value(self):
+        self.stream_mode = self.stream_btn.isChecked()
+
+    def get_incremental_btn_value(self):
+        self.incremental_mode = self.incremental_btn.isChecked()
+
+    def get_profile_btn_value(self):
+        self.profile_mode = self.profile_btn.isChecked()
+
+    def get_apkg_btn_value(self):
+        self.apkg_mode = self.apkg_btn.isChecked()
             
 
     def initUI(self):
@@ -868,6 +419,9 @@ class MainWindow(QWidget):
             '例）\"A,C,(E,G),(I,K),M\"<br>'
             '<br>'
             '上の様に入力した場合Ｂ、Ｄ、Ｆ、Ｊ、Ｎ列にフリガナが付けられた文字が、Ｈ列にはＥ列に含まれた単語以外のＧ列の文章にフリガナが付けられて出力します。(I,K)も同じく作動します。<br>'
+            '<br>'
+            '列の後ろに「:形式」を付けると出力形式を選べます。「+」でつなぐと右の列から順に出力します。<br>'
+            '例）\"A:anki+kana\" → Ｂ列にAnki形式、Ｃ列に読み仮名だけ（形式：anki、html、kana、json）<br>'
             ,self)
         label_column_input.setWordWrap(True)
 
@@ -878,13 +432,36 @@ class MainWindow(QWidget):
         self.katakana_btn.clicked.connect(self.get_selected_value)
         self.overWrite_btn = QCheckBox('上書きモード', self)
         self.overWrite_btn.clicked.connect(self.get_overWrite_btn_value)
+        self.parallel_btn = QCheckBox('並列処理', self)
+        self.parallel_btn.clicked.connect(self.get_parallel_btn_value)
+        self.worker_spin = QSpinBox(self)
+        self.worker_spin.setRange(1, os.cpu_count() or 1)
+        self.worker_spin.setValue(self.worker_count)
+        self.worker_spin.setSuffix(' プロセス')
+        self.worker_spin.setEnabled(False)
+        self.worker_spin.valueChanged.connect(self.get_worker_count)
+        self.cache_btn = QCheckBox('キャッシュを使う', self)
+        self.cache_btn.setChecked(self.cache_mode)
+        self.cache_btn.clicked.connect(self.get_cache_btn_value)
+        self.stream_btn = QCheckBox('大容量モード', self)
+        self.stream_btn.setToolTip('ファイルを全部読み込まずに、行ごとに読み書きします。')
+        self.stream_btn.clicked.connect(self.get_stream_btn_value)
+        self.incremental_btn = QCheckBox('差分モード', self)
+        self.incremental_btn.setToolTip('前回から文字が変わった行だけフリガナを付け直します。')
+        self.incremental_btn.clicked.connect(self.get_incremental_btn_value)
+        self.profile_btn = QCheckBox('処理時間の内訳', self)
+        self.profile_btn.setToolTip('完了メッセージに段階ごとの処理時間を表示します。')
+        self.profile_btn.clicked.connect(self.get_profile_btn_value)
+        self.apkg_btn = QCheckBox('Ankiパッケージに出力', self)
+        self.apkg_btn.setToolTip('元のファイルは変更せずに、同じ名前の.apkgファイルに出力します。')
+        self.apkg_btn.clicked.connect(self.get_apkg_btn_value)
 
         self.column_input = AutoLineEdit()
         self.label_alert = QLabel('', self)
         self.label_alert.setStyleSheet('color: red;')
         
         #self.column_input.setText('b,d')
-        regex = QRegularExpression('^[a-zA-Z,()]*$')  # 영문자와 쉼표, 괄호만 허용
+        regex = QRegularExpression('^[a-zA-Z,():+]*$')  # 영문자와 쉼표, 괄호, 출력 형식 지정(:, +)만 허용
         validator = QRegularExpressionValidator(regex, self.column_input)
         self.column_input.setValidator(validator)
         
@@ -894,16 +471,43 @@ class MainWindow(QWidget):
         self.qle_file_path = QLineEdit(self)
         btn_file_path_select = QPushButton('...', self)
         btn_file_path_select.clicked.connect(self.SelctFilePath)
+        btn_folder_path_select = QPushButton('フォルダ', self)
+        btn_folder_path_select.setToolTip('フォルダの中のファイルを全て処理します。')
+        btn_folder_path_select.clicked.connect(self.SelectFolderPath)
+
+        self.qle_sheet_names = QLineEdit(self)
+        self.qle_sheet_names.setPlaceholderText('空欄：アクティブシート　*：全てのシート　例）Sheet1,Sheet2')
+        self.qle_sheet_names.textChanged.connect(self.get_sheet_names)
+
+        self.qle_overrides_path = QLineEdit(self)
+        self.qle_overrides_path.setPlaceholderText('空欄：使わない　1行に「表記<TAB>読み」')
+        self.qle_overrides_path.textChanged.connect(self.get_overrides_path)
+        btn_overrides_path_select = QPushButton('...', self)
+        btn_overrides_path_select.clicked.connect(self.SelectOverridesPath)
 
         label_start = QLabel('始める前にエクセルを閉じてください。',self)
         btn_start = QPushButton('始め', self)
         btn_start.clicked.connect(self.Start)
+        self.btn_cancel = QPushButton('中止', self)
+        self.btn_cancel.setEnabled(False)
+        self.btn_cancel.clicked.connect(self.Cancel)
+
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setValue(0)
+        self.label_progress = QLabel('', self)
 
         kana_btn_layout = QVBoxLayout()
         kana_btn_layout.addWidget(self.hiragana_btn)
         kana_btn_layout.addWidget(self.katakana_btn)
         kana_btn_layout.addWidget(QLabel('', self))
         kana_btn_layout.addWidget(self.overWrite_btn)
+        kana_btn_layout.addWidget(self.parallel_btn)
+        kana_btn_layout.addWidget(self.worker_spin)
+        kana_btn_layout.addWidget(self.cache_btn)
+        kana_btn_layout.addWidget(self.stream_btn)
+        kana_btn_layout.addWidget(self.incremental_btn)
+        kana_btn_layout.addWidget(self.profile_btn)
+        kana_btn_layout.addWidget(self.apkg_btn)
         kana_btn_layout.addStretch(1)
 
         label_n_btn_layout = QHBoxLayout()
@@ -920,11 +524,26 @@ class MainWindow(QWidget):
         file_path_layout.addWidget(QLabel('ファイル位置', self))
         file_path_layout.addWidget(self.qle_file_path)
         file_path_layout.addWidget(btn_file_path_select)
+        file_path_layout.addWidget(btn_folder_path_select)
+
+        sheet_layout = QHBoxLayout()
+        sheet_layout.addWidget(QLabel('シート', self))
+        sheet_layout.addWidget(self.qle_sheet_names)
+
+        overrides_layout = QHBoxLayout()
+        overrides_layout.addWidget(QLabel('読み方辞書', self))
+        overrides_layout.addWidget(self.qle_overrides_path)
+        overrides_layout.addWidget(btn_overrides_path_select)
 
         start_btn_layout = QHBoxLayout()
         start_btn_layout.addStretch(1)
         start_btn_layout.addWidget(label_start)
         start_btn_layout.addWidget(btn_start)
+        start_btn_layout.addWidget(self.btn_cancel)
+
+        progress_layout = QHBoxLayout()
+        progress_layout.addWidget(self.progress_bar)
+        progress_layout.addWidget(self.label_progress)
 
         vbox = QVBoxLayout()
         vbox.addStretch(1)
@@ -932,7 +551,10 @@ class MainWindow(QWidget):
         vbox.addLayout(column_input_layout)
         vbox.addWidget(self.label_alert)
         vbox.addLayout(file_path_layout)
+        vbox.addLayout(sheet_layout)
+        vbox.addLayout(overrides_layout)
         vbox.addLayout(start_btn_layout)
+        vbox.addLayout(progress_layout)
         vbox.addStretch(1)
 
         self.setLayout(vbox)
@@ -944,13 +566,58 @@ def resource_path(relative_path):
     base_path = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
     return os.path.join(base_path, relative_path)
 
+def load_app_font(app):
+    # 내장 폰트(.ttc)는 파일이 커서 읽는 데 시간이 걸리므로 창을 먼저 띄운 뒤 적용
+    QFontDatabase.addApplicationFont(resource_path('UDDigiKyokashoN-R.ttc'))
+    app.setFont(QFont('UD Digi Kyokasho N-R', 10))
+
+def startup_report(warm_up_timings):
+    # --profile-startup: 단계별 시간을 문자열로 정리
+    lines = ['起動時間の内訳']
+    for (_, previous), (name, now) in zip(STARTUP_MARKS, STARTUP_MARKS[1:]):
+        lines.append(f'  {name}：{now - previous:.3f}秒')
+    lines.append(f'  合計：{STARTUP_MARKS[-1][1] - STARTUP_MARKS[0][1]:.3f}秒')
+    lines.append('バックグラウンドの準備')
+    for name, seconds in warm_up_timings:
+        lines.append(f'  {name}：{seconds:.3f}秒')
+    return '\n'.join(lines)
+
+def print_startup_report(warm_up_timings):
+    report = startup_report(warm_up_timings)
+    # --noconsole로 만든 실행 파일에는 stdout이 없으므로 실행 파일 옆에 파일로 남김
+    if sys.stdout is not None:
+        print(report)
+    else:
+        base_path = os.path.dirname(os.path.abspath(sys.executable if getattr(sys, 'frozen', False) else __file__))
+        with open(os.path.join(base_path, 'startup_profile.txt'), 'w', encoding='utf-8') as f:
+            f.write(report + '\n')
+
 if __name__ == '__main__':
+    # PyInstaller로 만든 실행 파일에서 병렬 처리용 작업자 프로세스를 띄우기 위해 필요
+    multiprocessing.freeze_support()
+
+    profile_startup = '--profile-startup' in sys.argv
+    if profile_startup:
+        sys.argv.remove('--profile-startup')
+
     app = QApplication(sys.argv)
     app.setWindowIcon(QIcon(resource_path('app.ico')))
-
-    QFontDatabase.addApplicationFont(resource_path('UDDigiKyokashoN-R.ttc'))
-    app.setFont(QFont('UD Digi Kyokasho N-R', 10))
+    STARTUP_MARKS.append(('QApplication', time.perf_counter()))
     
     window = MainWindow()
+    STARTUP_MARKS.append(('MainWindow', time.perf_counter()))
     window.show()
+
+    warm_up_thread = WarmUpThread()
+    if profile_startup:
+        warm_up_thread.finished.connect(lambda: print_startup_report(warm_up_thread.timings))
+
+    def after_first_paint():
+        # 이벤트 루프가 돌기 시작한 시점 = 창이 처음 그려진 직후
+        STARTUP_MARKS.append(('ウィンドウ表示', time.perf_counter()))
+        load_app_font(app)
+        STARTUP_MARKS.append(('フォント読み込み', time.perf_counter()))
+        warm_up_thread.start()
+    QTimer.singleShot(0, after_first_paint)
+
     sys.exit(app.exec())
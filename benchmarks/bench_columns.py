@@ -0,0 +1,127 @@
+"""
+열 데이터 메모리 벤치마크: 시트에서 읽은 열과 변환할 셀 목록을 메모리에 들고 있는 비용을 잰다.
+
+    A 열: 짧은 단어, (C, E) 열: 단어와 그 단어가 들어간 예문  ->  열 입력 "A,(C,E)"  (bench_files와 같은 파일)
+
+표현
+    tuples  : 예전 방식. 열마다 [(행 번호, 문자열), ...], 단어 열의 {행: 단어} dict, 셀마다 작업 튜플
+    columns : ColumnData(행 번호 배열 + 문자열 버퍼)와 ConversionJobs(항목별 배열)
+
+단계 (MB 열은 tracemalloc으로 잰 그 시점까지 남아 있는 메모리. 최대 RSS가 아님)
+    read    : 세 열 읽기 (csv 모듈로 읽어 형태소 분석 없이)
+    jobs    : 변환할 셀 목록 만들기 (출력 열은 모두 비어 있다고 봄)
+    total   : 둘 다
+
+경우마다 새 프로세스에서 실행하고, 시간은 tracemalloc 없이 한 번, 메모리는 tracemalloc을 켜고 한 번 더 잰다.
+
+    python benchmarks/bench_columns.py [--sizes 500k] [--json out.json]
+"""
+import os, time, argparse, tempfile, multiprocessing
+
+import common
+from corpus import parse_size
+from bench_files import make_file
+
+COLUMNS = ['A', 'C', 'E']
+LIST_COLUMN = 'A'
+WORD_COLUMN, SENT_COLUMN = 'C', 'E'
+OUTPUTS = {'A': 2, 'C': 4, 'E': 6} # 입력 열 -> 출력 열 번호 (B, D, F)
+
+def read_tuples(path):
+    # 예전 CsvStream.read_columns()와 같음: {열 이름: [(행 번호, 문자열), ...]}
+    from furigana_io import CsvStream, column_to_number
+    stream = CsvStream(path)
+    numbers = {column_to_number(column): column for column in COLUMNS}
+    result = {column: [] for column in COLUMNS}
+    with open(path, encoding=stream.encoding, newline='') as source:
+        for row_number, row in stream._iter_rows(source):
+            for column, value in stream._row_values(row, numbers).items():
+                if value is not None:
+                    result[numbers[column]].append((row_number, value))
+    return result
+
+def jobs_tuples(data):
+    # 예전 collect_in_memory()와 같은 구조: (행, 출력 열 번호, 원문, 제외 단어, 출력 형식, 폰트 적용 여부)
+    jobs = []
+    for row_idx, text in data[LIST_COLUMN]:
+        jobs.append((row_idx, OUTPUTS[LIST_COLUMN], text, '', 'anki', True))
+    word_map = {row: text for row, text in data[WORD_COLUMN]}
+    for row_idx, text in data[SENT_COLUMN]:
+        jobs.append((row_idx, OUTPUTS[SENT_COLUMN], text, word_map.get(row_idx), 'anki', True))
+    for row_idx, text in data[WORD_COLUMN]:
+        jobs.append((row_idx, OUTPUTS[WORD_COLUMN], text, '', 'anki', False))
+    return jobs, word_map
+
+def read_columns(path):
+    from furigana_io import CsvStream
+    return CsvStream(path).read_columns(COLUMNS)
+
+def jobs_columns(data):
+    # collect_in_memory()와 같은 구조
+    from furigana_job import ConversionJobs
+    jobs = ConversionJobs()
+    jobs.add_source(data[LIST_COLUMN], None, True)
+    for index, row_idx in enumerate(data[LIST_COLUMN].rows):
+        jobs.add(row_idx, OUTPUTS[LIST_COLUMN], index)
+    word_data, sent_data = data[WORD_COLUMN], data[SENT_COLUMN]
+    jobs.add_source(sent_data, word_data, True)
+    for index, (row_idx, word_index) in enumerate(zip(sent_data.rows, word_data.align(sent_data.rows))):
+        jobs.add(row_idx, OUTPUTS[SENT_COLUMN], index, word_index)
+    jobs.add_source(word_data, None, False)
+    for index, row_idx in enumerate(word_data.rows):
+        jobs.add(row_idx, OUTPUTS[WORD_COLUMN], index)
+    return jobs
+
+BUILDERS = {'tuples': (read_tuples, jobs_tuples), 'columns': (read_columns, jobs_columns)}
+
+def _run_case(path, layout, traced):
+    # 자식 프로세스에서 실행: {'read': (초, MB), 'jobs': (초, MB)}
+    import tracemalloc
+    read, build_jobs = BUILDERS[layout]
+    if traced:
+        tracemalloc.start()
+    start = time.perf_counter()
+    data = read(path)
+    read_seconds = time.perf_counter() - start
+    read_mb = tracemalloc.get_traced_memory()[0] / (1 << 20) if traced else None
+    start = time.perf_counter()
+    jobs = build_jobs(data)
+    jobs_seconds = time.perf_counter() - start
+    total_mb = tracemalloc.get_traced_memory()[0] / (1 << 20) if traced else None
+    del jobs, data
+    return {'read': (read_seconds, read_mb), 'jobs': (jobs_seconds, None if total_mb is None else total_mb - read_mb),
+            'total': (read_seconds + jobs_seconds, total_mb)}
+
+def run(size, layout, directory):
+    path = os.path.join(directory, f'bench_{size}.csv')
+    if not os.path.exists(path):
+        make_file(path, size)
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1) as pool:
+        timed = pool.apply(_run_case, (path, layout, False))
+    with context.Pool(1) as pool:
+        traced = pool.apply(_run_case, (path, layout, True))
+    rows = size * 3 # A, C, E 세 열
+    return [common.result('columns', layout, rows, stage, timed[stage][0], traced[stage][1]) for stage in ('read', 'jobs', 'total')]
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='500k', help='行数（例：100k,500k）')
+    parser.add_argument('--layouts', default='tuples,columns')
+    parser.add_argument('--json', metavar='PATH', help='結果をJSONで保存')
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in [parse_size(s) for s in args.sizes.split(',')]:
+            for layout in args.layouts.split(','):
+                results.extend(run(size, layout, directory))
+    common.print_table(results)
+    if args.json:
+        common.write_json(results, args.json)
+    return results
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+후리가나 엔진 벤치마크: 단계별로 나누어 처리량을 잰다.
+
+    tokenize                : 형태소 분석만 (Tagger 호출)
+    segment_japanese_text   : 형태소 분석 + 읽기를 한자 블록별 세그먼트로 나누기 (토큰 캐시를 비운 상태)
+    render_anki             : 세그먼트를 Anki 형식 문자열로 출력
+    split_into_blocks       : 한자가 들어간 토큰 표기의 블록 분할
+    align_word_with_furigana: (표기, 읽기) 쌍의 블록 배치
+    process_japanese_texts  : 전체 (cold: 토큰 캐시와 제외 단어 캐시를 비운 첫 실행, warm: 같은 입력 두 번째 실행)
+                              cold도 사전은 이미 읽어 둔 상태이므로 사전 로딩 시간은 들어가지 않음
+
+    python benchmarks/bench_engine.py [--sizes 1k,10k] [--corpora vocab,sentence] [--json out.json]
+"""
+import argparse, time, tracemalloc
+
+import common
+from corpus import CORPORA, make_rows, parse_size
+
+import jaconv
+import furigana_engine
+from furigana_engine import (get_tagger, segment_japanese_text, render_anki, split_into_blocks,
+                             align_word_with_furigana, process_japanese_texts, KANJI_PATTERN)
+
+def _clear_token_caches():
+    # 토큰 캐시와 함께 행마다 만든 제외 단어(WordExclusion) 캐시도 비워야 앞 단계의 결과를 재사용하지 않음
+    furigana_engine.set_token_cache_size(furigana_engine.TOKEN_CACHE_SIZE)
+    furigana_engine._exclusion_cache.clear()
+
+def _timed(func):
+    start = time.perf_counter()
+    value = func()
+    return value, time.perf_counter() - start
+
+def run(corpus, size, kana_mode='hiragana', memory=True):
+    rows = make_rows(corpus, size)
+    texts = [text for text, _ in rows]
+    excludes = [exclude for _, exclude in rows]
+    tagger = get_tagger()
+    case = f'{corpus}-{kana_mode}'
+    results = []
+
+    # 단어/읽기 쌍은 측정 전에 미리 뽑아 둠 (정렬 단계만 따로 재기 위해)
+    pairs = []
+    for text in texts:
+        for token in tagger(text):
+            if KANJI_PATTERN.search(token.surface) and token.feature.kana:
+                reading = token.feature.kana if kana_mode == 'katakana' else jaconv.kata2hira(token.feature.kana)
+                pairs.append((token.surface, reading))
+
+    _, seconds = _timed(lambda: [len(tagger(text)) for text in texts])
+    results.append(common.result('engine', case, size, 'tokenize', seconds))
+
+    _clear_token_caches()
+    segmented, seconds = _timed(lambda: [segment_japanese_text(text, exclude, kana_mode, tagger) for text, exclude in rows])
+    results.append(common.result('engine', case, size, 'segment_japanese_text', seconds))
+
+    _, seconds = _timed(lambda: [render_anki(segments) for segments in segmented])
+    results.append(common.result('engine', case, size, 'render_anki', seconds))
+
+    _, seconds = _timed(lambda: [split_into_blocks(word) for word, _ in pairs])
+    results.append(common.result('engine', case, len(pairs), 'split_into_blocks', seconds))
+
+    _, seconds = _timed(lambda: [align_word_with_furigana(word, reading, kana_mode) for word, reading in pairs])
+    results.append(common.result('engine', case, len(pairs), 'align_word_with_furigana', seconds))
+
+    _clear_token_caches()
+    _, seconds = _timed(lambda: process_japanese_texts(texts, excludes, kana_mode, tagger))
+    results.append(common.result('engine', case, size, 'process_japanese_texts/cold', seconds))
+    _, seconds = _timed(lambda: process_japanese_texts(texts, excludes, kana_mode, tagger))
+    results.append(common.result('engine', case, size, 'process_japanese_texts/warm', seconds))
+
+    if memory:
+        # tracemalloc은 실행을 느리게 하므로 처리량과 따로 한 번 더 돌려서 파이썬 쪽 최대 메모리만 잰다
+        _clear_token_caches()
+        tracemalloc.start()
+        _, seconds = _timed(lambda: process_japanese_texts(texts, excludes, kana_mode, tagger))
+        peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+        results.append(common.result('engine', case, size, 'process_japanese_texts/mem', seconds, peak))
+    return results
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1k,10k', help='行数（例：1k,10k,100k）')
+    parser.add_argument('--corpora', default=','.join(CORPORA), help='コーパス：' + ','.join(CORPORA))
+    parser.add_argument('--kana', choices=('hiragana', 'katakana'), default='hiragana')
+    parser.add_argument('--no-memory', action='store_true', help='メモリ測定を省略')
+    parser.add_argument('--json', metavar='PATH', help='結果をJSONで保存')
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    get_tagger() # 사전 로딩 시간은 측정에서 뺌
+    results = []
+    for size in [parse_size(s) for s in args.sizes.split(',')]:
+        for corpus in args.corpora.split(','):
+            results.extend(run(corpus, size, args.kana, memory=not args.no_memory))
+    common.print_table(results)
+    if args.json:
+        common.write_json(results, args.json)
+    return results
+
+if __name__ == '__main__':
+    main()
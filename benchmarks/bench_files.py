@@ -0,0 +1,130 @@
+"""
+파일 입출력 벤치마크: xlsx/csv 파일을 만들어 FuriganaJob으로 끝까지 처리한다. (GUI 없이)
+
+    A 열: 짧은 단어, (C, E) 열: 단어와 그 단어가 들어간 예문  ->  열 입력 "A,(C,E)"
+
+경우마다 새 프로세스에서 실행해 최대 메모리(RSS)가 서로 섞이지 않게 한다.
+결과 캐시는 끄고 측정한다. (디스크 캐시가 있으면 두 번째부터는 변환을 거의 하지 않으므로)
+
+단계
+    read+check : 출력 열 읽기와 덮어쓰기 확인 (run()에서 continue_process()를 뺀 시간)
+    convert    : 후리가나 변환 (FuriganaJob.convert 합계)
+    write      : 셀 기록과 저장 (continue_process()에서 convert를 뺀 시간. apkg 모드에서는 Anki 패키지 쓰기)
+    total      : 전체
+
+모드: memory, stream, apkg(메모리 모드로 읽어 .apkg 출력), stream-apkg(대용량 모드로 읽어 .apkg 출력)
+
+    python benchmarks/bench_files.py [--sizes 1k,10k] [--formats xlsx,csv] [--modes memory,stream] [--json out.json]
+"""
+import os, csv, time, argparse, tempfile, multiprocessing
+
+import common
+from corpus import make_rows, parse_size
+
+COLUMNS = 'A,(C,E)'
+
+class BenchOptions:
+    kana_mode = 'hiragana'
+    overWrite_mode = False
+    parallel_mode = False
+    worker_count = 1
+    cache_mode = False
+    stream_mode = False
+    incremental_mode = False
+    profile_mode = False
+    trace_path = None
+    sheet_names = None
+    apkg_mode = False
+    overrides_path = None
+
+def make_file(path, size):
+    vocab = make_rows('vocab', size)
+    pairs = make_rows('tuple', size)
+    rows = [[word, None, exclude, None, sentence] for (word, _), (sentence, exclude) in zip(vocab, pairs)]
+    if path.endswith('.csv'):
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            csv.writer(f).writerows([['' if v is None else v for v in row] for row in rows])
+    else:
+        from openpyxl import Workbook
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        for row in rows:
+            sheet.append(row)
+        workbook.save(path)
+
+def _run_case(path, mode, workers):
+    # 자식 프로세스에서 실행
+    from furigana_job import FuriganaJob
+
+    class TimedJob(FuriganaJob):
+        convert_seconds = 0.0
+        continue_seconds = 0.0
+
+        def convert(self, jobs):
+            start = time.perf_counter()
+            results = super().convert(jobs)
+            self.convert_seconds += time.perf_counter() - start
+            return results
+
+        def continue_process(self):
+            start = time.perf_counter()
+            super().continue_process()
+            self.continue_seconds += time.perf_counter() - start
+
+    options = BenchOptions()
+    options.stream_mode = mode.startswith('stream')
+    options.apkg_mode = mode.endswith('apkg')
+    options.parallel_mode = workers > 1
+    options.worker_count = workers
+    signals = []
+    job = TimedJob(options, path, COLUMNS, notify=signals.append)
+    start = time.perf_counter()
+    job.run()
+    total = time.perf_counter() - start
+    if 3 not in signals:
+        raise RuntimeError(job.fault_message)
+    return {
+        'read+check': total - job.continue_seconds,
+        'convert': job.convert_seconds,
+        'write': job.continue_seconds - job.convert_seconds,
+        'total': total,
+        'peak_mb': common.peak_rss_mb(),
+    }
+
+def run(size, fmt, mode, workers=1, directory=None):
+    path = os.path.join(directory, f'bench_{size}.{fmt}')
+    make_file(path, size)
+    # 사전 로딩(Tagger 생성)도 자식 프로세스에 포함되므로 convert에 첫 로딩 시간이 들어간다
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        timings = pool.apply(_run_case, (path, mode, workers))
+    os.remove(path)
+
+    case = f'{fmt}-{mode}' + (f'-w{workers}' if workers > 1 else '')
+    rows = size * 3 # A, C, E 세 열
+    return [common.result('files', case, rows, stage, timings[stage], timings['peak_mb'] if stage == 'total' else None)
+            for stage in ('read+check', 'convert', 'write', 'total')]
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1k,10k', help='行数（例：1k,10k,100k）')
+    parser.add_argument('--formats', default='xlsx,csv')
+    parser.add_argument('--modes', default='memory,stream')
+    parser.add_argument('--workers', type=int, default=1, help='並列処理のプロセス数')
+    parser.add_argument('--json', metavar='PATH', help='結果をJSONで保存')
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in [parse_size(s) for s in args.sizes.split(',')]:
+            for fmt in args.formats.split(','):
+                for mode in args.modes.split(','):
+                    results.extend(run(size, fmt, mode, args.workers, directory))
+    common.print_table(results)
+    if args.json:
+        common.write_json(results, args.json)
+    return results
+
+if __name__ == '__main__':
+    main()
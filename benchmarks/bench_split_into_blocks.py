@@ -0,0 +1,57 @@
+"""
+split_into_blocks() 마이크로 벤치마크.
+
+예전 구현(글자마다 re.compile(...).match 호출)과 현재 구현(BLOCK_PATTERN 한 번으로 전체 분할)을
+긴 문장에서 비교한다.
+
+    python benchmarks/bench_split_into_blocks.py [반복 횟수]
+"""
+import os, re, sys, timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from furigana_engine import split_into_blocks
+
+CJK_Unified_Ideographs = r'[\u4E00-\u9FFF]+'
+
+def legacy_split_into_blocks(word):
+    # 비교용: 예전 구현 그대로
+    blocks = []
+    current_type = None
+    current_buf = []
+
+    def flush_buffer():
+        nonlocal current_buf
+        if current_buf:
+            blocks.append((current_type, ''.join(current_buf)))
+            current_buf = []
+
+    for ch in word:
+        if re.compile(CJK_Unified_Ideographs).match(ch) or re.compile('々').match(ch):
+            if current_type != 'K':
+                flush_buffer()
+                current_type = 'K'
+            current_buf.append(ch)
+        else:
+            if current_type != 'H':
+                flush_buffer()
+                current_type = 'H'
+            current_buf.append(ch)
+    flush_buffer()
+    return blocks
+
+SAMPLES = {
+    '短い単語': '問題視する',
+    '長い文章': '詐欺に遭い憤った被害者達が会社を相手に抗議活動を行った。あの人が言うと、褒め言葉も嫌味に聞こえる。' * 5,
+    '仮名が多い文章': 'これはとてもながいひらがなのぶんしょうで、ときどき漢字がまざっています。' * 5,
+}
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f'{"サンプル":<12}{"文字数":>6}{"以前(ms)":>12}{"現在(ms)":>12}{"倍率":>8}')
+    for name, text in SAMPLES.items():
+        legacy = timeit.timeit(lambda: legacy_split_into_blocks(text), number=number)
+        current = timeit.timeit(lambda: split_into_blocks(text), number=number)
+        print(f'{name:<12}{len(text):>6}{legacy * 1000:>12.1f}{current * 1000:>12.1f}{legacy / current:>7.1f}x')
+
+if __name__ == '__main__':
+    main()
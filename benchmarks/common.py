@@ -0,0 +1,41 @@
+"""
+벤치마크 공용 도구: 결과 행 만들기, 표 출력, JSON 저장, 최대 메모리 측정.
+
+결과 한 줄은 dict:
+    {'suite': ..., 'case': ..., 'rows': 행 수, 'stage': 단계, 'seconds': 걸린 시간,
+     'rows_per_sec': 처리량, 'peak_mb': 최대 메모리(MB, 측정하지 않았으면 None)}
+"""
+import os, sys, json, platform
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def result(suite, case, rows, stage, seconds, peak_mb=None):
+    return {
+        'suite': suite, 'case': case, 'rows': rows, 'stage': stage,
+        'seconds': round(seconds, 6),
+        'rows_per_sec': round(rows / seconds, 1) if seconds > 0 else None,
+        'peak_mb': None if peak_mb is None else round(peak_mb, 1),
+    }
+
+def peak_rss_mb():
+    # 현재 프로세스의 최대 상주 메모리(MB). resource 모듈이 없는 환경(Windows)에서는 None
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux는 KB, macOS는 byte 단위
+    return peak / (1024 * 1024) if platform.system() == 'Darwin' else peak / 1024
+
+def print_table(results, file=None):
+    file = file or sys.stdout
+    print(f'{"suite":<8}{"case":<24}{"rows":>8}  {"stage":<26}{"秒":>9}{"行/秒":>12}{"MB":>8}', file=file)
+    for r in results:
+        rate = '-' if r['rows_per_sec'] is None else f'{r["rows_per_sec"]:.0f}'
+        peak = '-' if r['peak_mb'] is None else f'{r["peak_mb"]:.1f}'
+        print(f'{r["suite"]:<8}{r["case"]:<24}{r["rows"]:>8}  {r["stage"]:<26}{r["seconds"]:>9.3f}{rate:>12}{peak:>8}', file=file)
+
+def write_json(results, path):
+    meta = {'python': platform.python_version(), 'platform': platform.platform(), 'cpu_count': os.cpu_count()}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta, 'results': results}, f, ensure_ascii=False, indent=1)
@@ -0,0 +1,125 @@
+"""
+벤치마크용 일본어 말뭉치.
+
+네트워크 없이 돌릴 수 있도록 예문을 이 파일에 직접 넣어 두고, 큰 크기(10k, 100k 행)는
+같은 시드로 항상 같은 결과가 나오는 난수로 단어와 예문을 조합해서 만든다.
+
+    make_rows(kind, size, seed=0) -> [(원문, 제외 단어), ...]
+
+kind
+    vocab    : 짧은 단어 (단어장 앞면)
+    sentence : 긴 예문
+    mixed    : 가나가 많고 한자가 드문드문 섞인 문장
+    tuple    : (단어, 그 단어가 들어간 예문) -- 예문 쪽에 제외 단어가 붙는 경우
+"""
+import random
+
+VOCABULARY = [
+    '問題視', '詐欺', '被害者', '抗議活動', '褒め言葉', '嫌味', '会社', '相手', '憤る', '遭う',
+    '勉強', '図書館', '新聞', '天気予報', '経済', '政治家', '環境問題', '電車', '地下鉄', '乗り換え',
+    '一ヶ月', '人々', '〆切', '霞ヶ関', '時々', '久しぶり', '引っ越し', '取り消し', '申し込み', '受付',
+    '大丈夫', '危険', '安全', '準備', '説明書', '締め切り', '話し合い', '見積もり', '手続き', '届け出',
+    '明日', '今日', '昨日', '一昨日', '大人', '子供', '果物', '野菜', '料理', '美味しい',
+    '難しい', '易しい', '眠い', '寂しい', '懐かしい', '恥ずかしい', '確かめる', '調べる', '考える', '覚える',
+]
+
+SENTENCES = [
+    '詐欺に遭い憤った被害者達が会社を相手に抗議活動を行った。',
+    'あの人が言うと、褒め言葉も嫌味に聞こえる。',
+    '彼はその件を問題視している。',
+    'ご飯を食べましたか？',
+    '来月から新しいプロジェクトが始まるので、準備を進めておいてください。',
+    '天気予報によると、明日は午後から雨が降るそうです。',
+    '図書館で借りた本を返すのをすっかり忘れていた。',
+    '環境問題について、政治家たちが活発な議論を交わした。',
+    '一ヶ月ぶりに実家へ帰ったら、庭の木々がすっかり大きくなっていた。',
+    '申し込みの締め切りは今週の金曜日ですので、お早めに手続きを済ませてください。',
+    '電車の乗り換えを間違えて、約束の時間に遅れてしまった。',
+    '子供の頃によく遊んだ公園が、久しぶりに訪れると懐かしく感じられた。',
+    '説明書をよく読んでから、安全に使用してください。',
+    '話し合いの結果、計画は来年まで延期されることになった。',
+    '見積もりを確かめたところ、予算を大幅に超えていることが分かった。',
+    '人々は霞ヶ関の前に集まり、静かに抗議の声を上げた。',
+    '彼女は恥ずかしそうに笑いながら、小さな声で挨拶をした。',
+    '美味しい料理を作るためには、新鮮な野菜と果物が欠かせない。',
+    '昨日から熱があるので、今日は会社を休むことにしました。',
+    '経済の先行きが不透明なため、多くの企業が投資を控えている。',
+]
+
+MIXED = [
+    'これはとてもながいひらがなのぶんしょうで、ときどき漢字がまざっています。',
+    'きょうはあさからずっとあめがふっていて、そとにでるのがおっくうだった。',
+    'ちょっとまってね、いまからすぐにいくから、えきのまえでまっていてください。',
+    'あのね、きのうのよる、へんなゆめをみたんだけど、なんだかこわかったんだ。',
+    'コーヒーとケーキをたのんだら、おみせのひとがサービスでクッキーもくれました。',
+    'パソコンがうごかなくなったので、サポートセンターにでんわしてみた。',
+    'みんなでいっしょにうたをうたって、とてもたのしいいちにちになりました。',
+    'えいがをみにいくまえに、ちかくのカフェでかるく食事をした。',
+]
+
+# 조합용 조각
+_PARTICLES = ['が', 'を', 'に', 'で', 'と', 'は', 'も', 'から', 'まで', 'より']
+_ENDINGS = ['。', 'です。', 'ました。', 'でしょう。', 'ません。', 'ですか？', 'ようだ。', 'らしい。']
+_KANA = 'あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわん'
+_SIZES = {'1k': 1000, '10k': 10000, '100k': 100000, '500k': 500000}
+
+def parse_size(text):
+    # '1k', '10k', '100k', '500k' 또는 숫자
+    return _SIZES.get(text.lower()) or int(text)
+
+def _kana_run(rng, length):
+    return ''.join(rng.choice(_KANA) for _ in range(length))
+
+def _synthetic_parts(rng):
+    # 단어 2~5개를 조사로 이어 붙인 문장의 조각: [단어, 조사, 단어, 조사, ..., 어미]
+    parts = []
+    for _ in range(rng.randint(2, 5)):
+        parts.append(rng.choice(VOCABULARY))
+        parts.append(rng.choice(_PARTICLES))
+    parts.append(rng.choice(_ENDINGS))
+    return parts
+
+def _synthetic_sentence(rng):
+    return ''.join(_synthetic_parts(rng))
+
+def _synthetic_mixed(rng):
+    # 가나 덩어리 사이에 단어가 가끔 끼어드는 문장
+    parts = []
+    for _ in range(rng.randint(3, 6)):
+        parts.append(_kana_run(rng, rng.randint(4, 12)))
+        if rng.random() < 0.4:
+            parts.append(rng.choice(VOCABULARY))
+    parts.append(rng.choice(_ENDINGS))
+    return ''.join(parts)
+
+def make_rows(kind, size, seed=0):
+    """
+    kind 종류의 행을 size개 만든다. 먼저 수록 예문을 쓰고, 나머지는 조합해서 채운다.
+    단어장처럼 같은 단어가 반복되는 비율도 재현되도록 단어는 수록 목록에서만 뽑는다.
+    """
+    rng = random.Random(f'{kind}:{seed}')
+    rows = []
+    if kind == 'vocab':
+        for _ in range(size):
+            rows.append((rng.choice(VOCABULARY), ''))
+    elif kind == 'sentence':
+        rows.extend((text, '') for text in SENTENCES[:size])
+        while len(rows) < size:
+            rows.append((_synthetic_sentence(rng), ''))
+    elif kind == 'mixed':
+        rows.extend((text, '') for text in MIXED[:size])
+        while len(rows) < size:
+            rows.append((_synthetic_mixed(rng), ''))
+    elif kind == 'tuple':
+        while len(rows) < size:
+            word = rng.choice(VOCABULARY)
+            parts = _synthetic_parts(rng)
+            # 단어가 앞뒤 글자와 붙어 다른 말로 분석되지 않도록 "단어+조사"를 다른 단어 앞에만 끼워 넣음
+            position = rng.randrange(0, len(parts) - 1, 2)
+            parts[position:position] = [word, rng.choice(_PARTICLES)]
+            rows.append((''.join(parts), word))
+    else:
+        raise ValueError(f'unknown corpus: {kind}')
+    return rows
+
+CORPORA = ('vocab', 'sentence', 'mixed', 'tuple')
@@ -0,0 +1,37 @@
+"""
+벤치마크 전체 실행. 화면과 네트워크 없이 돌아가며, 같은 입력(고정 시드)으로 항상 같은 말뭉치를 만든다.
+
+    python benchmarks/run_benchmarks.py                      # 1k, 10k
+    python benchmarks/run_benchmarks.py --sizes 1k,10k,100k --json result.json
+    python benchmarks/run_benchmarks.py --only engine
+    python benchmarks/run_benchmarks.py --only columns --sizes 500k   # 열 데이터 메모리
+
+변경 전후 비교는 같은 기계에서 --json으로 저장한 결과를 나란히 보면 된다.
+"""
+import argparse
+
+import common
+import bench_engine, bench_files, bench_columns
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1k,10k', help='行数（例：1k,10k,100k）')
+    parser.add_argument('--only', choices=('engine', 'files', 'columns'), help='一つだけ実行')
+    parser.add_argument('--workers', type=int, default=1, help='ファイル処理の並列プロセス数')
+    parser.add_argument('--json', metavar='PATH', help='結果をJSONで保存')
+    args = parser.parse_args()
+
+    results = []
+    if args.only in (None, 'engine'):
+        results += bench_engine.main(['--sizes', args.sizes])
+        print()
+    if args.only in (None, 'files'):
+        results += bench_files.main(['--sizes', args.sizes, '--workers', str(args.workers)])
+        print()
+    if args.only in (None, 'columns'):
+        results += bench_columns.main(['--sizes', args.sizes])
+    if args.json:
+        common.write_json(results, args.json)
+
+if __name__ == '__main__':
+    main()
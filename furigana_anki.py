@@ -0,0 +1,187 @@
+import re, os, json, time, base64, hashlib, sqlite3, tempfile, zipfile
+
+# Anki 패키지(.apkg) 출력 -------------------------------------------------------------
+# 엑셀/csv에 후리가나를 다시 써서 Anki에서 따로 가져오는 대신, 변환 결과를 바로 Anki 패키지로 만든다.
+# 표준 라이브러리(sqlite3, zipfile)만으로 Anki가 가져올 수 있는 형식(collection.anki2, 스키마 11)을 쓴다.
+#
+#   with AnkiPackageWriter('deck.apkg', ['A', 'B'], furigana_fields=['B']) as writer:
+#       deck_id = writer.add_deck('deck')
+#       writer.add_notes(deck_id, [('deck:1', ['問題', '問題[もんだい]']), ...])
+#
+# 노트의 guid는 (덱 이름, 행 번호) 같은 키에서 만들기 때문에, 같은 파일을 다시 내보내 가져오면
+# Anki에서 새 노트가 늘어나지 않고 기존 노트가 갱신된다.
+ANKI_SCHEMA_VERSION = 11
+ANKI_INSERT_CHUNK = 5000 # executemany 한 번에 넣는 노트 수
+
+_SCHEMA = '''
+CREATE TABLE col (id integer primary key, crt integer not null, mod integer not null, scm integer not null,
+    ver integer not null, dty integer not null, usn integer not null, ls integer not null, conf text not null,
+    models text not null, decks text not null, dconf text not null, tags text not null);
+CREATE TABLE notes (id integer primary key, guid text not null, mid integer not null, mod integer not null,
+    usn integer not null, tags text not null, flds text not null, sfld integer not null, csum integer not null,
+    flags integer not null, data text not null);
+CREATE TABLE cards (id integer primary key, nid integer not null, did integer not null, ord integer not null,
+    mod integer not null, usn integer not null, type integer not null, queue integer not null, due integer not null,
+    ivl integer not null, factor integer not null, reps integer not null, lapses integer not null, left integer not null,
+    odue integer not null, odid integer not null, flags integer not null, data text not null);
+CREATE TABLE revlog (id integer primary key, cid integer not null, usn integer not null, ease integer not null,
+    ivl integer not null, lastIvl integer not null, factor integer not null, time integer not null, type integer not null);
+CREATE TABLE graves (usn integer not null, oid integer not null, type integer not null);
+CREATE INDEX ix_notes_usn ON notes (usn);
+CREATE INDEX ix_cards_usn ON cards (usn);
+CREATE INDEX ix_revlog_usn ON revlog (usn);
+CREATE INDEX ix_cards_nid ON cards (nid);
+CREATE INDEX ix_cards_sched ON cards (did, queue, due);
+CREATE INDEX ix_revlog_cid ON revlog (cid);
+CREATE INDEX ix_notes_csum ON notes (csum);
+'''
+
+_TAG_PATTERN = re.compile(r'<[^>]*>')
+
+def _stable_id(*parts):
+    # 이름에서 항상 같은 id를 만듦 (다시 내보내도 노트 유형, 덱이 새로 생기지 않도록). Anki id처럼 밀리초 시각 범위의 수
+    digest = hashlib.blake2b('\x00'.join(parts).encode('utf-8'), digest_size=8).digest()
+    return 1_000_000_000_000 + int.from_bytes(digest, 'big') % 1_000_000_000_000
+
+def note_guid(key):
+    return base64.b64encode(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()).decode('ascii').rstrip('=')
+
+def field_checksum(text):
+    # Anki의 csum: 태그를 뺀 첫 필드의 SHA1 앞 8자리 (중복 노트 찾기용)
+    return int(hashlib.sha1(_TAG_PATTERN.sub('', text).encode('utf-8')).hexdigest()[:8], 16)
+
+def _default_deck_config():
+    return {
+        'id': 1, 'name': 'Default', 'mod': 0, 'usn': 0, 'maxTaken': 60, 'autoplay': True, 'timer': 0,
+        'replayq': True, 'dyn': False,
+        'new': {'delays': [1, 10], 'ints': [1, 4, 7], 'initialFactor': 2500, 'order': 1, 'perDay': 20,
+                'bury': True, 'separate': True},
+        'rev': {'perDay': 200, 'ease4': 1.3, 'fuzz': 0.05, 'ivlFct': 1, 'maxIvl': 36500, 'bury': True, 'minSpace': 1},
+        'lapse': {'delays': [10], 'mult': 0, 'minInt': 1, 'leechFails': 8, 'leechAction': 0},
+    }
+
+def _deck(deck_id, name, now):
+    return {
+        'id': deck_id, 'name': name, 'mod': now, 'usn': -1, 'desc': '', 'dyn': 0, 'conf': 1, 'collapsed': False,
+        'extendNew': 10, 'extendRev': 50, 'newToday': [0, 0], 'revToday': [0, 0], 'lrnToday': [0, 0], 'timeToday': [0, 0],
+    }
+
+class AnkiPackageWriter:
+    """
+    Anki 패키지(.apkg) 하나를 만든다. 노트는 add_notes()로 묶음마다 넣고, close()에서 파일로 저장한다.
+    (예외로 빠져나가거나 abort()를 부르면 만들던 파일은 지워지고 기존 파일은 그대로 남음)
+
+    field_names     : 노트 필드 이름 (첫 필드가 앞면과 정렬 기준)
+    furigana_fields : 뒷면에서 {{furigana:필드}}로 보여줄 필드 (Anki 후리가나 형식으로 쓴 열)
+    """
+    def __init__(self, path, field_names, furigana_fields=(), model_name='Add furigana'):
+        self.path = path
+        self.field_names = list(field_names)
+        self.note_count = 0
+        self.decks = {}
+        self.now = int(time.time())
+        self._next_id = int(time.time() * 1000)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        handle, self.temp_path = tempfile.mkstemp(suffix='.anki2', dir=directory)
+        os.close(handle)
+        self.connection = sqlite3.connect(self.temp_path)
+        # 한 번 쓰고 압축할 임시 DB이므로 저널과 동기화를 끔
+        self.connection.execute('PRAGMA journal_mode = OFF')
+        self.connection.execute('PRAGMA synchronous = OFF')
+        self.connection.executescript(_SCHEMA)
+
+        fields = ','.join(self.field_names)
+        self.model_id = _stable_id('model', model_name, fields)
+        back = [f'{{{{furigana:{name}}}}}' if name in furigana_fields else f'{{{{{name}}}}}' for name in self.field_names[1:]]
+        self.model = {
+            'id': self.model_id, 'name': f'{model_name} ({fields})', 'type': 0, 'mod': self.now, 'usn': -1,
+            'sortf': 0, 'did': 1, 'tags': [], 'vers': [], 'req': [[0, 'any', [0]]],
+            'flds': [{'name': name, 'ord': i, 'sticky': False, 'rtl': False, 'font': 'Arial', 'size': 20, 'media': []}
+                     for i, name in enumerate(self.field_names)],
+            'tmpls': [{'name': 'Card 1', 'ord': 0, 'did': None, 'bqfmt': '', 'bafmt': '',
+                       'qfmt': f'{{{{{self.field_names[0]}}}}}',
+                       'afmt': '{{FrontSide}}\n\n<hr id=answer>\n\n' + '<br>\n'.join(back)}],
+            'css': '.card {\n font-family: arial;\n font-size: 20px;\n text-align: center;\n color: black;\n background-color: white;\n}\n',
+            'latexPre': '\\documentclass[12pt]{article}\n\\special{papersize=3in,5in}\n\\usepackage[utf8]{inputenc}\n'
+                        '\\usepackage{amssymb,amsmath}\n\\pagestyle{empty}\n\\setlength{\\parindent}{0in}\n\\begin{document}\n',
+            'latexPost': '\\end{document}',
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def add_deck(self, name):
+        deck_id = _stable_id('deck', name)
+        self.decks[deck_id] = _deck(deck_id, name, self.now)
+        return deck_id
+
+    def add_notes(self, deck_id, notes):
+        """notes: [(guid 키, [필드 값, ...]), ...] -- 묶음 하나를 트랜잭션 하나로 넣음"""
+        notes = list(notes)
+        note_rows = []
+        card_rows = []
+        for key, values in notes:
+            note_id = self._next_id
+            self._next_id += 1
+            values = ['' if value is None else str(value) for value in values]
+            sort_field = _TAG_PATTERN.sub('', values[0])
+            note_rows.append((note_id, note_guid(key), self.model_id, self.now, -1, '', '\x1f'.join(values),
+                              sort_field, field_checksum(values[0]), 0, ''))
+            # 새 카드: due는 새 카드 순서
+            card_rows.append((note_id, note_id, deck_id, 0, self.now, -1, 0, 0, self.note_count + len(card_rows) + 1,
+                              0, 0, 0, 0, 0, 0, 0, 0, ''))
+        with self.connection:
+            for i in range(0, len(note_rows), ANKI_INSERT_CHUNK):
+                self.connection.executemany('INSERT INTO notes VALUES (?,?,?,?,?,?,?,?,?,?,?)', note_rows[i:i+ANKI_INSERT_CHUNK])
+                self.connection.executemany('INSERT INTO cards VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)', card_rows[i:i+ANKI_INSERT_CHUNK])
+        self.note_count += len(note_rows)
+
+    def _write_collection(self):
+        now_ms = int(time.time() * 1000)
+        decks = {'1': _deck(1, 'Default', self.now)}
+        decks.update({str(deck_id): deck for deck_id, deck in self.decks.items()})
+        first_deck = next(iter(self.decks), 1)
+        self.model['did'] = first_deck
+        conf = {'nextPos': self.note_count + 1, 'estTimes': True, 'activeDecks': [first_deck], 'sortType': 'noteFld',
+                'timeLim': 0, 'sortBackwards': False, 'addToCur': True, 'curDeck': first_deck, 'newBury': True,
+                'newSpread': 0, 'dueCounts': True, 'curModel': str(self.model_id), 'collapseTime': 1200}
+        with self.connection:
+            self.connection.execute(
+                'INSERT INTO col VALUES (1, ?, ?, ?, ?, 0, 0, 0, ?, ?, ?, ?, ?)',
+                (self.now - self.now % 86400, now_ms, now_ms, ANKI_SCHEMA_VERSION, json.dumps(conf),
+                 json.dumps({str(self.model_id): self.model}, ensure_ascii=False), json.dumps(decks, ensure_ascii=False),
+                 json.dumps({'1': _default_deck_config()}), json.dumps({})))
+
+    def close(self):
+        # collection.anki2와 빈 media 목록을 .apkg(zip)로 묶고 원래 경로와 바꿈
+        if self.connection is None:
+            return
+        try:
+            self._write_collection()
+            self.connection.close()
+            self.connection = None
+            package_path = self.temp_path + '.apkg'
+            with zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as package:
+                package.write(self.temp_path, 'collection.anki2')
+                package.writestr('media', '{}')
+            os.replace(package_path, self.path)
+        finally:
+            self.abort()
+
+    def abort(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        for path in (self.temp_path, self.temp_path + '.apkg'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def summary(self):
+        return f'Ankiパッケージ：{os.path.basename(self.path)}（{self.note_count}件のノート）'
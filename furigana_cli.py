@@ -0,0 +1,124 @@
+import sys, os, glob, argparse, multiprocessing
+
+from furigana_job import parse_mixed_input, validate_columns, parse_sheet_names, find_workbooks, FuriganaBatch
+
+# 명령줄 실행 ------------------------------------------------------------------------
+# 화면 없이(야간 빌드 등) 변환할 때 사용. PyQt는 import하지 않는다.
+#   python -m furigana_cli --file deck.xlsx --columns "A,(E,G)" --kana katakana --overwrite
+#   python -m furigana_cli --file decks/ --sheets "*" --columns A    (폴더 안의 모든 파일, 모든 시트)
+#
+# 종료 코드
+EXIT_OK = 0            # 모든 파일 처리 완료
+EXIT_FILE_ERROR = 1    # 처리하지 못한 파일이 있음 (열 수 없음, 형식 오류, 다른 프로그램에서 열려 있음)
+EXIT_USAGE_ERROR = 2   # 인자 또는 열 입력이 잘못됨 (argparse 오류도 2)
+EXIT_NO_FILES = 3      # 지정한 경로에 해당하는 파일이 없음
+
+COLUMN_ERROR_MESSAGES = {
+    1: '入力した列に空白があります。',
+    2: '列の範囲が外れました。範囲はAからXFD列までです。',
+    3: '選択した列と出力する列が重なります。',
+    4: '括弧が閉じていません。',
+    5: '括弧の中に二つ以内の列を入力してください。',
+    6: '出力形式は anki、html、kana、json の中から選んでください。',
+}
+
+class JobOptions:
+    # FuriganaJob에 넘기는 설정 (GUI의 MainWindow와 같은 이름의 속성)
+    def __init__(self, args):
+        self.kana_mode = args.kana
+        self.overWrite_mode = args.overwrite
+        self.parallel_mode = args.workers > 1
+        self.worker_count = args.workers
+        self.cache_mode = not args.no_cache
+        self.stream_mode = args.stream
+        self.incremental_mode = args.incremental
+        self.profile_mode = args.profile or bool(args.trace)
+        self.trace_path = args.trace
+        self.sheet_names = parse_sheet_names(args.sheets)
+        self.apkg_mode = args.apkg
+        self.overrides_path = args.overrides
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='furigana_cli',
+        description='Excel(xlsx, xlsm)/csv ファイルの文字にフリガナを付けます。')
+    parser.add_argument('-f', '--file', action='append', required=True, metavar='PATH',
+                        help='処理するファイル。複数指定やワイルドカード（*.xlsx）、フォルダ（中のファイルを全て処理）も使えます。')
+    parser.add_argument('-c', '--columns', required=True,
+                        help='文字がある列。例）"A,C,(E,G)"。「:形式」で出力形式を選べます。例）"A:anki+kana"（形式：anki、html、kana、json）')
+    parser.add_argument('--sheets', metavar='NAMES',
+                        help='処理するシート（コンマ区切り、*で全てのシート）。省略するとアクティブシートだけ処理します。')
+    parser.add_argument('-k', '--kana', choices=('hiragana', 'katakana'), default='hiragana',
+                        help='フリガナの種類（既定：hiragana）')
+    parser.add_argument('-o', '--overwrite', action='store_true',
+                        help='出力する列に既にデータがあっても上書きします。')
+    parser.add_argument('--overrides', metavar='PATH',
+                        help='読み方辞書（1行に「表記<TAB>読み」）。辞書にある表記は形態素解析の代わりにその読みを使います。')
+    parser.add_argument('--apkg', action='store_true',
+                        help='元のファイルは変更せずに、フリガナを付けた結果をAnkiパッケージ（ファイル名.apkg）に出力します。')
+    parser.add_argument('-s', '--stream', action='store_true',
+                        help='大容量モード：ファイルを全部読み込まずに、行ごとに読み書きします。')
+    parser.add_argument('-i', '--incremental', action='store_true',
+                        help='差分モード：前回から文字が変わった行だけフリガナを付け直します。')
+    parser.add_argument('-w', '--workers', type=int, default=1, metavar='N',
+                        help='並列処理のプロセス数（既定：1＝並列処理なし）')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='変換結果のキャッシュを使いません。')
+    parser.add_argument('--profile', action='store_true',
+                        help='段階ごとの処理時間を表示します。')
+    parser.add_argument('--trace', metavar='PATH',
+                        help='段階ごとの処理時間をJSON（Chrome Trace形式）で保存します。複数のファイルは一つのトレースにまとめます。')
+    return parser
+
+def expand_files(patterns):
+    # 와일드카드와 폴더를 펼치고, 같은 파일이 두 번 처리되지 않도록 중복 제거 (순서 유지)
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            for filepath in (find_workbooks(path) if os.path.isdir(path) else [path]):
+                if filepath not in files:
+                    files.append(filepath)
+    return files
+
+def run_files(options, filepaths, columns):
+    # 모든 파일을 캐시, 프로세스 풀을 함께 쓰는 FuriganaBatch 하나로 처리
+    signals = []
+    batch = FuriganaBatch(options, filepaths, columns, notify=signals.append)
+    batch.run()
+    if signals == [1]:
+        # 덮어쓰기 확인: 명령줄에서는 --overwrite를 준 것 자체를 동의로 봄
+        batch.continue_process()
+    return batch
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.workers < 1:
+        print('--workers は1以上にしてください。', file=sys.stderr)
+        return EXIT_USAGE_ERROR
+
+    tuples, lists = parse_mixed_input(args.columns)
+    alert = validate_columns(tuples, lists) if (tuples or lists) else 1
+    if alert:
+        print(COLUMN_ERROR_MESSAGES[alert], file=sys.stderr)
+        return EXIT_USAGE_ERROR
+
+    files = expand_files(args.file)
+    if not files:
+        print('ファイルが見つかりません。', file=sys.stderr)
+        return EXIT_NO_FILES
+
+    batch = run_files(JobOptions(args), files, args.columns)
+    failed = 0
+    for filepath, signal, message in batch.results:
+        ok = signal == 3
+        print(f'[{filepath}]\n{message}\n', file=sys.stdout if ok else sys.stderr)
+        if not ok:
+            failed += 1
+    # 모든 파일의 합계 (캐시와 처리 시간의 내역은 여기에만 나옴)
+    print(batch.fault_message, file=sys.stderr if failed == len(files) else sys.stdout)
+    return EXIT_FILE_ERROR if failed else EXIT_OK
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
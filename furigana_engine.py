@@ -0,0 +1,761 @@
+import re, jaconv, os, threading, sqlite3, hashlib, time, json, html, multiprocessing
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+import furigana_profile
+from furigana_overrides import PhraseMatcher, load_overrides
+
+# 형태소 분석기 풀 ------------------------------------------------------------------
+# Tagger()는 생성될 때마다 사전(UniDic)을 새로 읽어들이므로
+# 스레드(프로세스)마다 하나씩만 만들어 두고 계속 재사용한다.
+# fugashi와 사전은 import만으로도 시간이 걸리므로 실제로 Tagger가 필요할 때 불러온다.
+TAGGER_DICTIONARY_PATH = None # None이면 fugashi 기본 사전(unidic_lite 등)을 사용
+_tagger_pool = threading.local()
+_warm_taggers = {} # warm_up_tagger()가 미리 만들어 둔 Tagger (사전 경로 -> Tagger)
+_warming = {} # 워밍업이 진행 중인 사전 경로 -> 끝나면 set되는 Event
+_warm_lock = threading.Lock()
+
+def set_tagger_dictionary(dictionary_path=None):
+    # 이후 get_tagger()가 기본으로 사용할 사전 경로 지정
+    global TAGGER_DICTIONARY_PATH
+    TAGGER_DICTIONARY_PATH = dictionary_path
+
+def get_tagger(dictionary_path=None):
+    """
+    현재 스레드에 할당된 Tagger를 반환. 처음 요청될 때만 생성(지연 생성)하고
+    이후에는 같은 객체를 돌려준다. 사전 경로가 다르면 경로별로 따로 보관한다.
+    """
+    if dictionary_path is None:
+        dictionary_path = TAGGER_DICTIONARY_PATH
+
+    taggers = getattr(_tagger_pool, 'taggers', None)
+    if taggers is None:
+        taggers = _tagger_pool.taggers = {}
+
+    tagger = taggers.get(dictionary_path)
+    if tagger is None:
+        tagger = _take_warm_tagger(dictionary_path)
+        if tagger is None:
+            tagger = _new_tagger(dictionary_path)
+        taggers[dictionary_path] = tagger
+    return tagger
+
+def _new_tagger(dictionary_path):
+    from fugashi import Tagger
+    if dictionary_path:
+        return Tagger(f'-d "{dictionary_path}"')
+    return Tagger()
+
+def _take_warm_tagger(dictionary_path):
+    # 미리 만들어 둔 Tagger가 있으면 처음 요청한 스레드가 넘겨받음 (한 스레드만 사용하도록 꺼내 감)
+    # 아직 워밍업 중이면 사전을 두 번 읽지 않도록 끝날 때까지 기다렸다가 넘겨받는다.
+    with _warm_lock:
+        done = _warming.get(dictionary_path)
+    if done is not None:
+        done.wait()
+    with _warm_lock:
+        return _warm_taggers.pop(dictionary_path, None)
+
+@contextmanager
+def tagger_warm_up(dictionary_path=None):
+    """
+    이 블록이 끝날 때까지 get_tagger()는 Tagger를 새로 만들지 않고 워밍업이 끝나기를 기다린다.
+    워밍업이 실패해도 블록을 빠져나가면 기다리던 스레드는 풀려나서 직접 Tagger를 만든다.
+    """
+    if dictionary_path is None:
+        dictionary_path = TAGGER_DICTIONARY_PATH
+    with _warm_lock:
+        owner = dictionary_path not in _warming # 바깥 블록이 이미 등록해 두었으면 그쪽이 끝냄
+        if owner:
+            _warming[dictionary_path] = threading.Event()
+        done = _warming[dictionary_path]
+    try:
+        yield
+    finally:
+        if owner:
+            with _warm_lock:
+                del _warming[dictionary_path]
+            done.set()
+
+def warm_up_tagger(dictionary_path=None):
+    """
+    백그라운드에서 fugashi와 사전을 미리 읽어 둔다. (GUI가 뜬 직후 등)
+    만든 Tagger는 그 다음에 get_tagger()를 부른 스레드가 그대로 이어받는다.
+    (읽는 도중에 get_tagger()를 부른 스레드는 끝날 때까지 기다렸다가 이어받는다.)
+    """
+    if dictionary_path is None:
+        dictionary_path = TAGGER_DICTIONARY_PATH
+    with tagger_warm_up(dictionary_path):
+        tagger = _new_tagger(dictionary_path)
+        tagger.parse('準備') # 첫 분석 때 읽히는 사전 페이지까지 미리 읽어 둠
+        with _warm_lock:
+            _warm_taggers.setdefault(dictionary_path, tagger)
+
+# 결과 캐시 (디스크) ---------------------------------------------------------------
+# 같은 단어장을 여러 번 돌릴 때 이미 변환한 셀은 다시 형태소 분석하지 않도록
+# (원문, 제외 단어, kana_mode, 사전 버전) -> 변환 결과 를 SQLite 파일에 저장해 둔다.
+# 변환 규칙이 바뀌어 결과가 달라지면 RESULT_CACHE_VERSION을 올려서 예전 결과를 무효화한다.
+RESULT_CACHE_VERSION = 5
+RESULT_CACHE_MAX_ENTRIES = 200000 # 이 개수를 넘으면 가장 오래 쓰이지 않은 결과부터 삭제
+
+def default_cache_path():
+    # Windows: %LOCALAPPDATA%, 그 외: $XDG_CACHE_HOME 또는 ~/.cache
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'Add_furigana_in_Excel_for_Anki', 'furigana_cache.sqlite3')
+
+def dictionary_version(tagger):
+    # 사전이 바뀌면 읽기가 달라질 수 있으므로 캐시 키에 사전 정보를 포함
+    return ';'.join(f"{os.path.basename(d['filename'])}:{d['version']}:{d['size']}" for d in tagger.dictionary_info)
+
+def reading_version(tagger):
+    # 캐시 키에 넣는 읽기 규칙 정보: 사전 + 읽기 덮어쓰기 사전(쓰는 경우에만, 안 쓰면 예전 키와 같음)
+    version = dictionary_version(tagger)
+    if READING_OVERRIDES is not None:
+        version += f';overrides:{READING_OVERRIDES.digest}'
+    return version
+
+class FuriganaResultCache:
+    """
+    변환 결과를 저장하는 디스크 캐시 (SQLite).
+    저장 개수가 max_entries를 넘으면 close() 때 가장 오래 쓰이지 않은(LRU) 항목부터 지운다.
+    hits / misses 에 이번 실행의 적중 통계가 남는다.
+    """
+    def __init__(self, path=None, max_entries=None):
+        self.path = path or default_cache_path()
+        self.max_entries = RESULT_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'key BLOB PRIMARY KEY, value TEXT NOT NULL, last_used INTEGER NOT NULL) WITHOUT ROWID')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS results_last_used ON results(last_used)')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def make_key(text, exclude_text, kana_mode, dictionary_version, output_format='anki'):
+        excluded = '\x01'.join(split_exclude_words(exclude_text))
+        fields = [str(RESULT_CACHE_VERSION), text, excluded, kana_mode, dictionary_version]
+        if output_format != 'anki': # anki 형식의 키는 예전과 같게 두어 기존 캐시를 그대로 사용
+            fields.append(output_format)
+        raw = '\x00'.join(fields)
+        return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).digest()
+
+    def get_many(self, keys):
+        # {키: 결과} 반환. 찾은 항목은 최근 사용 시각을 갱신
+        keys = list(keys)
+        found = {}
+        now = int(time.time())
+        for i in range(0, len(keys), 500): # SQLite 변수 개수 제한 때문에 나누어 조회
+            part = keys[i:i+500]
+            marks = ','.join('?' * len(part))
+            found.update(self.connection.execute(f'SELECT key, value FROM results WHERE key IN ({marks})', part))
+            self.connection.execute(f'UPDATE results SET last_used = ? WHERE key IN ({marks})', [now, *part])
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        now = int(time.time())
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO results (key, value, last_used) VALUES (?, ?, ?)',
+            ((key, value, now) for key, value in items))
+
+    def process(self, texts, excludes, kana_mode, dictionary_version, convert, formats=('anki',)):
+        """
+        캐시에 있는 셀은 저장된 결과를 쓰고, 없는 셀만 convert(texts, excludes)로 변환해 저장.
+        결과는 입력 순서대로, 셀마다 formats 순서의 튜플로 반환한다.
+        convert도 같은 모양(셀마다 formats 튜플)의 리스트를 반환해야 한다.
+        형식 중 하나라도 캐시에 없는 셀은 모든 형식을 한 번에 다시 만든다. (형태소 분석은 셀당 한 번)
+        """
+        pairs = [(text, exclude_text or '') for text, exclude_text in zip(texts, excludes)]
+        keys = {pair: tuple(self.make_key(*pair, kana_mode, dictionary_version, output_format) for output_format in formats)
+                for pair in dict.fromkeys(pairs)}
+        with furigana_profile.stage('キャッシュ検索'):
+            found = self.get_many(key for pair_keys in keys.values() for key in pair_keys)
+
+        done = {pair: tuple(found[key] for key in pair_keys)
+                for pair, pair_keys in keys.items() if all(key in found for key in pair_keys)}
+        missing = [pair for pair in keys if pair not in done]
+        if missing:
+            converted = convert([pair[0] for pair in missing], [pair[1] for pair in missing])
+            done.update(zip(missing, converted))
+            with furigana_profile.stage('キャッシュ保存'):
+                self.put_many(item for pair, values in zip(missing, converted) for item in zip(keys[pair], values))
+
+        return [done[pair] for pair in pairs]
+
+    def close(self):
+        if self.connection is None:
+            return
+        # 크기 제한: 오래 쓰이지 않은 결과부터 삭제
+        count = self.connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        if count > self.max_entries:
+            self.connection.execute(
+                'DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used LIMIT ?)',
+                (count - self.max_entries,))
+        self.connection.commit()
+        self.connection.close()
+        self.connection = None
+
+    def summary(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0
+        return f'キャッシュ：ヒット{self.hits}件／ミス{self.misses}件（ヒット率{rate:.1f}%）'
+
+# 토큰 단위 캐시 (메모리) ------------------------------------------------------------
+# 단어장에는 같은 단어가 수천 번 반복되므로, 토큰의 읽기(kana) 추출과
+# align_word_with_furigana() 결과를 실행 중에 계속 재사용한다. (프로세스 안의 모든 셀이 공유)
+TOKEN_CACHE_SIZE = 50000 # 캐시마다 보관할 최대 항목 수
+
+class TokenCache:
+    """
+    크기 제한이 있는 LRU 캐시.
+    hits / misses 를 보고 TOKEN_CACHE_SIZE(set_token_cache_size)를 조정할 수 있다.
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+        self.hits = self.misses = 0
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data), 'maxsize': self.maxsize}
+
+_reading_cache = TokenCache(TOKEN_CACHE_SIZE)  # (token.feature_raw, kana_mode) -> 후리가나 ('' = 읽기 없음)
+_aligned_cache = TokenCache(TOKEN_CACHE_SIZE)  # (단어, 후리가나, kana_mode) -> 블록별 세그먼트 튜플
+_lemma_cache = TokenCache(TOKEN_CACHE_SIZE)    # token.feature_raw -> 기본형 (제외 단어가 있는 행에서만 사용)
+
+def set_token_cache_size(size):
+    # 캐시 크기 변경 (기존 내용과 통계는 비움)
+    global TOKEN_CACHE_SIZE
+    TOKEN_CACHE_SIZE = size
+    for cache in (_reading_cache, _aligned_cache, _lemma_cache):
+        cache.maxsize = size
+        cache.clear()
+
+def token_cache_stats():
+    # 튜닝용 통계: {'reading': {...}, 'align': {...}, 'lemma': {...}}
+    return {'reading': _reading_cache.info(), 'align': _aligned_cache.info(), 'lemma': _lemma_cache.info()}
+
+# 읽기 덮어쓰기 사전 ----------------------------------------------------------------
+# set_reading_overrides(경로)로 지정하면 이후 모든 변환에서 사전의 표기는 그 읽기를 쓴다. (furigana_overrides 참고)
+READING_OVERRIDES = None      # 지금 쓰는 ReadingOverrides (None이면 덮어쓰기 없음)
+READING_OVERRIDES_PATH = None # 병렬 처리의 작업자 프로세스에 넘길 파일 경로
+
+def set_reading_overrides(path=None):
+    """
+    읽기 덮어쓰기 사전을 지정 (None이면 해제). 파일을 읽을 수 없으면 OSError, UnicodeDecodeError
+    컴파일 결과는 결과 캐시와 같은 폴더에 저장해 두고 다음부터 재사용한다.
+    """
+    global READING_OVERRIDES, READING_OVERRIDES_PATH
+    if not path:
+        READING_OVERRIDES = READING_OVERRIDES_PATH = None
+        return
+    READING_OVERRIDES = load_overrides(path, os.path.dirname(default_cache_path()))
+    READING_OVERRIDES_PATH = path
+
+def conversion_version(tagger=None):
+    # 변환 결과를 정하는 규칙 정보: 결과 캐시 키와 같은 입력 (RESULT_CACHE_VERSION, 사전, 읽기 덮어쓰기 사전). 差分モード의 지문에 넣음
+    return f'{RESULT_CACHE_VERSION};{reading_version(tagger or get_tagger())}'
+
+# 후리가나 붙이기 ------------------------------------------------------------------
+# 한자(漢字)로 취급할 문자
+#   IDEOGRAPHS : CJK 통합 한자, 확장 A, 호환 한자, 확장 B 이후(보조 평면)
+#   KANJI_MARKS: 한자 사이에서 한자처럼 읽히는 기호 (々 〻 〆 〇 ヵ ヶ) 예) 人々, 〆切, 一ヶ月, 霞ヶ関
+IDEOGRAPHS = '\u3400-\u4DBF\u4E00-\u9FFF\uF900-\uFAFF\U00020000-\U0003134F'
+KANJI_MARKS = '々〻〆〇ヵヶ'
+
+# 한 번만 컴파일해서 모든 셀, 모든 토큰이 공유
+IDEOGRAPH_PATTERN = re.compile(f'[{IDEOGRAPHS}]')
+KANJI_PATTERN = re.compile(f'[{IDEOGRAPHS}{KANJI_MARKS}]')
+# 문자열 전체를 한 번 훑어서 '한자 블록(K)'과 '그 외 블록(H)'으로 나눔
+BLOCK_PATTERN = re.compile(f'(?P<K>[{IDEOGRAPHS}{KANJI_MARKS}]+)|(?P<H>[^{IDEOGRAPHS}{KANJI_MARKS}]+)')
+
+def split_into_blocks(word: str):
+    """
+    주어진 문자열(word)을 '연속된 한자' 블록(K)과
+    '연속된 그 외 문자(주로 히라가나 등)' 블록(H)으로 나누어 리스트로 반환.
+    
+    예: 
+        "問題視する" -> [("K", "問題視"), ("H", "する")]
+        "ご飯" -> [("H", "ご"), ("K", "飯")]
+        "忘れ去る" -> [("K", "忘"), ("H", "れ"), ("K", "去"), ("H", "る")]
+        "一ヶ月" -> [("K", "一ヶ月")]
+    """
+    return [(m.lastgroup, m.group()) for m in BLOCK_PATTERN.finditer(word)]
+
+
+# 세그먼트 ---------------------------------------------------------------------------
+# 변환 결과는 먼저 (표기, 읽기) 세그먼트 리스트로 만들고, 마지막에 한 번만 문자열로 출력한다.
+#   읽기가 None인 세그먼트 : 그대로 출력하는 문자 (히라가나, 기호 등)
+#   읽기가 있는 세그먼트   : 후리가나를 붙일 한자 블록
+#   SPACE                 : Anki 후리가나 형식의 구분 공백 (토큰 표기에는 공백이 들어가지 않으므로 원문의 공백과 겹치지 않음)
+# 다른 형식(HTML ruby 등)으로 출력할 때는 SPACE를 건너뛰면 된다.
+SPACE = (' ', None)
+READING_PATTERN = re.compile(r'[ぁ-んァ-ン]+') # 블록 단위로 나눌 수 있는 읽기 (ー, ゔ 등이 섞이면 단어 전체에 그대로 붙임)
+
+def align_word_segments(word: str, reading: str, kana_mode='hiragana'):
+    """
+    align_word_with_furigana()와 같은 규칙으로 word를 한자 블록별 세그먼트 튜플로 나눈다.
+    예) "忘れ去る" + "わすれさる" -> (("忘", "わす"), ("れ", None), SPACE, ("去", "さ"), ("る", None))
+    """
+    # 가타카나 모드일 경우 히라가나로 변환
+    if kana_mode == 'katakana':
+        reading = jaconv.kata2hira(reading)
+
+    # 결과 세그먼트를 쌓을 리스트
+    result = []
+    cnt = 0
+
+    # 단어에 ・ 또는 ∙ 이 있을경우 분리
+    for x in word.split('・'):
+        for y in x.split('∙'):
+            if cnt != 0:
+                result.append(('・', None))
+                result.append(SPACE)
+
+            # 1) 단어를 블록 리스트로 분할
+            blocks = split_into_blocks(y)
+            
+            # reading 소비 인덱스
+            r_idx = 0
+            prev_type = None
+            
+            for i, (btype, btext) in enumerate(blocks):
+                if btype == 'H':
+                    # H(히라가나/기타) 블록: reading에서도 btext가 일치하면 소비, 아니면 원문만 출력
+                    length = len(btext)
+                    if reading[r_idx:r_idx+length] == btext:
+                        r_idx += length
+                    result.append((btext, None))
+                    prev_type = 'H'
+                
+                else:
+                    # K(한자) 블록
+                    # 다음 블록이 H라면 그 문자열이 reading에서 r_idx 이후 처음 나오는 위치 직전까지를 할당
+                    pos_next = -1
+                    if (i + 1) < len(blocks):
+                        next_btype, next_btext = blocks[i+1]
+                        if next_btype == 'H' and next_btext:
+                            pos_next = reading.find(next_btext, r_idx)
+                    
+                    if pos_next >= 0:
+                        allocated = reading[r_idx:pos_next]
+                        r_idx = pos_next
+                    else:
+                        # 없다면 남은 reading 전부 할당
+                        allocated = reading[r_idx:]
+                        r_idx = len(reading)
+                    
+                    # 앞 블록이 H였으면 한자 블록 앞에 공백 삽입
+                    if prev_type == 'H' and result and result[-1] != SPACE:
+                        result.append(SPACE)
+                    
+                    if allocated:
+                        result.append((btext, jaconv.hira2kata(allocated) if kana_mode == 'katakana' else allocated))
+                    else:
+                        # 후리가나가 아예 없으면 그냥 한자 블록만 출력
+                        result.append((btext, None))
+                    
+                    prev_type = 'K'
+
+            cnt+=1
+            
+    return tuple(result)
+
+def render_anki(segments):
+    # 세그먼트 -> Anki 후리가나 형식 문자열 ("問題[もんだい] 視[し]する")
+    return ''.join(text if reading is None else f'{text}[{reading}]' for text, reading in segments)
+
+def render_html(segments):
+    # 세그먼트 -> HTML ruby ("<ruby><rb>問題</rb><rt>もんだい</rt></ruby><ruby><rb>視</rb><rt>し</rt></ruby>する")
+    parts = []
+    for text, reading in segments:
+        if reading is not None:
+            parts.append(f'<ruby><rb>{html.escape(text)}</rb><rt>{html.escape(reading)}</rt></ruby>')
+        elif (text, reading) != SPACE:
+            parts.append(html.escape(text, quote=False))
+    return ''.join(parts)
+
+def render_kana(segments):
+    # 세그먼트 -> 읽기만 ("もんだいしする"). 읽기를 붙이지 않은 부분(제외 단어 등)은 표기 그대로
+    return ''.join(text if reading is None else reading for text, reading in segments if (text, reading) != SPACE)
+
+def render_json(segments):
+    # 세그먼트 -> JSON 배열 ('[["問題","もんだい"],["視","し"],["する",null]]'). 이어진 읽기 없는 부분은 하나로 합침
+    merged = []
+    for text, reading in segments:
+        if (text, reading) == SPACE:
+            continue
+        if reading is None and merged and merged[-1][1] is None:
+            merged[-1][0] += text
+        else:
+            merged.append([text, reading])
+    return json.dumps(merged, ensure_ascii=False, separators=(',', ':'))
+
+# 출력 형식 이름 -> 세그먼트 출력 함수 (열 입력의 "A:anki+html" 에서 쓰는 이름)
+RENDERERS = {
+    'anki': render_anki,
+    'html': render_html,
+    'kana': render_kana,
+    'json': render_json,
+}
+
+def align_word_with_furigana(word: str, reading: str, kana_mode='hiragana') -> str:
+    """
+    word(실제 표기)와 reading(전체 후리가나)을 받아
+    다음 예시처럼 한자 블록마다 후리가나를 할당하여 변환:
+    
+    1) "ご飯" + "ごはん"            -> "ご 飯[はん]"
+    2) "忘れ去る" + "わすれさる"    -> "忘[わす]れ 去[さ]る"
+    3) "問題視する" + "もんだいしする" -> "問題[もんだい] 視[し]する"
+    
+    구현 아이디어(단순/예시용):
+    - word를 '연속된 한자(K) / 그 외(H)' 블록 리스트로 분할
+    - reading에서 각 블록에 대응하는 후리가나를 조금씩 소진하면서 할당
+        * 한자(K) 블록은 그 다음 블록(특히 H 블록)이 reading 상에 등장하기 직전까지를 통째로 할당
+        * H 블록은 가능하면 reading에서도 동일하게 소진(예: 'ご' ↔ 'ご')
+    - 블록 사이에서 K→H, H→K 등으로 전환될 때 적절히 공백 삽입
+    """
+    return render_anki(align_word_segments(word, reading, kana_mode))
+
+# 제외 단어 ------------------------------------------------------------------------
+# (단어 열, 문장 열)에서는 문장 속의 "그 단어"에만 후리가나를 붙이지 않는다. (읽기가 답이 되지 않도록)
+# 단어 열의 셀에는 단어가 여러 개 있을 수 있으므로(공백, 、 , / 등으로 구분) 행의 단어들로 PhraseMatcher를 만들어
+#   * 단어의 표기가 그대로 나오고 양 끝이 토큰 경계에 맞는 곳 (京都를 빼도 東京都는 그대로)
+#   * 토큰 기본형(lemma)의 열이 단어와 같은 곳 (활용형: 食べる -> 食べた, 勉強する -> 勉強した)
+# 에 걸친 토큰만 제외한다. 한자 하나가 같다고 다른 단어까지 제외하지 않고, 문장을 두 번 훑을 뿐이라 단어가 많아도 선형 시간.
+EXCLUDE_SEPARATOR_PATTERN = re.compile(r'[\s,，、;；/／]+')
+EXCLUSION_CACHE_SIZE = 1000 # 행마다 만든 WordExclusion을 보관할 개수 (같은 단어가 여러 행에 나올 때 재사용)
+
+_exclusion_cache = TokenCache(EXCLUSION_CACHE_SIZE)  # (제외 단어 튜플, Tagger) -> WordExclusion
+
+def split_exclude_words(exclude_text):
+    # 제외 단어 셀 -> 중복을 뺀 단어 튜플 (정렬해 두어 결과 캐시의 키로도 사용)
+    return tuple(sorted({word for word in EXCLUDE_SEPARATOR_PATTERN.split(exclude_text or '') if word}))
+
+def _token_lemma(token):
+    # 토큰의 기본형. feature 파싱을 줄이려고 속성 문자열마다 캐시 ('' = 사전에 없는 단어: 표기 그대로)
+    lemma = _lemma_cache.get(token.feature_raw)
+    if lemma is None:
+        lemma = token.feature.lemma or ''
+        _lemma_cache.put(token.feature_raw, lemma)
+    return lemma or token.surface
+
+class WordExclusion:
+    """
+    한 행의 제외 단어들. excluded(text, pieces)로 문장 조각 중 읽기를 붙이지 않을 것을 찾는다.
+    """
+    def __init__(self, words, tagger):
+        self.surfaces = PhraseMatcher(words)
+        # 단어마다 형태소 분석한 기본형의 열 (食べる -> ('食べる',), 勉強する -> ('勉強', '為る'))
+        self.lemmas = PhraseMatcher({tuple(_token_lemma(token) for token in tagger(word)) for word in words})
+
+    def excluded(self, text, pieces):
+        """pieces: 문장을 순서대로 나눈 [(시작, 끝, 표기, 읽기, 기본형)] -> 제외할 조각의 번호 집합"""
+        excluded = set()
+        # 표기가 그대로 나오는 범위 중 양 끝이 조각 경계에 맞는 것만, 그 범위의 조각을 모두 제외
+        starts = {piece[0]: i for i, piece in enumerate(pieces)}
+        ends = {piece[1]: i for i, piece in enumerate(pieces)}
+        for start, end in self.surfaces.spans(text, True, starts.keys() | ends.keys()):
+            if start in starts and end in ends:
+                excluded.update(range(starts[start], ends[end] + 1))
+        for start, end in self.lemmas.spans([piece[4] for piece in pieces], True):
+            excluded.update(range(start, end))
+        return excluded
+
+def _word_exclusion(exclude_text, tagger):
+    # exclude_text의 단어로 만든 WordExclusion (단어가 없으면 None)
+    words = split_exclude_words(exclude_text)
+    if not words:
+        return None
+    # Tagger 자체를 키로 씀 (id()는 Tagger가 사라진 뒤 다른 객체에 다시 쓰일 수 있음)
+    key = (words, tagger)
+    exclusion = _exclusion_cache.get(key)
+    if exclusion is None:
+        exclusion = WordExclusion(words, tagger)
+        _exclusion_cache.put(key, exclusion)
+    return exclusion
+
+def _token_reading(token, kana_mode):
+    # token.feature는 호출할 때마다 속성 전체를 파싱하므로, 같은 속성 문자열이면 캐시된 읽기 사용
+    key = (token.feature_raw, kana_mode)
+    reading = _reading_cache.get(key)
+    if reading is None:
+        kana = token.feature.kana
+        if not kana:
+            reading = ''
+        elif kana_mode == 'katakana':
+            reading = kana
+        else:  # 기본: 히라가나
+            reading = jaconv.kata2hira(kana)
+        _reading_cache.put(key, reading)
+    return reading
+
+def _word_segments(surface, reading, kana_mode):
+    # 한 토큰의 블록별 세그먼트 (같은 단어는 캐시된 결과 사용)
+    key = (surface, reading, kana_mode)
+    aligned = _aligned_cache.get(key)
+    if aligned is None:
+        if READING_PATTERN.fullmatch(reading):
+            aligned = align_word_segments(surface, reading, kana_mode)
+        else:
+            aligned = ((surface, reading),)
+        _aligned_cache.put(key, aligned)
+    return aligned
+
+def _append_token_pieces(pieces, text, offset, kana_mode, tagger, with_lemma):
+    # text(문장의 offset 위치부터)를 형태소 분석하여 토큰마다 (시작, 끝, 표기, 읽기, 기본형) 조각을 pieces에 추가
+    profiler = furigana_profile.current()
+    if profiler is None:
+        tokens = tagger(text)
+    else:
+        start = time.perf_counter()
+        tokens = tagger(text)
+        profiler.add('形態素解析', time.perf_counter() - start)
+
+    pos = offset
+    for token in tokens:
+        surface = token.surface
+        start = pos + len(token.white_space) # 토큰 앞의 공백은 표기에 들어가지 않음
+        pos = start + len(surface)
+        # 한자가 없으면(히라가나, 가타카나, 알파벳 등) 읽기 없음
+        reading = _token_reading(token, kana_mode) if KANJI_PATTERN.search(surface) else ''
+        pieces.append((start, pos, surface, reading, _token_lemma(token) if with_lemma else None))
+
+def _apply_overrides(pieces, text, overrides, kana_mode):
+    # 읽기 덮어쓰기 사전의 표기 중 양 끝이 토큰 경계에 맞는 것만 찾아, 그 범위의 조각들을 사전의 읽기를 가진 조각 하나로 바꿈
+    starts = {piece[0]: i for i, piece in enumerate(pieces)}
+    ends = {piece[1]: i for i, piece in enumerate(pieces)}
+    matches = overrides.find(text, starts.keys() | ends.keys())
+    if not matches:
+        return pieces
+    result = []
+    i = 0
+    for start, end, reading in matches:
+        if start not in starts or end not in ends: # 토큰 앞 공백에서 시작하거나 끝나는 경우
+            continue
+        result.extend(pieces[i:starts[start]])
+        surface = text[start:end]
+        if not KANJI_PATTERN.search(surface):
+            reading = ''
+        elif kana_mode == 'katakana':
+            reading = jaconv.hira2kata(reading)
+        result.append((start, end, surface, reading, surface))
+        i = ends[end] + 1
+    result.extend(pieces[i:])
+    return result
+
+def segment_japanese_text(text, exclude_text='', kana_mode='hiragana', tagger=None):
+    """
+    문장을 형태소 분석하여 (표기, 읽기) 세그먼트 리스트로 반환. (세그먼트 형식은 SPACE 위 설명 참고)
+    한자가 들어간 토큰마다 앞에 SPACE를 두고, 토큰 안에서는 한자 블록별로 읽기를 나눈다.
+    exclude_text의 단어(활용형 포함)에 해당하는 토큰에는 읽기를 붙이지 않는다. (WordExclusion 참고)
+    읽기 덮어쓰기 사전(set_reading_overrides)이 있으면, 양 끝이 토큰 경계에 맞는 사전의 표기는 그 토큰들 대신 사전의 읽기를 쓴다.
+    """
+    if tagger is None:
+        tagger = get_tagger()
+
+    exclusion = _word_exclusion(exclude_text, tagger)
+    with_lemma = exclusion is not None
+
+    # 문장 전체를 형태소 분석하여 (시작, 끝, 표기, 읽기, 기본형) 조각으로 나눔
+    pieces = []
+    _append_token_pieces(pieces, text, 0, kana_mode, tagger, with_lemma)
+    if READING_OVERRIDES is not None and pieces:
+        pieces = _apply_overrides(pieces, text, READING_OVERRIDES, kana_mode)
+
+    excluded = exclusion.excluded(text, pieces) if with_lemma else ()
+    segments = []
+    for i, (_, _, surface, reading, _) in enumerate(pieces):
+        # 제외 단어이거나 읽기가 없으면 그대로
+        if not reading or i in excluded:
+            segments.append((surface, None))
+        else:
+            segments.append(SPACE)
+            segments.extend(_word_segments(surface, reading, kana_mode))
+
+    # 문장 맨 앞의 구분 공백은 제거
+    if segments and segments[0] == SPACE:
+        del segments[0]
+    return segments
+
+def process_japanese_text(text, exclude_text='', kana_mode='hiragana', tagger=None, cache=None):
+    # tagger를 직접 넘기면 그것을 사용하고, 없으면 현재 스레드의 공용 Tagger를 사용
+    if tagger is None:
+        tagger = get_tagger()
+
+    # cache(FuriganaResultCache)가 있으면 형태소 분석 전에 먼저 찾아봄
+    if cache is not None:
+        return process_japanese_texts([text], [exclude_text], kana_mode, tagger, cache)[0]
+
+    return _render_one(text, exclude_text, kana_mode, tagger, ('anki',))[0]
+
+def _render_one(text, exclude_text, kana_mode, tagger, formats):
+    # 형태소 분석은 한 번만 하고, 같은 세그먼트를 formats의 각 형식으로 출력한 튜플을 반환
+    profiler = furigana_profile.current()
+    if profiler is None:
+        segments = segment_japanese_text(text, exclude_text, kana_mode, tagger)
+        return tuple(RENDERERS[output_format](segments) for output_format in formats)
+
+    # 계측 중: 세그먼트 만들기(형태소 분석 포함)와 문자열 출력을 나누어 기록
+    start = time.perf_counter()
+    segments = segment_japanese_text(text, exclude_text, kana_mode, tagger)
+    profiler.add('segment_japanese_text', time.perf_counter() - start)
+    values = []
+    for output_format in formats:
+        start = time.perf_counter()
+        values.append(RENDERERS[output_format](segments))
+        profiler.add(f'render_{output_format}', time.perf_counter() - start)
+    return tuple(values)
+
+def render_japanese_texts(texts, excludes=None, formats=('anki',), kana_mode='hiragana', tagger=None, cache=None):
+    """
+    여러 셀을 한 번에 변환하여, 셀마다 formats(RENDERERS의 이름) 순서의 결과 튜플을 입력 순서대로 반환.
+    셀마다 형태소 분석은 한 번만 하고 그 세그먼트를 각 형식으로 출력한다.
+    예) formats=('anki', 'kana') -> [("問題[もんだい]", "もんだい"), ...]
+    """
+    if tagger is None:
+        tagger = get_tagger()
+    if excludes is None:
+        excludes = [''] * len(texts)
+    formats = tuple(formats)
+
+    if cache is not None:
+        return cache.process(texts, excludes, kana_mode, reading_version(tagger),
+                             lambda _texts, _excludes: render_japanese_texts(_texts, _excludes, formats, kana_mode, tagger),
+                             formats)
+
+    results = []
+    done = {} # 같은 열 안에서 반복되는 (문자열, 제외 단어)는 한 번만 변환
+    for text, exclude_text in zip(texts, excludes):
+        key = (text, exclude_text or '')
+        converted = done.get(key)
+        if converted is None:
+            converted = done[key] = _render_one(text, exclude_text, kana_mode, tagger, formats)
+        results.append(converted)
+    return results
+
+def process_japanese_texts(texts, excludes=None, kana_mode='hiragana', tagger=None, cache=None):
+    """
+    여러 셀(한 열 전체 등)을 한 번에 변환하여 입력 순서대로 결과 리스트를 반환.
+    결과는 셀마다 process_japanese_text()를 호출한 것과 같다.
+
+    texts    : 변환할 문자열 리스트
+    excludes : texts와 같은 길이의 제외 단어 리스트 (None이면 모두 제외 없음)
+    cache    : FuriganaResultCache (있으면 캐시에 없는 셀만 변환)
+    """
+    return [values[0] for values in render_japanese_texts(texts, excludes, ('anki',), kana_mode, tagger, cache)]
+'''
+japanese_text = "詐欺に遭い憤った被害者達が会社を相手に抗議活動を行った。あの人が言うと、褒め言葉も嫌味に聞こえる。"
+print(process_japanese_text(japanese_text))
+'''
+
+# 병렬 처리 (프로세스 풀) ------------------------------------------------------------
+# 작업자 프로세스마다 자기 Tagger를 하나씩 가지고, 행을 나눈 조각(chunk)을 받아 변환한다.
+# 입력이 적을 때는 프로세스를 띄우는 비용이 더 크므로 직렬로 처리한다.
+PARALLEL_MIN_ROWS = 2000   # 이 행 수 미만이면 직렬 처리
+PARALLEL_CHUNK_ROWS = 500  # 작업자에게 한 번에 넘기는 최대 행 수
+
+def _init_worker(dictionary_path, overrides_path=None):
+    # 작업자 프로세스 시작 시 한 번만 실행: 사전 경로, 읽기 덮어쓰기 사전(컴파일된 캐시에서 읽음) 지정 후 Tagger 미리 생성
+    set_tagger_dictionary(dictionary_path)
+    set_reading_overrides(overrides_path)
+    get_tagger()
+
+def _process_chunk(chunk):
+    texts, excludes, formats, kana_mode = chunk
+    return render_japanese_texts(texts, excludes, formats, kana_mode)
+
+class FuriganaProcessPool:
+    """
+    여러 코어로 후리가나를 붙이는 프로세스 풀.
+    프로세스는 처음 필요할 때 만들어지고, close()(또는 with 블록 종료)까지 재사용된다.
+
+    workers    : 작업자 프로세스 수 (None이면 CPU 코어 수)
+    min_rows   : 이 행 수 미만이면 프로세스를 쓰지 않고 현재 프로세스에서 직렬 처리
+    """
+    def __init__(self, workers=None, dictionary_path=None, min_rows=None, chunk_rows=None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.dictionary_path = dictionary_path
+        self.min_rows = PARALLEL_MIN_ROWS if min_rows is None else min_rows
+        self.chunk_rows = PARALLEL_CHUNK_ROWS if chunk_rows is None else chunk_rows
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def process_japanese_texts(self, texts, excludes=None, kana_mode='hiragana', cache=None):
+        """process_japanese_texts()와 같은 결과를 입력 순서대로 반환"""
+        return [values[0] for values in self.render_japanese_texts(texts, excludes, ('anki',), kana_mode, cache)]
+
+    def render_japanese_texts(self, texts, excludes=None, formats=('anki',), kana_mode='hiragana', cache=None):
+        """render_japanese_texts()와 같은 결과를 입력 순서대로 반환"""
+        texts = list(texts)
+        formats = tuple(formats)
+        if excludes is None:
+            excludes = [''] * len(texts)
+        else:
+            excludes = list(excludes)
+
+        # 캐시 조회는 현재 프로세스에서 하고, 캐시에 없는 셀만 작업자에게 보냄
+        if cache is not None:
+            return cache.process(texts, excludes, kana_mode, reading_version(get_tagger(self.dictionary_path)),
+                                 lambda _texts, _excludes: self.render_japanese_texts(_texts, _excludes, formats, kana_mode),
+                                 formats)
+
+        # 작업자가 1개이거나 입력이 적으면 직렬 처리
+        if self.workers == 1 or len(texts) < self.min_rows:
+            return render_japanese_texts(texts, excludes, formats, kana_mode, get_tagger(self.dictionary_path))
+
+        if self._executor is None:
+            # fork는 QThread 등 다른 스레드가 잡고 있던 잠금까지 복사해 작업자가 멈출 수 있으므로 어느 OS에서나 spawn
+            # (작업자에 필요한 상태는 _init_worker가 모두 다시 만듦)
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=_init_worker, initargs=(self.dictionary_path, READING_OVERRIDES_PATH))
+
+        # 작업자마다 여러 조각이 돌아가도록 나누되, 한 조각이 너무 커지지 않게 제한
+        size = max(1, min(self.chunk_rows, -(-len(texts) // (self.workers * 4))))
+        chunks = [(texts[i:i+size], excludes[i:i+size], formats, kana_mode) for i in range(0, len(texts), size)]
+
+        # executor.map은 입력 순서대로 결과를 돌려주므로 행 순서가 유지된다
+        results = []
+        for converted in self._executor.map(_process_chunk, chunks):
+            results.extend(converted)
+        return results
@@ -0,0 +1,902 @@
+import re, os, sys, io, csv, json, html, shutil, hashlib, tempfile, time, zipfile, posixpath, bisect, itertools
+
+from array import array
+
+import xml.etree.ElementTree as ET
+
+#-----------------------------------------------------------------------------------
+def column_to_number(column_name):
+    # 엑셀 열 이름을 숫자로 변환
+    column_number = 0
+    for i, char in enumerate(reversed(column_name.upper())):
+        column_number += (ord(char) - ord('A') + 1) * (26 ** i)
+    return column_number
+
+def number_to_column(column_number):
+    # 숫자를 엑셀 열 이름으로 변환
+    column_name = []
+    while column_number > 0:
+        column_number -= 1  # 1을 빼서 0부터 시작하도록 조정
+        column_name.append(chr(column_number % 26 + ord('A')))
+        column_number //= 26
+    return ''.join(reversed(column_name))
+
+# 열 데이터 -------------------------------------------------------------------------
+# 수십만 행의 열을 [(행 번호, 문자열), ...]로 들고 있으면 행마다 튜플, int, str 객체가 생겨
+# 객체 머리(header)와 포인터만으로도 행당 150바이트 이상을 쓴다. ColumnData는 행 번호를 정수 배열에,
+# 문자열은 하나로 이은 버퍼와 끝 위치 배열에 담아 행마다 Python 객체를 두지 않고, 값은 꺼낼 때만 잘라서 만든다.
+COLUMN_BUFFER_CHUNK = 4096 # 만드는 중에는 문자열을 이만큼씩 이어 붙여 둠 (쌓이는 str 객체 수를 제한)
+
+class ColumnData:
+    """
+    한 열에서 값이 있는 셀들 (행 번호 오름차순). 리스트처럼 len(), data[i], for로 문자열을 꺼낸다.
+
+    append(row, text) : 끝에 추가 (행 번호가 늘어나는 순서로)
+    rows              : 행 번호 배열 (array('i'))
+    find(row)         : 그 행의 번호 i (없으면 -1, 이분 탐색). get(row)은 문자열 (없으면 None)
+    align(rows)       : 오름차순 행 번호들에 대해 find()를 한 번에 (선형 시간)
+    items()           : (행 번호, 문자열)을 차례로
+    nbytes            : 버퍼와 배열이 차지하는 바이트 수 (벤치마크용)
+    """
+    def __init__(self):
+        self.rows = array('i')
+        self.ends = array('q') # i번째 문자열이 버퍼에서 끝나는 위치
+        self._buffer = ''
+        self._chunks = []      # 아직 버퍼에 합치지 않은 조각
+        self._pending = []     # 아직 조각으로 잇지 않은 문자열
+        self._length = 0
+
+    def append(self, row, text):
+        self.rows.append(row)
+        self._pending.append(text)
+        if len(self._pending) >= COLUMN_BUFFER_CHUNK:
+            self._join_pending()
+
+    def _join_pending(self):
+        # 모아 둔 문자열을 조각 하나로 잇고, 끝 위치는 묶음마다 한꺼번에 계산
+        self.ends.extend(itertools.accumulate(map(len, self._pending), initial=self._length))
+        del self.ends[-len(self._pending) - 1]
+        self._length = self.ends[-1] if self.ends else 0
+        self._chunks.append(''.join(self._pending))
+        self._pending.clear()
+
+    def _flush(self):
+        if self._pending:
+            self._join_pending()
+        self._buffer += ''.join(self._chunks)
+        self._chunks.clear()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, i):
+        if self._pending or self._chunks:
+            self._flush()
+        return self._buffer[self.ends[i-1] if i else 0:self.ends[i]]
+
+    def __iter__(self):
+        for _, text in self.items():
+            yield text
+
+    def items(self):
+        if self._pending or self._chunks:
+            self._flush()
+        buffer = self._buffer
+        start = 0
+        for row, end in zip(self.rows, self.ends):
+            yield row, buffer[start:end]
+            start = end
+
+    def align(self, rows):
+        # 오름차순 행 번호마다 이 열에서의 번호 (없으면 -1)를 차례로. 두 배열을 나란히 훑으므로 선형 시간
+        own_rows = self.rows
+        i, count = 0, len(own_rows)
+        for row in rows:
+            while i < count and own_rows[i] < row:
+                i += 1
+            yield i if i < count and own_rows[i] == row else -1
+
+    def find(self, row):
+        i = bisect.bisect_left(self.rows, row)
+        return i if i < len(self.rows) and self.rows[i] == row else -1
+
+    def get(self, row, default=None):
+        i = self.find(row)
+        return default if i < 0 else self[i]
+
+    @property
+    def nbytes(self):
+        if self._pending or self._chunks:
+            self._flush()
+        # 버퍼는 str 내부 표현 그대로 (문자마다 1/2/4바이트: 가장 넓은 문자에 맞춤)
+        return sys.getsizeof(self._buffer) + self.rows.itemsize * len(self.rows) + self.ends.itemsize * len(self.ends)
+
+# xlsx 스트리밍 처리 ------------------------------------------------------------------
+# load_workbook()은 모든 시트와 셀 객체를 메모리에 올리기 때문에 큰 파일에서는 메모리가 매우 커진다.
+# 여기서는 시트 XML을 압축 파일 안에서 직접 한 행(<row>)씩 읽고, 필요한 셀만 고쳐서
+# 새 파일에 바로 써 내려간다. 메모리에는 공유 문자열과 처리 중인 행 묶음(chunk)만 남는다.
+# 고치지 않은 셀, 다른 시트, 스타일 등은 원본 XML 그대로 복사된다.
+STREAM_CHUNK_ROWS = 1000  # 한 번에 변환할 행 수
+STREAM_READ_SIZE = 1 << 20 # 시트 XML을 읽는 단위 (문자 수)
+
+_MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+_ATTR_PATTERN = re.compile(r'([\w:]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+_REF_PATTERN = re.compile(r'([A-Za-z]+)(\d+)')
+_ESCAPED_PATTERN = re.compile(r'_x([0-9A-Fa-f]{4})_')
+_ILLEGAL_XML_PATTERN = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+def _attrs(text):
+    # 'r="A1" s="3"' -> {'r': 'A1', 's': '3'}
+    return {m.group(1): html.unescape(m.group(2) if m.group(2) is not None else m.group(3)) for m in _ATTR_PATTERN.finditer(text)}
+
+def _unescape_text(text):
+    # XML 엔티티와 엑셀의 _xHHHH_ 표기를 원래 문자로
+    return _ESCAPED_PATTERN.sub(lambda m: chr(int(m.group(1), 16)), html.unescape(text))
+
+def _escape_text(text):
+    text = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    # XML에 쓸 수 없는 제어 문자는 엑셀과 같은 _xHHHH_ 형식으로
+    return _ILLEGAL_XML_PATTERN.sub(lambda m: f'_x{ord(m.group()):04X}_', text)
+
+def _copy_zip_info(info, compress_type=None):
+    # 원본 ZipInfo는 읽는 쪽에서 쓰고 있으므로 쓰기용으로 새로 만듦
+    new_info = zipfile.ZipInfo(info.filename, info.date_time)
+    new_info.compress_type = info.compress_type if compress_type is None else compress_type
+    new_info.external_attr = info.external_attr
+    return new_info
+
+def _number_text(text):
+    # openpyxl과 같은 방식으로 숫자 셀을 문자열로 (정수는 정수, 그 외는 float)
+    try:
+        if '.' in text or 'E' in text or 'e' in text:
+            return str(float(text))
+        return str(int(text))
+    except ValueError:
+        return text
+
+class XlsxSheetStream:
+    """
+    xlsx/xlsm 파일의 시트 하나를 스트리밍으로 읽고 고쳐 쓰는 도구.
+
+    read_columns(columns) : WorkbookSession.read_columns()와 같은 형식으로 열 값을 반환
+    preflight(columns) : 열마다 값이 있는지만 빠르게 확인 (덮어쓰기 확인용)
+    rewrite(columns, update_rows) : 행 묶음마다 update_rows()가 돌려준 셀만 바꿔서 파일을 다시 씀
+    """
+    def __init__(self, filepath, sheet_name=None):
+        self.filepath = filepath
+        self.sheet_name = sheet_name
+        self.sheet_path = None
+        self.shared_strings_path = None
+        self.calc_chain_path = None
+        self.workbook_rels_path = None
+        self._sheets = None # [(시트 이름, 시트 XML 경로)]
+        self._worksheet_names = []
+        self._active_sheet = 0
+        self._shared_strings = None
+
+        self.load_count = 0
+        self.load_seconds = 0.0
+        self.rows_total = 0   # preflight()에서 센 시트 전체 행 수 (진행 상황의 전체 수)
+        self.rows_scanned = 0 # 읽기/고쳐 쓰기에서 읽은 행 수 (preflight()는 세지 않음)
+        self.rows_written = 0
+
+    # 패키지 구조 ---------------------------------------------------------------------
+    def _read_workbook(self, archive):
+        # 시트 목록, 공유 문자열, 계산 체인의 경로를 workbook.xml과 관계(rels) 파일에서 찾음
+        if self._sheets is not None:
+            return
+
+        workbook_path = 'xl/workbook.xml'
+        if '_rels/.rels' in archive.namelist():
+            for rel in ET.fromstring(archive.read('_rels/.rels')).iter(f'{{{_PKG_REL_NS}}}Relationship'):
+                if rel.get('Type', '').endswith('/officeDocument'):
+                    workbook_path = rel.get('Target').lstrip('/')
+
+        base = posixpath.dirname(workbook_path)
+        self.workbook_rels_path = posixpath.join(base, '_rels', posixpath.basename(workbook_path) + '.rels')
+        targets = {}
+        worksheet_ids = set()
+        for rel in ET.fromstring(archive.read(self.workbook_rels_path)).iter(f'{{{_PKG_REL_NS}}}Relationship'):
+            target = rel.get('Target')
+            target = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join(base, target))
+            targets[rel.get('Id')] = target
+            rel_type = rel.get('Type', '')
+            if rel_type.endswith('/worksheet'):
+                worksheet_ids.add(rel.get('Id'))
+            elif rel_type.endswith('/sharedStrings'):
+                self.shared_strings_path = target
+            elif rel_type.endswith('/calcChain'):
+                self.calc_chain_path = target
+
+        workbook = ET.fromstring(archive.read(workbook_path))
+        sheets = list(workbook.iter(f'{{{_MAIN_NS}}}sheet'))
+        self._sheets = [(sheet.get('name'), targets[sheet.get(f'{{{_REL_NS}}}id')]) for sheet in sheets]
+        self._worksheet_names = [sheet.get('name') for sheet in sheets if sheet.get(f'{{{_REL_NS}}}id') in worksheet_ids]
+        view = workbook.find(f'{{{_MAIN_NS}}}bookViews/{{{_MAIN_NS}}}workbookView')
+        self._active_sheet = int(view.get('activeTab', 0)) if view is not None else 0
+
+    def _resolve_parts(self, archive):
+        # 처리할 시트 XML의 경로를 정함
+        if self.sheet_path is not None:
+            return
+
+        self._read_workbook(archive)
+        sheets = self._sheets
+        if self.sheet_name is None:
+            # 시트 이름이 없으면 openpyxl의 workbook.active와 같은 시트(activeTab)
+            active = self._active_sheet
+            self.sheet_path = sheets[active if active < len(sheets) else 0][1]
+        else:
+            for name, target in sheets:
+                if name == self.sheet_name:
+                    self.sheet_path = target
+                    break
+            else:
+                raise KeyError(f'worksheet not found: {self.sheet_name}')
+
+    def sheet_names(self):
+        # 통합 문서의 모든 워크시트 이름 (탭 순서, 차트 시트 제외)
+        with zipfile.ZipFile(self.filepath) as archive:
+            self._read_workbook(archive)
+        return list(self._worksheet_names)
+
+    def _load_shared_strings(self, archive):
+        if self._shared_strings is not None:
+            return self._shared_strings
+
+        self._shared_strings = []
+        if self.shared_strings_path and self.shared_strings_path in archive.namelist():
+            si_tag, t_tag, r_tag = f'{{{_MAIN_NS}}}si', f'{{{_MAIN_NS}}}t', f'{{{_MAIN_NS}}}r'
+            with archive.open(self.shared_strings_path) as source:
+                for _, elem in ET.iterparse(source):
+                    if elem.tag != si_tag:
+                        continue
+                    # 후리가나(rPh)는 빼고 본문(t, r/t)만 이어붙임 (openpyxl과 같음)
+                    parts = []
+                    for child in elem:
+                        if child.tag == t_tag:
+                            parts.append(child.text or '')
+                        elif child.tag == r_tag:
+                            parts.extend(t.text or '' for t in child.iter(t_tag))
+                    self._shared_strings.append(_ESCAPED_PATTERN.sub(lambda m: chr(int(m.group(1), 16)), ''.join(parts)))
+                    elem.clear()
+        return self._shared_strings
+
+    # 시트 XML 스캔 ---------------------------------------------------------------------
+    def _iter_sheet_parts(self, stream):
+        """
+        시트 XML을 ('head', 문자열), ('row', 문자열), ('text', 문자열), ('tail', 문자열) 조각으로 나눔.
+        head는 <sheetData>까지, tail은 </sheetData>부터 끝까지.
+        """
+        buf = ''
+        while True:
+            m = re.search(r'<(\w+:)?sheetData\b[^>]*?(/?)>', buf)
+            if m:
+                break
+            chunk = stream.read(STREAM_READ_SIZE)
+            if not chunk:
+                raise ValueError('sheetData not found')
+            buf += chunk
+
+        self._prefix = m.group(1) or ''
+        yield 'head', buf[:m.end()]
+        if m.group(2):  # <sheetData/> : 빈 시트
+            yield 'tail', buf[m.end():] + stream.read()
+            return
+
+        row_open = f'<{self._prefix}row'
+        row_close = f'</{self._prefix}row>'
+        data_close = f'</{self._prefix}sheetData'
+        buf = buf[m.end():]
+        pos = 0
+        while True:
+            start = buf.find('<', pos)
+            end = -1
+            if start >= 0:
+                if start > pos:
+                    yield 'text', buf[pos:start]
+                    pos = start
+                if buf.startswith(data_close, start):
+                    yield 'tail', buf[start:] + stream.read()
+                    return
+                gt = buf.find('>', start)
+                if gt >= 0:
+                    if not buf.startswith(row_open, start) or buf[gt-1] == '/':
+                        end = gt + 1 # 빈 행(<row .../>) 또는 주석 등
+                    else:
+                        close = buf.find(row_close, gt)
+                        if close >= 0:
+                            end = close + len(row_close)
+            if end >= 0:
+                yield ('row' if buf.startswith(row_open, start) else 'text'), buf[start:end]
+                pos = end
+                continue
+
+            # 행이 끝나지 않았으면 더 읽음
+            chunk = stream.read(STREAM_READ_SIZE)
+            if not chunk:
+                raise ValueError('unexpected end of sheet XML')
+            buf = buf[pos:] + chunk
+            pos = 0
+
+    def _parse_row(self, row_xml, previous_row):
+        """
+        <row> 문자열 -> (행 번호, 행 시작 태그 속성 문자열, 셀 리스트[(열 번호, 셀 XML)])
+        r 속성이 없는 행/셀은 앞 행/셀 다음 번호로 계산
+        """
+        p = self._prefix
+        m = re.match(rf'<{p}row\b([^>]*?)/?>', row_xml)
+        row_attr_text = m.group(1)
+        row_attrs = _attrs(row_attr_text)
+        row_number = int(row_attrs['r']) if 'r' in row_attrs else previous_row + 1
+
+        cells = []
+        column = 0
+        for cell in re.finditer(rf'<{p}c\b([^>]*?)(?:/>|>(.*?)</{p}c>)', row_xml[m.end():], re.S):
+            ref = re.search(r'\br\s*=\s*["\']([A-Za-z]+)', cell.group(1))
+            column = column_to_number(ref.group(1)) if ref else column + 1
+            cells.append((column, cell.group()))
+        return row_number, row_attr_text, cells
+
+    def _cell_value(self, cell_xml, shared_strings):
+        # 셀 XML -> 문자열 값 (값이 없으면 None)
+        p = self._prefix
+        m = re.match(rf'<{p}c\b([^>]*?)(?:/>|>(.*?)</{p}c>)', cell_xml, re.S)
+        content = m.group(2)
+        if not content:
+            return None
+        cell_type = _attrs(m.group(1)).get('t', 'n')
+
+        if cell_type == 'inlineStr':
+            content = re.sub(rf'<{p}rPh\b.*?</{p}rPh>', '', content, flags=re.S)
+            texts = re.findall(rf'<{p}t\b[^>]*?(?:/>|>(.*?)</{p}t>)', content, re.S)
+            return _unescape_text(''.join(texts))
+
+        v = re.search(rf'<{p}v\b[^>]*>(.*?)</{p}v>', content, re.S)
+        if v is None:
+            # 계산 결과가 저장되지 않은 수식 셀: openpyxl처럼 '=수식' (빈 셀로 보고 덮어쓰지 않도록)
+            f = re.search(rf'<{p}f\b[^>]*?(?:/>|>(.*?)</{p}f>)', content, re.S)
+            return '=' + _unescape_text(f.group(1) or '') if f else None
+        value = _unescape_text(v.group(1))
+        if cell_type == 's':
+            return shared_strings[int(value)]
+        if cell_type == 'b':
+            return 'True' if value.strip() in ('1', 'true') else 'False'
+        if cell_type in ('str', 'e'):
+            return value
+        return _number_text(value)
+
+    def _row_values(self, cells, columns, shared_strings):
+        return {column: self._cell_value(cell_xml, shared_strings) for column, cell_xml in cells if column in columns}
+
+    def read_columns(self, columns):
+        """열 이름 리스트 -> {열 이름: ColumnData(행 번호, 문자열)} (빈 셀 제외)"""
+        start = time.perf_counter()
+        numbers = {column_to_number(column): column for column in columns}
+        result = {column: ColumnData() for column in columns}
+
+        with zipfile.ZipFile(self.filepath) as archive:
+            self._resolve_parts(archive)
+            shared_strings = self._load_shared_strings(archive)
+            with archive.open(self.sheet_path) as raw:
+                row_number = 0
+                for kind, part in self._iter_sheet_parts(io.TextIOWrapper(raw, encoding='utf-8')):
+                    if kind != 'row':
+                        continue
+                    row_number, _, cells = self._parse_row(part, row_number)
+                    self.rows_scanned += 1
+                    for column, value in self._row_values(cells, numbers, shared_strings).items():
+                        if value is not None:
+                            result[numbers[column]].append(row_number, value)
+
+        self.load_count += 1
+        self.load_seconds += time.perf_counter() - start
+        return result
+
+    def preflight(self, columns):
+        """
+        열 이름 리스트 -> {열 이름: 값이 있는 셀이 있으면 True} (read_columns()에서 값이 하나라도 나오는지와 같음)
+        행과 셀을 하나씩 나누지 않고, 시트 XML을 큰 묶음째로 정규식에 넣어 해당 열의 셀만 찾는다.
+        값이 있다고 확인된 열은 그 뒤로 디코딩하지 않고, 공유 문자열도 필요할 때만 읽는다.
+        행 수는 rows_total에 남기므로 이후 진행 상황의 전체 수로 쓸 수 있다.
+        """
+        start = time.perf_counter()
+        result = {column: False for column in columns}
+        remaining = {column.upper() for column in columns} # 아직 값을 못 찾은 열
+
+        with zipfile.ZipFile(self.filepath) as archive:
+            self._resolve_parts(archive)
+            with archive.open(self.sheet_path) as raw:
+                stream = io.TextIOWrapper(raw, encoding='utf-8')
+                buf = ''
+                while True:
+                    m = re.search(r'<(\w+:)?sheetData\b[^>]*?(/?)>', buf)
+                    if m:
+                        break
+                    chunk = stream.read(STREAM_READ_SIZE)
+                    if not chunk:
+                        raise ValueError('sheetData not found')
+                    buf += chunk
+                p = self._prefix = m.group(1) or ''
+
+                def cell_patterns():
+                    # 남은 열의 셀만 찾는 패턴. 엑셀 등 대부분의 프로그램은 셀을 <c r="B2" ...>로 쓰므로
+                    # 그런 묶음은 앞부분이 고정된 빠른 패턴을, 아니면 속성 순서와 상관없는 패턴을 씀
+                    letters = '|'.join(sorted(remaining, key=len, reverse=True))
+                    return (re.compile(rf'<{p}c r="({letters})\d+"[^>]*?(?:/>|>(.*?)</{p}c>)', re.S),
+                            re.compile(rf'<{p}c\b[^>]*?\br\s*=\s*["\']({letters})\d+["\'][^>]*?(?:/>|>(.*?)</{p}c>)', re.S))
+
+                patterns = cell_patterns()
+                # r 속성이 없는 행/셀은 위치로 열을 알아야 하므로 read_columns()로 다시 읽음
+                no_ref_pattern = re.compile(rf'<{p}(?:row|c)\b(?![^>]*?\br\s*=)')
+                cell_open, cell_ref_open = f'<{p}c', f'<{p}c r="'
+                row_open, row_ref_open = f'<{p}row', f'<{p}row r="'
+                formula = f'<{p}f'
+                row_close = f'</{p}row>'
+                shared_strings = None
+                rows = 0
+                pending = buf[m.end():] if not m.group(2) else ''
+                while True:
+                    chunk = stream.read(STREAM_READ_SIZE) if not m.group(2) else ''
+                    pending += chunk
+                    cut = pending.rfind(row_close) + len(row_close) if chunk else len(pending)
+                    if chunk and cut < len(row_close):
+                        continue
+                    part, pending = pending[:cut], pending[cut:]
+                    # 태그 수는 str.count로 셈 (<row 뒤에는 공백, >, / 중 하나. <c로 시작하는 다른 태그는 sheetData 뒤에만 있음)
+                    row_count = sum(part.count(row_open + end) for end in ' >/')
+                    fast = part.count(cell_open) == part.count(cell_ref_open) and row_count == part.count(row_ref_open)
+                    if not fast and no_ref_pattern.search(part):
+                        scanned = self.rows_scanned
+                        data = self.read_columns(columns)
+                        # 확인용으로 읽은 행은 전체 행 수로만 남김
+                        self.rows_total, self.rows_scanned = self.rows_scanned - scanned, scanned
+                        return {column: any(value != '' for value in data[column]) for column in columns}
+                    rows += row_count
+
+                    pos = 0
+                    while remaining:
+                        cell = patterns[0 if fast else 1].search(part, pos)
+                        if cell is None:
+                            break
+                        pos = cell.end()
+                        if not cell.group(2):
+                            continue
+                        if formula in cell.group(2): # 수식 셀 (openpyxl에서는 '=...' 값)
+                            found = True
+                        else:
+                            if shared_strings is None:
+                                shared_strings = self._load_shared_strings(archive)
+                            value = self._cell_value(cell.group(), shared_strings)
+                            found = value is not None and value != ''
+                        if found:
+                            # 값을 찾은 열은 더 찾지 않음
+                            result[cell.group(1)] = True
+                            remaining.discard(cell.group(1))
+                            if remaining:
+                                patterns = cell_patterns()
+                    if not chunk:
+                        break
+
+        self.rows_total = rows
+        self.load_count += 1
+        self.load_seconds += time.perf_counter() - start
+        return result
+
+    def read_rows(self, columns, chunk_rows=None):
+        """
+        시트를 행 묶음 단위로 읽어 [(행 번호, {열 번호: 값})]를 묶음마다 차례로 넘겨줌. 파일은 고치지 않는다.
+        (Anki 패키지 출력처럼 읽기만 하는 경우 rewrite() 대신 사용)
+        """
+        chunk_rows = chunk_rows or STREAM_CHUNK_ROWS
+        columns = set(columns)
+        with zipfile.ZipFile(self.filepath) as archive:
+            self._resolve_parts(archive)
+            shared_strings = self._load_shared_strings(archive)
+            with archive.open(self.sheet_path) as raw:
+                rows = []
+                row_number = 0
+                for kind, part in self._iter_sheet_parts(io.TextIOWrapper(raw, encoding='utf-8')):
+                    if kind != 'row':
+                        continue
+                    row_number, _, cells = self._parse_row(part, row_number)
+                    self.rows_scanned += 1
+                    rows.append((row_number, self._row_values(cells, columns, shared_strings)))
+                    if len(rows) >= chunk_rows:
+                        yield rows
+                        rows = []
+                if rows:
+                    yield rows
+        self.load_count += 1
+
+    # 시트 XML 고쳐 쓰기 -----------------------------------------------------------------
+    def _column_styles(self, head):
+        # <cols>에 지정된 열 스타일: 새로 만드는 셀에 적용해 출력 열의 글꼴을 유지
+        styles = {}
+        for col in re.finditer(rf'<{self._prefix}col\b([^>]*?)/?>', head):
+            attrs = _attrs(col.group(1))
+            if 'style' in attrs and 'min' in attrs and 'max' in attrs:
+                for column in range(int(attrs['min']), int(attrs['max']) + 1):
+                    styles[column] = attrs['style']
+        return styles
+
+    def _update_dimension(self, head, max_column):
+        # <dimension ref="A1:E30"/>의 범위를 출력 열까지 넓힘
+        def repl(m):
+            refs = m.group(2).split(':')
+            first = _REF_PATTERN.match(refs[0])
+            last = _REF_PATTERN.match(refs[-1])
+            if not first or not last or column_to_number(last.group(1)) >= max_column:
+                return m.group()
+            return f'{m.group(1)}{refs[0]}:{number_to_column(max_column)}{last.group(2)}{m.group(3)}'
+        return re.sub(rf'(<{self._prefix}dimension\b[^>]*?\bref=")([^"]*)(")', repl, head, count=1)
+
+    def _new_cell(self, column, row_number, value, old_cell_xml, column_styles):
+        # 인라인 문자열 셀 생성. 기존 셀(또는 열)의 스타일(s)을 그대로 유지
+        style = None
+        if old_cell_xml is not None:
+            style = _attrs(re.match(rf'<{self._prefix}c\b([^>]*?)/?>', old_cell_xml).group(1)).get('s')
+        if style is None:
+            style = column_styles.get(column)
+        p = self._prefix
+        style_attr = f' s="{style}"' if style is not None else ''
+        return (f'<{p}c r="{number_to_column(column)}{row_number}"{style_attr} t="inlineStr">'
+                f'<{p}is><{p}t xml:space="preserve">{_escape_text(value)}</{p}t></{p}is></{p}c>')
+
+    def _write_row(self, row_number, row_attr_text, cells, updates, column_styles):
+        p = self._prefix
+        cells = dict(cells)
+        for column, value in updates.items():
+            cells[column] = self._new_cell(column, row_number, value, cells.get(column), column_styles)
+
+        # spans는 선택 속성이므로 셀을 추가한 행에서는 지움
+        row_attr_text = re.sub(r'\s+spans\s*=\s*"[^"]*"', '', row_attr_text)
+        if not re.search(r'\br\s*=', row_attr_text):
+            row_attr_text = f' r="{row_number}"' + row_attr_text
+
+        parts = [f'<{p}row{row_attr_text}>']
+        for column in sorted(cells):
+            cell_xml = cells[column]
+            # r 속성이 없는 셀은 순서가 바뀌어도 위치가 유지되도록 r을 붙임
+            if not re.match(rf'<{p}c\b[^>]*?\br\s*=', cell_xml):
+                cell_xml = f'<{p}c r="{number_to_column(column)}{row_number}"' + cell_xml[len(p) + 2:]
+            parts.append(cell_xml)
+        parts.append(f'</{p}row>')
+        return ''.join(parts)
+
+    def rewrite(self, columns, update_rows, output_columns=(), chunk_rows=None, before_replace=None):
+        """
+        시트를 행 묶음 단위로 읽어 update_rows(rows)를 호출하고, 돌려받은 셀만 바꿔서 파일을 다시 씀.
+
+        columns        : update_rows에 값을 넘겨줄 열 번호들
+        update_rows    : [(행 번호, {열 번호: 값})] -> {(행 번호, 열 번호): 새 값}
+        output_columns : 값을 쓸 수 있는 열 번호들 (dimension 범위 갱신용)
+        before_replace : 원본 파일을 바꾸기 직전에 호출 (예외를 내면 원본 파일은 그대로)
+        반환값         : 바뀐 셀이 하나라도 있으면 True (없으면 원본 파일을 건드리지 않음)
+        """
+        return rewrite_sheets(self.filepath, [(self, columns, update_rows, output_columns, chunk_rows)], before_replace)
+
+    def _rewrite_sheet(self, reader, writer, columns, update_rows, output_columns, chunk_rows, shared_strings):
+        chunk_rows = chunk_rows or STREAM_CHUNK_ROWS
+        columns = set(columns)
+        modified = False
+        column_styles = {}
+        pending = [] # 처리 대기 중인 조각: ('row', 행 정보) 또는 ('text', 문자열)
+        row_count = 0
+        row_number = 0
+
+        def flush():
+            nonlocal modified, row_count
+            rows = [(info[0], self._row_values(info[2], columns, shared_strings)) for kind, info in pending if kind == 'row']
+            updates = update_rows(rows) if rows else {}
+            by_row = {}
+            for (row, column), value in updates.items():
+                by_row.setdefault(row, {})[column] = value
+
+            for kind, info in pending:
+                if kind == 'row':
+                    number, attr_text, cells, row_xml = info
+                    if number in by_row:
+                        writer.write(self._write_row(number, attr_text, cells, by_row[number], column_styles))
+                        modified = True
+                        self.rows_written += 1
+                    else:
+                        writer.write(row_xml) # 바뀌지 않은 행은 원본 그대로
+                else:
+                    writer.write(info)
+            pending.clear()
+            row_count = 0
+
+        for kind, part in self._iter_sheet_parts(reader):
+            if kind == 'head':
+                column_styles = self._column_styles(part)
+                if output_columns:
+                    part = self._update_dimension(part, max(output_columns))
+                writer.write(part)
+            elif kind == 'row':
+                row_number, attr_text, cells = self._parse_row(part, row_number)
+                pending.append(('row', (row_number, attr_text, cells, part)))
+                self.rows_scanned += 1
+                row_count += 1
+                if row_count >= chunk_rows:
+                    flush()
+            elif kind == 'text':
+                pending.append(('text', part))
+            else:
+                flush()
+                writer.write(part)
+        return modified
+
+    def summary(self):
+        return f'ストリーミング処理：{self.rows_scanned}行を読み込み、{self.rows_written}行を更新（{self.load_seconds:.2f}秒）'
+
+def rewrite_sheets(filepath, sheets, before_replace=None):
+    """
+    같은 xlsx/xlsm 파일의 여러 시트를 zip을 한 번만 다시 써서 고치고, 원본 파일도 마지막에 한 번만 바꿈.
+    (시트마다 따로 바꾸면 중간에 멈췄을 때 앞 시트만 바뀐 파일이 남음)
+
+    sheets         : [(XlsxSheetStream, columns, update_rows, output_columns, chunk_rows)] (인자는 XlsxSheetStream.rewrite()와 같음)
+    before_replace : 원본 파일을 바꾸기 직전에 호출 (예외를 내면 원본 파일은 그대로)
+    반환값         : 바뀐 셀이 하나라도 있으면 True (없으면 원본 파일을 건드리지 않음)
+    """
+    start = time.perf_counter()
+    modified = False
+
+    directory = os.path.dirname(os.path.abspath(filepath))
+    handle, temp_path = tempfile.mkstemp(suffix='.xlsx', dir=directory)
+    os.close(handle)
+    try:
+        with zipfile.ZipFile(filepath) as archive, zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as output:
+            by_path = {}
+            for sheet in sheets:
+                stream = sheet[0]
+                stream._resolve_parts(archive)
+                by_path[stream.sheet_path] = sheet
+            first = sheets[0][0] # 계산 체인 등 통합 문서 공통 파트의 경로
+            sheet_seconds = 0.0
+
+            for info in archive.infolist():
+                sheet = by_path.get(info.filename)
+                if sheet is not None:
+                    stream, columns, update_rows, output_columns, chunk_rows = sheet
+                    sheet_start = time.perf_counter()
+                    with archive.open(info) as raw, output.open(_copy_zip_info(info, zipfile.ZIP_DEFLATED), 'w', force_zip64=True) as sink:
+                        writer = io.TextIOWrapper(sink, encoding='utf-8')
+                        modified |= stream._rewrite_sheet(io.TextIOWrapper(raw, encoding='utf-8'), writer, columns, update_rows, output_columns,
+                                                          chunk_rows, stream._load_shared_strings(archive))
+                        writer.flush()
+                        writer.detach()
+                    stream.load_count += 1
+                    stream.load_seconds += time.perf_counter() - sheet_start
+                    sheet_seconds += time.perf_counter() - sheet_start
+                elif info.filename == first.calc_chain_path:
+                    # 계산 체인은 선택 파트이므로 지움 (수식 셀을 덮어써도 엑셀이 다시 만듦)
+                    continue
+                elif first.calc_chain_path and info.filename in ('[Content_Types].xml', first.workbook_rels_path):
+                    data = archive.read(info).decode('utf-8')
+                    name = re.escape(posixpath.basename(first.calc_chain_path))
+                    data = re.sub(rf'<Override\b[^>]*?PartName="[^"]*{name}"[^>]*/>', '', data)
+                    data = re.sub(rf'<Relationship\b[^>]*?Target="[^"]*{name}"[^>]*/>', '', data)
+                    output.writestr(_copy_zip_info(info), data.encode('utf-8'))
+                else:
+                    with archive.open(info) as source, output.open(_copy_zip_info(info), 'w', force_zip64=info.file_size > zipfile.ZIP64_LIMIT) as sink:
+                        shutil.copyfileobj(source, sink)
+
+        if modified:
+            if before_replace is not None:
+                before_replace()
+            os.replace(temp_path, filepath)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    # 나머지 파트를 복사한 시간은 첫 시트의 시간에 더함
+    first.load_seconds += time.perf_counter() - start - sheet_seconds
+    return modified
+
+# csv 스트리밍 처리 -------------------------------------------------------------------
+# pandas로 파일 전체를 DataFrame에 올리고 셀마다 iloc으로 쓰는 대신,
+# csv 모듈로 행 묶음씩 읽어 변환하고 임시 파일에 바로 써 내려간 뒤 마지막에 원본과 바꾼다.
+class CsvStream:
+    """
+    csv 파일을 스트리밍으로 읽고 고쳐 쓰는 도구. XlsxSheetStream과 같은 방식으로 사용한다.
+
+    read_columns(columns) : WorkbookSession.read_columns()와 같은 형식으로 열 값을 반환
+    rewrite(columns, update_rows) : 행 묶음마다 update_rows()가 돌려준 셀만 바꿔서 파일을 다시 씀
+    """
+    encoding = 'utf-8-sig' # 읽을 때는 BOM이 있으면 제거, 쓸 때는 BOM을 붙임 (엑셀에서 깨지지 않도록)
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+
+        self.load_count = 0
+        self.load_seconds = 0.0
+        self.rows_total = 0   # preflight()에서 센 시트 전체 행 수 (진행 상황의 전체 수)
+        self.rows_scanned = 0 # 읽기/고쳐 쓰기에서 읽은 행 수 (preflight()는 세지 않음)
+        self.rows_written = 0
+
+    def _iter_rows(self, source):
+        for row_number, row in enumerate(csv.reader(source), 1):
+            self.rows_scanned += 1
+            yield row_number, row
+
+    def _row_values(self, row, columns):
+        # 빈칸(공백만 있는 칸 포함)은 None: xlsx 쪽의 빈 셀과 같게 취급
+        values = {}
+        for column in columns:
+            value = row[column-1] if column <= len(row) else ''
+            values[column] = value.replace('\ufeff', '') if value.strip() != '' else None
+        return values
+
+    def read_columns(self, columns):
+        """열 이름 리스트 -> {열 이름: ColumnData(행 번호, 문자열)} (빈 셀 제외)"""
+        start = time.perf_counter()
+        numbers = {column_to_number(column): column for column in columns}
+        result = {column: ColumnData() for column in columns}
+
+        with open(self.filepath, encoding=self.encoding, newline='') as source:
+            for row_number, row in self._iter_rows(source):
+                for column, value in self._row_values(row, numbers).items():
+                    if value is not None:
+                        result[numbers[column]].append(row_number, value)
+
+        self.load_count += 1
+        self.load_seconds += time.perf_counter() - start
+        return result
+
+    def preflight(self, columns):
+        """XlsxSheetStream.preflight()와 같음: {열 이름: 값이 있는 셀이 있으면 True}"""
+        start = time.perf_counter()
+        numbers = {column_to_number(column): column for column in columns}
+        result = {column: False for column in columns}
+        rows = 0
+        with open(self.filepath, encoding=self.encoding, newline='') as source:
+            for row in csv.reader(source):
+                rows += 1
+                for number, column in numbers.items():
+                    if number <= len(row) and row[number-1].strip() != '':
+                        result[column] = True
+        self.rows_total = rows
+        self.load_count += 1
+        self.load_seconds += time.perf_counter() - start
+        return result
+
+    def read_rows(self, columns, chunk_rows=None):
+        """XlsxSheetStream.read_rows()와 같음: 행 묶음마다 [(행 번호, {열 번호: 값})]"""
+        chunk_rows = chunk_rows or STREAM_CHUNK_ROWS
+        with open(self.filepath, encoding=self.encoding, newline='') as source:
+            rows = []
+            for row_number, row in self._iter_rows(source):
+                rows.append((row_number, self._row_values(row, columns)))
+                if len(rows) >= chunk_rows:
+                    yield rows
+                    rows = []
+            if rows:
+                yield rows
+        self.load_count += 1
+
+    def rewrite(self, columns, update_rows, output_columns=(), chunk_rows=None, before_replace=None):
+        """
+        파일을 행 묶음 단위로 읽어 update_rows(rows)를 호출하고, 돌려받은 셀만 바꿔서 파일을 다시 씀.
+        인자와 반환값은 XlsxSheetStream.rewrite()와 같다.
+        출력 열이 있는 행은 그 열까지 빈칸으로 채워 열 개수를 맞춘다.
+        """
+        chunk_rows = chunk_rows or STREAM_CHUNK_ROWS
+        width = max(output_columns, default=0)
+        start = time.perf_counter()
+        modified = False
+
+        directory = os.path.dirname(os.path.abspath(self.filepath))
+        handle, temp_path = tempfile.mkstemp(suffix='.csv', dir=directory)
+        os.close(handle)
+        try:
+            with open(self.filepath, encoding=self.encoding, newline='') as source, \
+                 open(temp_path, 'w', encoding=self.encoding, newline='') as sink:
+                writer = csv.writer(sink)
+                pending = []
+
+                def flush():
+                    nonlocal modified
+                    updates = update_rows([(row_number, self._row_values(row, columns)) for row_number, row in pending])
+                    for row_number, row in pending:
+                        if len(row) < width:
+                            row.extend([''] * (width - len(row)))
+                        changed = False
+                        for column in output_columns:
+                            value = updates.get((row_number, column))
+                            if value is not None:
+                                row[column-1] = value
+                                changed = True
+                        if changed:
+                            modified = True
+                            self.rows_written += 1
+                    writer.writerows(row for _, row in pending)
+                    pending.clear()
+
+                for row_number, row in self._iter_rows(source):
+                    pending.append((row_number, row))
+                    if len(pending) >= chunk_rows:
+                        flush()
+                if pending:
+                    flush()
+
+            if modified:
+                if before_replace is not None:
+                    before_replace()
+                os.replace(temp_path, self.filepath)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        self.load_count += 1
+        self.load_seconds += time.perf_counter() - start
+        return modified
+
+    def summary(self):
+        return f'ストリーミング処理：{self.rows_scanned}行を読み込み、{self.rows_written}行を更新（{self.load_seconds:.2f}秒）'
+
+# 행 지문 (差分モード) ---------------------------------------------------------------
+# 출력 셀마다 "어떤 원문(제외 단어, 가나 종류 포함)으로 만든 결과인지"를 짧은 해시로 파일 옆에 저장해 두고,
+# 다음 실행 때 원문이 그대로인 행은 다시 변환하지 않는다. 엑셀 파일 자체는 건드리지 않도록 별도 파일(sidecar)에 둔다.
+FINGERPRINT_SUFFIX = '.furigana.json'
+
+class RowFingerprints:
+    """
+    {출력 열 번호: {행 번호: 지문}}을 '원본 파일 경로 + FINGERPRINT_SUFFIX'에 저장.
+    sheet_name을 주면 시트마다 따로 '원본 파일 경로.시트 이름 + FINGERPRINT_SUFFIX'에 저장한다.
+    version은 변환 규칙 정보(furigana_engine.conversion_version())로 지문에 넣는다. 변환 규칙이나 사전이 바뀌면
+    지문이 모두 달라지므로 이 프로그램이 쓴 셀은 (덮어쓰기 설정과 상관없이) 다시 변환된다.
+
+    known(col, row)     : 지난번에 이 프로그램이 쓴 셀인지
+    matches(col, row, fp): 지난번과 같은 원문으로 만든 셀인지
+    record(col, row, fp): 이번 실행 결과로 남길 지문 (record되지 않은 셀은 저장 시 빠짐)
+    """
+    def __init__(self, filepath, sheet_name=None, version=''):
+        self.version = version
+        if sheet_name is None:
+            self.path = filepath + FINGERPRINT_SUFFIX
+        else:
+            # 시트 이름에는 파일 이름에 쓸 수 없는 문자가 들어갈 수 있으므로 바꿈
+            safe_name = re.sub(r'[<>:"/\\|?*]', '_', sheet_name)
+            self.path = f'{filepath}.{safe_name}{FINGERPRINT_SUFFIX}'
+        self.previous = self._load()
+        self.current = {}
+        self.unchanged = 0 # 원문이 그대로라서 건너뛴 셀 수
+
+    def fingerprint(self, text, exclude_text, kana_mode, output_format='anki'):
+        fields = [self.version, kana_mode, text, exclude_text or '', output_format]
+        key = '\x00'.join(fields)
+        return hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # 예전 규칙으로 만든 파일도 읽음: 버리면 이 프로그램이 쓴 셀을 직접 입력한 값으로 보고 다시 변환하지 않음
+        if not isinstance(data, dict) or not isinstance(data.get('columns'), dict):
+            return {}
+        return {int(column): rows for column, rows in data.get('columns', {}).items()}
+
+    def known(self, column, row):
+        return str(row) in self.previous.get(column, ())
+
+    def matches(self, column, row, fp):
+        return self.previous.get(column, {}).get(str(row)) == fp
+
+    def record(self, column, row, fp):
+        self.current.setdefault(column, {})[str(row)] = fp
+
+    def save(self):
+        data = {'version': self.version, 'columns': {str(column): rows for column, rows in sorted(self.current.items())}}
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(temp_path, self.path)
+
+    def summary(self):
+        return f'差分モード：変更のない{self.unchanged}件をスキップ'
@@ -0,0 +1,1227 @@
+import re, os, builtins, platform, subprocess, time, sqlite3, threading, bisect
+
+from array import array
+
+from concurrent.futures import ThreadPoolExecutor
+
+# pandas와 openpyxl은 import에 시간이 오래 걸리므로 실제로 파일을 읽을 때 불러온다. (GUI가 빨리 뜨도록)
+import furigana_profile
+from furigana_profile import StageProfiler, profiling
+from furigana_engine import (get_tagger, warm_up_tagger, tagger_warm_up, render_japanese_texts, set_reading_overrides, conversion_version,
+                             FuriganaProcessPool, FuriganaResultCache, RENDERERS)
+from furigana_io import column_to_number, number_to_column, ColumnData, XlsxSheetStream, CsvStream, RowFingerprints, STREAM_CHUNK_ROWS, rewrite_sheets
+from furigana_anki import AnkiPackageWriter
+
+# 열 입력 ---------------------------------------------------------------------------
+def check_file_is_open(file_path):
+    # 파일이 열려있는지 확인하는 함수
+    if platform.system() == "Windows":
+        try:
+            with builtins.open(file_path, 'a'):
+                return False
+        except IOError:
+            return True
+    else:
+        try:
+            result = subprocess.run(['lsof', file_path], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            return bool(result.stdout)
+        except FileNotFoundError:
+            #print("lsof 명령어를 사용할 수 없습니다.")
+            return False
+
+def parse_mixed_input(input_str):
+    # 튜플 패턴 찾기 (괄호 안의 내용 추출)
+    tuple_pattern = re.compile(r'\([^()]*\)')
+
+    def safe_eval(match):
+        # 괄호 제거
+        if match.group(0)[0]==',':
+            content = match.group(0)[2:-1]
+        else:
+            content = match.group(0)[1:-1]
+
+        items = [item.strip() for item in content.split(',') if item.strip()]
+        
+        # 요소가 하나만 있을 경우 튜플로 반환되도록 처리
+        if len(items) == 1:
+            return (items[0],)
+        return tuple(items)
+
+    # 튜플을 파싱하여 리스트로 저장
+    tuples = []
+    # finditer를 사용하여 input_str에서 패턴에 일치하는 모든 match 객체 검색
+    for match in tuple_pattern.finditer(input_str):
+        # 매칭된 결과(match)를 safe_eval 함수로 처리
+        evaluated_value = safe_eval(match)
+        
+        # 결과를 리스트에 추가
+        tuples.append(evaluated_value)
+    
+    # 문자열에서 튜플 패턴 제거 후 남은 요소 처리
+    remaining_str = tuple_pattern.sub('tuple', input_str)
+    
+    remaining_elements = []  # 빈 리스트 초기화
+    # 남은 문자열을 리스트로 변환, 빈 문자열 처리
+    if remaining_str:
+        split_items = remaining_str.split(',')  # 쉼표로 문자열 나누기
+        for item in split_items:  # stripped_items 리스트의 각 요소를 순회
+            if item is None or item.strip() == '':
+                remaining_elements.append('')
+            elif item != 'tuple':
+                remaining_elements.append(item)
+                
+    else:
+        remaining_elements = []
+
+    return tuples, remaining_elements if remaining_elements else []
+
+# 출력 형식: 열 이름 뒤에 ":형식+형식..." 을 붙이면 입력 열 오른쪽부터 형식마다 한 열씩 출력한다.
+#   "A"           -> B열에 Anki 형식 (기존과 같음)
+#   "A:anki+kana" -> B열에 Anki 형식, C열에 읽기(가나)만
+# 형식 이름은 furigana_engine.RENDERERS 참고 (anki, html, kana, json)
+DEFAULT_FORMATS = ('anki',)
+
+def split_column_spec(item):
+    # "A:anki+html" -> ('A', ('anki', 'html')), "A" -> ('A', ('anki',))
+    column, _, formats = item.partition(':')
+    if not formats:
+        return column.strip(), DEFAULT_FORMATS
+    return column.strip(), tuple(name.strip().lower() for name in formats.split('+'))
+
+def column_outputs(item):
+    # 열 입력 하나 -> (입력 열 이름, [(출력 열 번호, 출력 형식), ...])
+    column, formats = split_column_spec(item)
+    first = column_to_number(column) + 1
+    return column, [(first + i, output_format) for i, output_format in enumerate(formats)]
+
+def validate_columns(tuples=(), lists=()):
+    # 열 입력 확인: 0 정상, 1 빈칸, 2 범위 초과, 3 출력 열과 겹침, 4 괄호 미닫힘, 5 괄호 안에 세 열 이상, 6 모르는 출력 형식
+    all_columns = []
+
+    # 리스트 처리
+    for item in lists:
+        if item is None or item.strip() == '':
+            return 1
+        else:
+            all_columns.append(item)
+    
+    # 튜플 처리
+    for item in tuples:
+        for element in item:
+            if element is None or element.strip() == '':
+                return 1
+            else:
+                all_columns.append(element)
+        try:
+            if item[2]:
+                return 5
+        except:
+            pass
+        
+    
+    # 공통 처리
+    for x in range(len(all_columns)):
+        column, formats = split_column_spec(all_columns[x])
+
+        # 괄호가 닫히지 않았는지 확인
+        if all_columns[x][0] == '(' or all_columns[x][len(all_columns[x])-1] == ')':
+            return 4
+
+        # 출력 형식 확인
+        elif any(output_format not in RENDERERS for output_format in formats):
+            return 6
+
+        # 열 입력 범위 제한
+        elif not column_to_number('A') <= column_to_number(column) <= column_to_number('XFD'):
+            return 2
+        
+        # 열 겹침 방지: 다른 입력 열이 출력 열 자리에 있거나, 두 입력 열의 출력 열이 겹치면 안 됨
+        elif len(all_columns) != 1:
+            outputs = {col for col, _ in column_outputs(all_columns[x])[1]}
+            for y in range(len(all_columns)):
+                other_column, other_outputs = column_outputs(all_columns[y])
+                if column_to_number(other_column) == column_to_number(column):
+                    continue
+                if column_to_number(other_column) in outputs or outputs & {col for col, _ in other_outputs}:
+                    return 3
+                            
+    return 0
+
+# 시트와 폴더 ------------------------------------------------------------------------
+ALL_SHEETS = '*' # 시트 이름 대신 쓰면 통합 문서의 모든 시트
+WORKBOOK_EXTENSIONS = ('.xlsx', '.xlsm', '.csv')
+
+def parse_sheet_names(text):
+    # "Sheet1, 単語" -> ['Sheet1', '単語'], 빈 문자열 -> None (활성 시트만)
+    names = [name.strip() for name in (text or '').split(',') if name.strip()]
+    return names or None
+
+def find_workbooks(folder):
+    # 폴더 바로 아래의 xlsx, xlsm, csv 파일 (이름순). 엑셀이 열려 있을 때 생기는 임시 파일(~$...)은 제외
+    return [os.path.join(folder, name) for name in sorted(os.listdir(folder))
+            if name.endswith(WORKBOOK_EXTENSIONS) and not name.startswith('~$')
+            and os.path.isfile(os.path.join(folder, name))]
+
+def warm_up(dictionary_path=None):
+    """
+    무거운 모듈(pandas, openpyxl)과 형태소 분석기 사전을 미리 읽어 둔다.
+    GUI가 뜬 뒤 백그라운드 스레드에서 호출. [(단계 이름, 걸린 시간(초))]를 반환.
+    pandas를 읽는 동안에 변환을 시작해도 Tagger를 따로 만들지 않고 이 워밍업의 것을 기다려 받는다.
+    """
+    timings = []
+    start = time.perf_counter()
+    def mark(name):
+        nonlocal start
+        now = time.perf_counter()
+        timings.append((name, now - start))
+        start = now
+
+    with tagger_warm_up(dictionary_path):
+        import pandas
+        mark('import pandas')
+        import openpyxl
+        mark('import openpyxl')
+        warm_up_tagger(dictionary_path)
+        mark('Tagger・辞書の読み込み')
+    return timings
+
+# 파일 세션 ------------------------------------------------------------------------
+EMPTY_VALUES = ('', 'None', 'nan') # 빈 셀로 보는 값 (앞뒤 공백 제거 후)
+
+class WorkbookSession:
+    """
+    파일(xlsx, xlsm, csv)을 한 번만 읽어 메모리에 올려두고,
+    모든 열 읽기와 셀 쓰기, 저장을 이 객체 하나로 처리한다.
+
+    xlsx/xlsm -> openpyxl Workbook (self.workbook, self.sheet)
+    csv       -> pandas DataFrame (self.df)
+    """
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.workbook = None
+        self.sheet = None
+        self.sheet_title = None  # select_sheet()로 고른 시트 이름 (None이면 활성 시트)
+        self.df = None
+        self.output_fonts = {}   # 원래 폰트 -> 출력 셀에 쓸 Font (_output_font 참고)
+
+        self.load_count = 0      # 실제로 파일을 읽은 횟수
+        self.load_seconds = 0.0  # 파일을 읽는 데 걸린 시간
+        self.read_requests = 0   # 열 읽기 요청 횟수 (예전에는 요청마다 파일을 다시 읽었음)
+
+    @property
+    def is_excel(self):
+        return self.filepath.endswith(('.xlsx', '.xlsm'))
+
+    @property
+    def is_csv(self):
+        return self.filepath.endswith('.csv')
+
+    def load(self):
+        # 이미 읽었다면 다시 읽지 않음
+        if self.load_count:
+            return
+
+        start = time.perf_counter()
+        if self.is_excel:
+            with furigana_profile.stage('import openpyxl'):
+                from openpyxl import load_workbook
+            with furigana_profile.stage('load_workbook'):
+                self.workbook = load_workbook(self.filepath)
+            self.sheet = self.workbook.active if self.sheet_title is None else self.workbook[self.sheet_title]
+        elif self.is_csv:
+            with furigana_profile.stage('import pandas'):
+                import pandas as pd
+            # keep_default_na=False: 'NA', 'None' 같은 문자열이 빈칸으로 바뀌지 않도록 함
+            with furigana_profile.stage('read_csv'):
+                self.df = pd.read_csv(self.filepath, encoding='utf-8', header=None, dtype=str, keep_default_na=False)
+        else:
+            raise ValueError(f'unsupported file type: {self.filepath}')
+        self.load_seconds += time.perf_counter() - start
+        self.load_count += 1
+
+    def sheet_names(self):
+        # 통합 문서의 모든 워크시트 이름 (차트 시트 제외, csv는 시트가 없으므로 [None])
+        # xlsx는 통합 문서 전체를 불러오지 않고 workbook.xml만 읽음
+        if self.is_excel:
+            return XlsxSheetStream(self.filepath).sheet_names()
+        return [None]
+
+    def select_sheet(self, sheet_name=None):
+        # 이후의 읽기, 쓰기 대상 시트를 바꿈 (None이면 활성 시트). 저장은 파일 단위이므로 모든 시트를 고친 뒤 한 번만
+        # 아직 불러오지 않았으면 이름만 기억해 두고, load()에서 그 시트를 고름
+        self.sheet_title = sheet_name
+        if self.is_excel and self.workbook is not None:
+            self.sheet = self.workbook.active if sheet_name is None else self.workbook[sheet_name]
+
+    def read_columns(self, columns):
+        """
+        열 이름 리스트를 받아 {열 이름: ColumnData(행 번호(1부터), 문자열)} 형태로 반환.
+        빈 셀은 제외한다.
+        """
+        self.load()
+        self.read_requests += 1
+
+        result = {}
+        for column_letter in columns:
+            column_data = ColumnData()
+            if self.is_excel:
+                for cell in self.sheet[column_letter]:
+                    if cell.value is not None:
+                        column_data.append(cell.row, str(cell.value))
+            else:
+                col_idx = column_to_number(column_letter) - 1 # DataFrame은 0-based index
+                if col_idx < len(self.df.columns):
+                    for y, value in enumerate(self.df.iloc[:, col_idx]):
+                        if isinstance(value, str) and value.strip() != '':
+                            column_data.append(y+1, value.replace('\ufeff',''))
+            result[column_letter] = column_data
+        return result
+
+    def text_mask(self, column_number):
+        # csv 전용: 열 전체를 한 번에 보고 (read_columns와 같은 기준으로 값이 있는 행의 불리언 배열, BOM을 뺀 값 리스트)
+        column = self.df.iloc[:, column_number-1].fillna('').astype(str)
+        return column.str.strip().ne('').to_numpy(), column.str.replace('\ufeff', '', regex=False).tolist()
+
+    def empty_mask(self, column_number):
+        # csv 전용: FuriganaJob._is_empty()와 같은 기준으로 빈 셀인 행의 불리언 배열
+        column = self.df.iloc[:, column_number-1].fillna('').astype(str)
+        return column.str.strip().isin(EMPTY_VALUES).to_numpy()
+
+    def set_column_values(self, column_number, rows, values):
+        # csv 전용: 한 열의 여러 행(1부터)을 한 번에 씀
+        self.df.iloc[[row-1 for row in rows], column_number-1] = values
+
+    def get_value(self, row, column_number):
+        # row, column_number 모두 1부터 시작
+        if self.is_excel:
+            return self.sheet.cell(row=row, column=column_number).value
+        return self.df.iat[row-1, column_number-1]
+
+    def _output_font(self, cell_ref):
+        # 셀의 원래 스타일 -> 출력 셀에 쓸 Font. 같은 스타일의 셀은 Font 객체 하나를 공유 (openpyxl이 통합 문서에 한 번만 등록)
+        # Font는 해시할 때마다 모든 속성을 훑으므로, 셀마다 폰트를 복사해 키로 쓰지 않고 style_id를 키로 씀
+        key = cell_ref.style_id
+        font = self.output_fonts.get(key)
+        if font is None:
+            from copy import copy
+            font = copy(cell_ref.font)
+            font.scheme = None # 테마 글꼴이 아니라 셀에 적힌 폰트 이름으로 보이도록 (크기, 굵기, 색 등은 그대로)
+            self.output_fonts[key] = font
+        return font
+
+    def set_value(self, row, column_number, value, keep_font_name=False):
+        if self.is_excel:
+            cell_ref = self.sheet.cell(row=row, column=column_number) # 셀 직접 접근이 더 빠름
+            cell_ref.value = value
+            if keep_font_name:
+                # 셀마다 Font를 새로 만들지 않고 공유 Font를 지정
+                cell_ref.font = self._output_font(cell_ref)
+        else:
+            self.df.iat[row-1, column_number-1] = value
+
+    def ensure_csv_columns(self, count):
+        # DataFrame의 열 개수가 count보다 적으면 빈 열을 추가
+        for i in range(len(self.df.columns), count):
+            self.df[i] = ''
+
+    def save(self):
+        if self.is_excel:
+            with furigana_profile.stage('workbook.save'):
+                self.workbook.save(self.filepath)
+        else:
+            with furigana_profile.stage('to_csv'):
+                self.df.to_csv(self.filepath, encoding='utf-8-sig', index=False, header=None)
+
+    def summary(self):
+        # 완료 보고용 읽기 시간 요약
+        msg = f'ファイル読み込み：{self.load_count}回（{self.load_seconds:.2f}秒）'
+        if self.read_requests > self.load_count:
+            estimated = self.load_seconds / max(self.load_count, 1) * self.read_requests
+            msg += f'\n列の読み込み要求：{self.read_requests}回（毎回読み込む場合は約{estimated:.2f}秒）'
+        return msg
+
+# 진행 상황 -------------------------------------------------------------------------
+PROGRESS_INTERVAL = 0.2    # 진행 상황을 보내는 최소 간격(초)
+PROGRESS_CHUNK_ROWS = 500  # 일반 모드에서 한 번에 변환하는 셀 수 (이 단위로 진행 상황 전송, 중지 확인)
+
+class JobCancelled(Exception):
+    # cancel()이 요청되어 묶음 사이에서 작업을 멈춤
+    pass
+
+class ProgressReporter:
+    """
+    진행 상황을 callback(완료 수, 전체 수, 초당 처리 수, 남은 시간(초))으로 보낸다.
+    너무 자주 보내면 화면 갱신이 오히려 느려지므로 interval초에 한 번만 보내고, 처음과 끝은 항상 보낸다.
+    """
+    def __init__(self, callback, total, interval=None):
+        self.callback = callback
+        self.total = total
+        self.interval = PROGRESS_INTERVAL if interval is None else interval
+        self.start = time.perf_counter()
+        self.last_report = None
+
+    def update(self, done):
+        now = time.perf_counter()
+        if done < self.total and self.last_report is not None and now - self.last_report < self.interval:
+            return
+        self.last_report = now
+        elapsed = now - self.start
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - done) / rate if rate > 0 else 0.0
+        self.callback(done, self.total, rate, eta)
+
+# 변환할 셀 목록 ----------------------------------------------------------------------
+# 셀마다 (행, 출력 열 번호, 원문, 제외 단어, 출력 형식, 폰트 적용 여부) 튜플을 미리 전부 만들면 행 수만큼 튜플이 생기므로,
+# 항목별 배열에 담아 두고 변환 묶음(chunk)을 꺼낼 때만 그만큼 튜플로 만든다.
+class ConversionJobs:
+    """
+    변환할 셀 목록. 원문과 제외 단어는 복사하지 않고, 읽어 둔 열(ColumnData나 리스트)과 그 안의 번호로 가리킨다.
+
+    add_source(texts, excludes, keep_font_name) : 이후 add()가 가리킬 원문 열과 제외 단어 열 (excludes가 None이면 제외 단어 '')
+    add(row, out_col, index, exclude_index, output_format) : 셀 하나 추가 (exclude_index가 -1이면 제외 단어 None)
+    jobs[start:end] : 그 범위의 (행, 출력 열 번호, 원문, 제외 단어, 출력 형식, 폰트 적용 여부) 튜플 리스트
+    """
+    def __init__(self):
+        self.rows = array('i')
+        self.out_cols = array('i')
+        self.indexes = array('i')         # 원문 열 안의 번호
+        self.exclude_indexes = array('i') # 제외 단어 열 안의 번호 (-1: 없음)
+        self.formats = array('B')         # format_names 안의 번호
+        self.format_names = []
+        self.format_ids = {}              # 출력 형식 -> format_names 안의 번호
+        self.sources = []                 # [(시작 번호, 원문 열, 제외 단어 열, 폰트 적용 여부)]
+        self.source_starts = []
+
+    def add_source(self, texts, excludes=None, keep_font_name=True):
+        self.sources.append((len(self.rows), texts, excludes, keep_font_name))
+        self.source_starts.append(len(self.rows))
+
+    def add(self, row, out_col, index, exclude_index=-1, output_format='anki'):
+        format_id = self.format_ids.get(output_format)
+        if format_id is None:
+            format_id = self.format_ids[output_format] = len(self.format_names)
+            self.format_names.append(output_format)
+        self.rows.append(row)
+        self.out_cols.append(out_col)
+        self.indexes.append(index)
+        self.exclude_indexes.append(exclude_index)
+        self.formats.append(format_id)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, key):
+        # 범위(slice)로만 꺼냄
+        start, stop, _ = key.indices(len(self.rows))
+        jobs = []
+        source = bisect.bisect_right(self.source_starts, start) - 1
+        for i in range(start, stop):
+            while source + 1 < len(self.sources) and self.source_starts[source + 1] <= i:
+                source += 1
+            _, texts, excludes, keep_font_name = self.sources[source]
+            if excludes is None:
+                exclude_text = ''
+            else:
+                exclude_index = self.exclude_indexes[i]
+                exclude_text = excludes[exclude_index] if exclude_index >= 0 else None
+            jobs.append((self.rows[i], self.out_cols[i], texts[self.indexes[i]], exclude_text,
+                         self.format_names[self.formats[i]], keep_font_name))
+        return jobs
+
+# 공유 자원 -------------------------------------------------------------------------
+class JobResources:
+    """
+    변환에 쓰는 결과 캐시, 프로세스 풀, 단계별 시간 측정을 한데 묶은 것.
+    FuriganaBatch는 하나를 만들어 모든 파일의 FuriganaJob에 넘기므로 캐시 연결과 작업자 프로세스가 한 번만 만들어진다.
+    (Tagger는 스레드마다 하나이므로 같은 스레드에서 변환하는 파일들은 같은 Tagger를 쓴다)
+    """
+    def __init__(self, options):
+        self.options = options
+        self.cache = None
+        self.pool = None
+        self.profiler = StageProfiler() if options.profile_mode else None
+        self.opened = False
+
+    def open(self):
+        # 읽기 덮어쓰기 사전을 읽지 못하면 OSError, UnicodeDecodeError (열린 것 없이 그대로)
+        if self.opened:
+            return
+        set_reading_overrides(self.options.overrides_path)
+        self.opened = True
+        # 디스크 캐시: 열지 못하면(권한 등) 캐시 없이 진행
+        self.cache = None
+        if self.options.cache_mode:
+            try:
+                self.cache = FuriganaResultCache()
+            except (sqlite3.Error, OSError):
+                self.cache = None
+        self.pool = FuriganaProcessPool(workers=self.options.worker_count) if self.options.parallel_mode else None
+
+    def close(self):
+        # 닫은 뒤에도 cache.summary()는 쓸 수 있음
+        if self.pool is not None:
+            self.pool.close()
+        if self.cache is not None:
+            self.cache.close()
+        self.opened = False
+
+# 작업 ----------------------------------------------------------------------------
+class FuriganaJob:
+    """
+    파일 하나에 후리가나를 붙이는 작업. Qt 없이 동작하므로 GUI(Thread)와 명령줄(furigana_cli)이 함께 쓴다.
+
+    options : kana_mode, overWrite_mode, parallel_mode, worker_count, cache_mode, stream_mode, incremental_mode,
+              profile_mode, trace_path, sheet_names, apkg_mode, overrides_path 속성을 가진 객체
+              (profile_mode가 켜져 있으면 단계별 시간을 완료 메시지에 붙이고, trace_path가 있으면 JSON 트레이스도 저장)
+              (sheet_names가 None이면 활성 시트만, 이름 리스트면 그 시트들, [ALL_SHEETS]면 모든 시트. csv에서는 무시)
+              (apkg_mode가 켜져 있으면 원본 파일은 그대로 두고 "파일 이름.apkg"에 Anki 패키지로 출력)
+              (overrides_path가 있으면 그 읽기 덮어쓰기 사전을 씀. furigana_overrides 참고)
+    notify  : 상태 코드를 받는 함수 (1: 덮어쓰기 확인, 2: 파일을 열 수 없음, 3: 완료, 4: 파일 형식 오류, 5: 중지됨)
+              코드를 보내기 전에 fault_message에 보여줄 문장을 넣어둔다.
+    progress: 진행 상황을 받는 함수 (ProgressReporter 참고)
+    resources: 다른 작업과 함께 쓰는 JobResources (None이면 이 작업이 직접 열고 닫음)
+
+    cancel()을 부르면 다른 스레드에서도 작업을 멈출 수 있다. 묶음 사이에서 멈추며, 이때 파일은 바뀌지 않는다.
+    """
+    fault_message = ''
+
+    def __init__(self, options, filepath, columns, notify=None, progress=None, resources=None):
+        self.options = options
+        self.filepath = filepath
+        self.columns = columns
+        self.notify = notify or (lambda signal: None)
+        self.progress = progress or (lambda done, total, rate, eta: None)
+        self.session = None
+        self.sheets = []          # [(시트 이름, 세션)] -- 메모리 모드에서는 모든 시트가 세션 하나를 같이 씀
+        self.sheet_name = None    # 지금 처리 중인 시트
+        self.empty_columns = {}   # 시트 이름 -> 사전 확인(preflight)에서 비어 있던 출력 열 번호
+        self.converted_cells = 0
+        self.writer = None        # Anki 패키지 출력(apkg_mode)에서 쓰는 AnkiPackageWriter
+        self.skipped_notes = 0    # Anki 패키지 출력에서 첫 필드가 비어 넣지 않은 행 수
+        self._cancel_event = threading.Event()
+        self.owns_resources = resources is None
+        self.resources = resources or JobResources(options)
+        self.profiler = self.resources.profiler
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def _check_cancel(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+        
+    def _new_session(self, sheet_name=None):
+        # 파일은 세션이 처음 만들어질 때 한 번만 읽고, 이후 요청은 메모리에서 처리
+        # 대용량 모드에서는 통째로 읽지 않고 필요한 열만 스트리밍으로 읽음 (시트마다 세션 하나)
+        if self.options.stream_mode and self.filepath.endswith(('.xlsx', '.xlsm')):
+            return XlsxSheetStream(self.filepath, sheet_name)
+        elif self.options.stream_mode and self.filepath.endswith('.csv'):
+            return CsvStream(self.filepath)
+        elif isinstance(self.session, WorkbookSession):
+            return self.session
+        return WorkbookSession(self.filepath)
+
+    def _select(self, sheet_name, session):
+        # 이후의 열 읽기, 셀 쓰기 대상을 이 시트로
+        self.sheet_name = sheet_name
+        self.session = session
+        if isinstance(session, WorkbookSession):
+            session.select_sheet(sheet_name)
+
+    def _open_sheets(self):
+        # 처리할 (시트 이름, 세션) 리스트. 열지 못하면 None (notify 전송 완료)
+        names = self.options.sheet_names
+        if not names or self.filepath.endswith('.csv'):
+            self.session = self._new_session()
+            return [(None, self.session)]
+        try:
+            self.session = self._new_session()
+            available = self.session.sheet_names()
+        except:
+            self.fault_message = 'ファイルを開けません。\nファイルの経路や名前を確認してください。'
+            self.notify(2)
+            return None
+        if ALL_SHEETS in names:
+            names = available
+        names = list(dict.fromkeys(names)) # 같은 시트를 두 번 고쳐 쓰지 않도록
+        missing = [name for name in names if name not in available]
+        if missing:
+            self.fault_message = 'シート「' + '」「'.join(missing) + '」が見つかりません。'
+            self.notify(2)
+            return None
+        return [(name, self._new_session(name)) for name in names]
+
+    def get_multiple_columns_with_rows(self, columns):
+        try:
+            if self.filepath.endswith(('.xlsx', '.xlsm', '.csv')):
+                if self.session is None:
+                    self.session = self._new_session()
+                return self.session.read_columns(columns)
+
+            else:
+                self.fault_message = 'ファイルの形式が間違っています。'
+                self.notify(4)
+        except:
+            self.fault_message = 'ファイルを開けません。\nファイルの経路や名前を確認してください。'
+            self.notify(2)
+
+    def run(self):
+        with profiling(self.profiler):
+            self._run()
+
+    def _run(self):
+        Existed_column_list = self.prepare()
+        if Existed_column_list is None: # 파일을 열지 못한 경우 (notify 전송 완료)
+            return
+
+        if Existed_column_list and self.options.overWrite_mode == True:
+            # 열이 겹치는 경우 시그널로 메시지 전송
+            self.fault_message = '出力しようとする'+'、'.join(Existed_column_list) + '列に既にデータがあります。進めますか？'
+            self.notify(1)
+        else:
+            self.continue_process()
+
+    def prepare(self):
+        """
+        열 입력을 해석하고 처리할 시트를 열어, 출력 열에 이미 데이터가 있는 열 이름 리스트를 반환.
+        (여러 시트를 처리할 때는 "シート名!B" 형식) 파일을 열지 못하면 None (notify 전송 완료)
+        """
+        if not self.filepath.endswith(('.xlsx', '.xlsm', '.csv')):
+            self.fault_message = 'ファイルの形式が間違っています。'
+            self.notify(4)
+            return None
+
+        self.input_columns_array = []
+        tuples, lists = parse_mixed_input(self.columns)
+        # 열 입력마다 (입력 열 이름, [(출력 열 번호, 출력 형식), ...])
+        self.lists = [column_outputs(item) for item in lists]
+        self.tuples = [(column_outputs(word_item), column_outputs(sent_item)) for word_item, sent_item in tuples]
+        
+        # 리스트 처리
+        for item in self.lists:
+            self.input_columns_array.append(item)
+        
+        # 튜플 처리
+        for item in self.tuples:
+            for element in item:
+                self.input_columns_array.append(element)
+        
+        self.output_columns_array = [number_to_column(out_col) for _, outputs in self.input_columns_array for out_col, _ in outputs]
+        # 이번 실행에서 쓰는 모든 형식 (셀마다 형태소 분석은 한 번 하고 이 형식들로 한꺼번에 출력)
+        self.output_formats = tuple(dict.fromkeys(output_format for _, outputs in self.input_columns_array for _, output_format in outputs))
+
+        Existed_column_list = []
+        with furigana_profile.stage('出力列の確認'):
+            self.sheets = self._open_sheets()
+            if self.sheets is None:
+                return None
+            for sheet_name, session in self.sheets:
+                self._select(sheet_name, session)
+                Existing_data = self.preflight()
+                if Existing_data is None:
+                    return None
+                self.empty_columns[sheet_name] = {column_to_number(x) for x in self.output_columns_array if not Existing_data[x]}
+
+                for x in self.output_columns_array:
+                    if Existing_data[x]:
+                        label = x if sheet_name is None else f'{sheet_name}!{x}'
+                        if label not in Existed_column_list:
+                            Existed_column_list.append(label)
+        # Anki 패키지 출력은 원본 파일에 쓰지 않으므로 덮어쓰기 확인이 필요 없음
+        return [] if self.options.apkg_mode else Existed_column_list
+
+    def preflight(self):
+        """
+        지금 시트의 출력 열마다 값이 있는지 확인: {열 이름: True/False}. 열지 못하면 None (notify 전송 완료)
+        xlsx는 통합 문서를 불러오지 않고 시트 XML에서 출력 열의 셀만 찾으므로, 큰 파일도 덮어쓰기 확인이 바로 나온다.
+        (통합 문서는 확인 후 continue_process()에서 한 번 불러옴. csv는 pandas로 읽은 것을 그대로 이어서 씀)
+        """
+        try:
+            if isinstance(self.session, (XlsxSheetStream, CsvStream)):
+                # 대용량 모드: 여기서 센 행 수가 진행 상황의 전체 수가 됨
+                return self.session.preflight(self.output_columns_array)
+            if self.session.is_excel:
+                return XlsxSheetStream(self.filepath, self.sheet_name).preflight(self.output_columns_array)
+        except:
+            self.fault_message = 'ファイルを開けません。\nファイルの経路や名前を確認してください。'
+            self.notify(2)
+            return None
+        Existing_data = self.get_multiple_columns_with_rows(self.output_columns_array)
+        if Existing_data is None:
+            return None
+        return {x: any(value != '' for value in Existing_data[x]) for x in self.output_columns_array}
+
+    def release(self):
+        # 처리가 끝난 파일의 세션(통합 문서 전체가 올라가 있을 수 있음)을 놓아 메모리를 돌려줌
+        self.session = None
+        self.sheets = [(sheet_name, None) for sheet_name, _ in self.sheets]
+        
+    @staticmethod
+    def _is_empty(current_val):
+        # 문자열로 변환하여 체크 ('nan', 'None', 공백 등 처리)
+        return (current_val is None) or (str(current_val).strip() in EMPTY_VALUES)
+
+    def _should_update(self, current_val):
+        # 값이 이미 존재하고, 덮어쓰기 모드(overWrite_mode)가 꺼져있으면 업데이트 하지 않음 (False 반환)
+        # 그 외의 경우(값이 없거나, 덮어쓰기 모드인 경우) 업데이트 진행 (True 반환)
+        
+        # 값이 있는데 덮어쓰기 모드가 꺼져있다면 -> 업데이트 스킵
+        if not self._is_empty(current_val) and self.options.overWrite_mode is False:
+            return False
+        return True
+
+    def _wants_update(self, row, out_col, text, exclude_text, current_val, output_format='anki'):
+        # 差分モード가 아니면 기존 규칙(_should_update) 그대로
+        if self.fingerprints is None:
+            return self._should_update(current_val)
+        # 지난번에 이 프로그램이 쓴 셀: 원문이 바뀌었거나 출력이 지워졌을 때만 다시 변환 (덮어쓰기 설정과 무관)
+        if self.fingerprints.known(out_col, row):
+            fp = self.fingerprints.fingerprint(text, exclude_text, self.options.kana_mode, output_format)
+            if self.fingerprints.matches(out_col, row, fp) and not self._is_empty(current_val):
+                self.fingerprints.record(out_col, row, fp)
+                self.fingerprints.unchanged += 1
+                return False
+            return True
+        # 처음 보는 셀(직접 입력한 값 등)은 기존 규칙대로
+        return self._should_update(current_val)
+
+    def _record_fingerprints(self, jobs):
+        # jobs: (행, 출력 열 번호, 원문, 제외 단어, 출력 형식, ...) -- 이번에 변환한 셀의 지문을 남김
+        if self.fingerprints is None:
+            return
+        for row_idx, out_col, text, exclude_text, output_format, *_ in jobs:
+            self.fingerprints.record(out_col, row_idx, self.fingerprints.fingerprint(text, exclude_text, self.options.kana_mode, output_format))
+
+    def convert(self, jobs):
+        # jobs: (행, 출력 열 번호, 원문, 제외 단어, 출력 형식, ...) -> 셀마다 그 형식으로 출력한 결과 리스트
+        # 병렬 모드면 행을 나누어 여러 프로세스에서 처리 (행이 적으면 직렬), 캐시가 있으면 먼저 조회
+        # 같은 원문이 여러 형식 열로 나가도 형태소 분석은 한 번 (render_japanese_texts가 같은 입력을 묶음)
+        texts = [job[2] for job in jobs]
+        excludes = [job[3] for job in jobs]
+        with furigana_profile.stage('変換'):
+            if self.pool is not None:
+                rendered = self.pool.render_japanese_texts(texts, excludes, self.output_formats, self.options.kana_mode, self.cache)
+            else:
+                # 사전 로딩은 한 번만: 모든 셀이 같은 Tagger를 공유
+                rendered = render_japanese_texts(texts, excludes, self.output_formats, self.options.kana_mode, get_tagger(), self.cache)
+        index = {output_format: i for i, output_format in enumerate(self.output_formats)}
+        return [values[index[job[4]]] for job, values in zip(jobs, rendered)]
+
+    def _chunk_size(self, base):
+        # 병렬 모드에서는 묶음이 작으면 직렬로 처리되므로 모든 작업자가 일할 만큼 크게 잡음
+        if self.pool is None:
+            return base
+        return max(base, self.pool.min_rows, self.pool.workers * self.pool.chunk_rows)
+
+    def continue_process(self):
+        with profiling(self.profiler):
+            self._continue_process()
+
+    def _continue_process(self):
+        # 0. 파일 형식 확인
+        if not self.filepath.endswith(('.xlsx', '.xlsm', '.csv')):
+            self.fault_message = 'ファイルの形式が間違っています。'
+            self.notify(4)
+            return # 에러 시 함수 종료
+
+        if isinstance(self.session, WorkbookSession):
+            # 사전 확인은 시트 XML만 읽으므로 통합 문서는 여기서 처음 불러옴
+            try:
+                self.session.load()
+            except:
+                self.fault_message = 'ファイルを開けません。\nファイルの経路や名前を確認してください。'
+                self.notify(2)
+                return
+
+        if not self._open_resources():
+            return
+        self.cache = self.resources.cache
+        self.pool = self.resources.pool
+        self.sheet_fingerprints = [] # [(시트 이름, RowFingerprints)]
+
+        try:
+            self._check_cancel()
+            if self.options.apkg_mode:
+                self.process_export()
+            else:
+                plans = [] # 대용량 모드: 시트마다 streaming_plan()
+                # 差分モード: 변환 규칙이나 사전이 바뀌면 예전 지문을 쓰지 않도록 결과 캐시와 같은 규칙 정보를 지문에 넣음
+                version = conversion_version() if self.options.incremental_mode else None
+                for sheet_name, session in self.sheets:
+                    self._select(sheet_name, session)
+                    self.fingerprints = RowFingerprints(self.filepath, sheet_name, version) if self.options.incremental_mode else None
+                    if isinstance(session, (XlsxSheetStream, CsvStream)):
+                        plans.append(self.streaming_plan())
+                    else:
+                        self.process_in_memory()
+                    if self.fingerprints is not None:
+                        self.sheet_fingerprints.append((sheet_name, self.fingerprints))
+                if plans:
+                    self.process_streaming(plans)
+
+                # [I/O 최적화] 메모리 모드: 변경 사항이 있을 때만, 모든 시트를 고친 뒤 한 번만 저장
+                if isinstance(self.session, WorkbookSession) and self.converted_cells:
+                    self._check_cancel() # 저장 직전에 한 번 더 확인 (저장 후에는 되돌릴 수 없음)
+                    self.session.save()
+                for _, fingerprints in self.sheet_fingerprints:
+                    fingerprints.save()
+        except JobCancelled:
+            self.fault_message = '中止しました。ファイルは変更されていません。'
+            self.notify(5)
+            return
+        finally:
+            if self.owns_resources:
+                self.resources.close()
+
+        self.fault_message = '完了しました。\n\n' + self.summary()
+        if self.owns_resources and self.profiler is not None:
+            self.fault_message += '\n\n' + self.profiler.summary()
+            if self.options.trace_path:
+                self.profiler.write_trace(self.options.trace_path)
+        self.notify(3)
+
+    def _open_resources(self):
+        # 캐시, 프로세스 풀, 읽기 덮어쓰기 사전을 염. 사전을 읽지 못하면 notify(2) 후 False
+        try:
+            self.resources.open()
+        except (OSError, UnicodeDecodeError):
+            self.fault_message = '読み方辞書を開けません。\nファイルの経路や名前、文字コード（UTF-8）を確認してください。'
+            self.notify(2)
+            return False
+        return True
+
+    def summary(self):
+        # 완료 보고: 파일 읽기/쓰기, 캐시(직접 연 경우), 差分モード. 시트가 여러 개면 시트 이름을 앞에 붙임
+        lines = []
+        sessions = []
+        for sheet_name, session in self.sheets:
+            if session is None or any(session is seen for seen in sessions):
+                continue
+            sessions.append(session)
+            prefix = f'［{sheet_name}］' if isinstance(session, XlsxSheetStream) and len(self.sheets) > 1 else ''
+            lines.append(prefix + session.summary())
+        if len(self.sheets) > 1:
+            lines.append(f'シート：{len(self.sheets)}枚（' + '、'.join(sheet_name for sheet_name, _ in self.sheets) + '）')
+        if self.owns_resources and self.cache is not None:
+            lines.append(self.cache.summary())
+        for sheet_name, fingerprints in self.sheet_fingerprints:
+            prefix = f'［{sheet_name}］' if len(self.sheets) > 1 else ''
+            lines.append(prefix + fingerprints.summary())
+        if self.writer is not None:
+            lines.append(self.writer.summary())
+            if self.skipped_notes:
+                lines.append(f'最初のフィールド（{self.writer.field_names[0]}列）が空の{self.skipped_notes}行はスキップしました')
+        return '\n'.join(lines)
+
+    def process_in_memory(self):
+        # run()에서 이미 읽어둔 파일을 그대로 사용 (파일을 다시 읽지 않음)
+        session = self.session
+        session.load()
+        if session.is_csv:
+            # 필요한 컬럼 수 확보
+            required_cols = max([column_to_number(x) for x in self.output_columns_array])
+            session.ensure_csv_columns(required_cols + 1)
+
+        # 1. 변환할 셀 모으기 (ConversionJobs: 원문은 읽어 둔 열을 가리키기만 함)
+        with furigana_profile.stage('セル収集'):
+            jobs = self.collect_csv(session) if session.is_csv else self.collect_in_memory(session)
+
+        # 2. 묶음 단위로 변환하고 바로 기록: 묶음 사이마다 진행 상황을 알리고 중지 요청을 확인
+        # (저장은 모든 시트를 처리한 뒤 _continue_process에서 한 번. 중지되면 저장하지 않으므로 파일은 그대로)
+        reporter = ProgressReporter(self.progress, len(jobs))
+        reporter.update(0)
+        chunk_size = self._chunk_size(PROGRESS_CHUNK_ROWS)
+        by_column = {} # csv: 출력 열 번호 -> (행 리스트, 값 리스트)
+        done = 0
+        for start in range(0, len(jobs), chunk_size):
+            self._check_cancel()
+            chunk = jobs[start:start + chunk_size]
+            results = self.convert(chunk)
+            with furigana_profile.stage('セル書き込み'):
+                if session.is_csv:
+                    for (row_idx, out_col, *_), converted in zip(chunk, results):
+                        rows, values = by_column.setdefault(out_col, ([], []))
+                        rows.append(row_idx)
+                        values.append(converted)
+                else:
+                    for (row_idx, out_col, _, _, _, keep_font_name), converted in zip(chunk, results):
+                        session.set_value(row_idx, out_col, converted, keep_font_name)
+            self._record_fingerprints(chunk)
+            done += len(chunk)
+            reporter.update(done)
+        self._check_cancel()
+
+        # 3. csv: DataFrame은 셀마다 쓰면 느리므로 열마다 모아서 한 번에 씀
+        if by_column:
+            with furigana_profile.stage('セル書き込み'):
+                for out_col, (rows, values) in by_column.items():
+                    session.set_column_values(out_col, rows, values)
+        self.converted_cells += len(jobs)
+
+    def collect_in_memory(self, session):
+        # 변환할 셀 모으기 -> ConversionJobs (행, 출력 열 번호, 원문, 제외 단어, 출력 형식, 폰트 적용 여부)
+        # 한 원문의 여러 형식 열은 연달아 넣어 같은 변환 묶음에 들어가게 함
+        jobs = ConversionJobs()
+        # 사전 확인에서 비어 있던 출력 열은 셀을 읽지 않음
+        empty_columns = self.empty_columns.get(self.sheet_name, set())
+
+        def add_jobs(row_idx, outputs, index, text, exclude_index, exclude_text):
+            for out_col, output_format in outputs:
+                current_val = None if out_col in empty_columns else session.get_value(row_idx, out_col)
+                if self._wants_update(row_idx, out_col, text, exclude_text, current_val, output_format):
+                    jobs.add(row_idx, out_col, index, exclude_index, output_format)
+
+        # 1-1. 단일 리스트 처리 (self.lists)
+        for col_char, outputs in self.lists:
+            data = self.get_multiple_columns_with_rows([col_char])[col_char]
+            jobs.add_source(data, None, True)
+            for index, (row_idx, text) in enumerate(data.items()):
+                add_jobs(row_idx, outputs, index, text, -1, '')
+
+        # 1-2. 튜플 처리 (self.tuples: 단어-문장 쌍)
+        for (word_col, word_outputs), (sent_col, sent_outputs) in self.tuples:
+            # 데이터 가져오기
+            word_data = self.get_multiple_columns_with_rows([word_col])[word_col]
+            sent_data = self.get_multiple_columns_with_rows([sent_col])[sent_col]
+
+            # 문장(Sentence) 처리: 같은 행(row_idx)에 단어가 존재하면 exclude_text로 사용
+            # (따로 {행: 단어} dict를 만들지 않고 두 열의 행 번호 배열을 나란히 훑음)
+            jobs.add_source(sent_data, word_data, True)
+            word_indexes = word_data.align(sent_data.rows)
+            for index, ((row_idx, sent_text), word_index) in enumerate(zip(sent_data.items(), word_indexes)):
+                add_jobs(row_idx, sent_outputs, index, sent_text, word_index, word_data[word_index] if word_index >= 0 else None)
+
+            # 단어(Word) 처리
+            jobs.add_source(word_data, None, False)
+            for index, (row_idx, word_text) in enumerate(word_data.items()):
+                add_jobs(row_idx, word_outputs, index, word_text, -1, '')
+        return jobs
+
+    def collect_csv(self, session):
+        # collect_in_memory()의 csv 판: 셀마다 읽어 확인하지 않고, 열마다 불리언 마스크로 변환할 행을 한 번에 고름
+        # 덮어쓰기 규칙은 _should_update()와 같음. 差分モード에서는 값이 있는 행만 _wants_update()로 하나씩 확인
+        jobs = ConversionJobs()
+
+        def add_jobs(source, outputs, keep_font_name, exclude_source=None):
+            has_text, texts = session.text_mask(column_to_number(source))
+            # 같은 행에 단어가 있으면 제외 단어로, 없으면 None
+            excludes = exclude_mask = None
+            if exclude_source is not None:
+                exclude_mask, excludes = session.text_mask(column_to_number(exclude_source))
+                exclude_mask = exclude_mask.tolist()
+            jobs.add_source(texts, excludes, keep_font_name)
+
+            def exclude_index(y):
+                return y if exclude_mask is not None and exclude_mask[y] else -1
+
+            if self.fingerprints is None:
+                masks = [has_text if self.options.overWrite_mode else has_text & session.empty_mask(out_col) for out_col, _ in outputs]
+                rows = masks[0]
+                for mask in masks[1:]:
+                    rows = rows | mask
+                masks = [mask.tolist() for mask in masks]
+                for y in rows.nonzero()[0].tolist():
+                    for (out_col, output_format), mask in zip(outputs, masks):
+                        if mask[y]:
+                            jobs.add(y+1, out_col, y, exclude_index(y), output_format)
+            else:
+                current = [session.df.iloc[:, out_col-1].tolist() for out_col, _ in outputs]
+                for y in has_text.nonzero()[0].tolist():
+                    index = exclude_index(y)
+                    exclude_text = '' if excludes is None else (excludes[index] if index >= 0 else None)
+                    for (out_col, output_format), values in zip(outputs, current):
+                        if self._wants_update(y+1, out_col, texts[y], exclude_text, values[y], output_format):
+                            jobs.add(y+1, out_col, y, index, output_format)
+
+        for col_char, outputs in self.lists:
+            add_jobs(col_char, outputs, True)
+
+        for (word_col, word_outputs), (sent_col, sent_outputs) in self.tuples:
+            add_jobs(sent_col, sent_outputs, True, word_col)
+            add_jobs(word_col, word_outputs, False)
+        return jobs
+
+    def streaming_plan(self):
+        # 대용량 모드: 지금 시트를 고쳐 쓸 (세션, 열 번호들, update_rows, 출력 열 번호들, 묶음 크기). 실제로 쓰는 것은 process_streaming()
+        # 파일을 행 묶음 단위로 읽어 변환하고, 바뀐 셀만 고쳐 쓰므로 메모리에는 처리 중인 행 묶음만 올라감
+        # 열 입력마다 (입력 열 번호, [(출력 열 번호, 출력 형식), ...])
+        list_columns = [(column_to_number(col_char), outputs) for col_char, outputs in self.lists]
+        tuple_columns = [((column_to_number(word_col), word_outputs), (column_to_number(sent_col), sent_outputs))
+                         for (word_col, word_outputs), (sent_col, sent_outputs) in self.tuples]
+        source_columns = list_columns + [spec for pair in tuple_columns for spec in pair]
+        output_columns = [out_col for _, outputs in source_columns for out_col, _ in outputs]
+
+        sheet_name, session, fingerprints = self.sheet_name, self.session, self.fingerprints
+        reporter = None
+        rows_done = 0
+
+        def update_rows(rows):
+            nonlocal rows_done, reporter
+            # 예외로 빠져나가면 임시 파일만 지워지고 원본 파일은 그대로 남음
+            self._check_cancel()
+            # 여러 시트를 한 번에 고쳐 쓰므로 이 묶음이 속한 시트를 다시 고름
+            self.sheet_name, self.session, self.fingerprints = sheet_name, session, fingerprints
+            if reporter is None:
+                # 전체 행 수는 run()에서 출력 열을 확인하며 한 번 읽은 행 수
+                reporter = ProgressReporter(self.progress, session.rows_total)
+                reporter.update(0)
+            jobs = [] # (행, 출력 열 번호, 원문, 제외 단어, 출력 형식)
+
+            def add_jobs(row_idx, values, src, outputs, exclude_text):
+                if values.get(src) is None:
+                    return
+                for out_col, output_format in outputs:
+                    if self._wants_update(row_idx, out_col, values[src], exclude_text, values.get(out_col), output_format):
+                        jobs.append((row_idx, out_col, values[src], exclude_text, output_format))
+
+            for row_idx, values in rows:
+                for src, outputs in list_columns:
+                    add_jobs(row_idx, values, src, outputs, '')
+                for (word_col, word_outputs), (sent_col, sent_outputs) in tuple_columns:
+                    add_jobs(row_idx, values, sent_col, sent_outputs, values.get(word_col))
+                    add_jobs(row_idx, values, word_col, word_outputs, '')
+
+            results = self.convert(jobs)
+            self._record_fingerprints(jobs)
+            self.converted_cells += len(jobs)
+            rows_done += len(rows)
+            reporter.update(min(rows_done, reporter.total))
+            return {(row_idx, out_col): converted for (row_idx, out_col, *_), converted in zip(jobs, results)}
+
+        return (session, [src for src, _ in source_columns] + output_columns, update_rows,
+                output_columns, self._chunk_size(STREAM_CHUNK_ROWS))
+
+    def process_streaming(self, plans):
+        # plans: 시트마다 streaming_plan(). xlsx는 모든 시트를 zip 한 번에 고쳐 쓰고, 원본 파일은 마지막 중지 확인 뒤에 한 번만 바꿈
+        with furigana_profile.stage('ストリーミング読み書き'):
+            if isinstance(plans[0][0], CsvStream):
+                session, *args = plans[0]
+                session.rewrite(*args, before_replace=self._check_cancel)
+            else:
+                rewrite_sheets(self.filepath, plans, before_replace=self._check_cancel)
+
+    def _source_specs(self):
+        # 열 입력마다 (입력 열 번호, [(출력 열 번호, 출력 형식), ...], 제외 단어 열 번호 또는 None)
+        specs = [(column_to_number(col_char), outputs, None) for col_char, outputs in self.lists]
+        for (word_col, word_outputs), (sent_col, sent_outputs) in self.tuples:
+            specs.append((column_to_number(sent_col), sent_outputs, column_to_number(word_col)))
+            specs.append((column_to_number(word_col), word_outputs, None))
+        return specs
+
+    def _iter_export_rows(self, source_columns, chunk_rows):
+        # (전체 행 수, [(행 번호, {열 번호: 값})] 묶음을 넘겨주는 반복자)
+        if isinstance(self.session, (XlsxSheetStream, CsvStream)):
+            # 전체 행 수는 run()에서 출력 열을 확인하며 한 번 읽은 행 수
+            return self.session.rows_total, self.session.read_rows(source_columns, chunk_rows)
+        data = self.get_multiple_columns_with_rows([number_to_column(col) for col in source_columns])
+        columns = [(col, data[number_to_column(col)]) for col in source_columns]
+        # 어느 열에든 값이 있는 행 번호. 행마다 값은 묶음을 만들 때 열의 행 번호 배열에서 찾음
+        rows = array('i', sorted(set().union(*(column.rows for _, column in columns))))
+
+        def chunks():
+            for start in range(0, len(rows), chunk_rows):
+                chunk = []
+                for row_idx in rows[start:start + chunk_rows]:
+                    values = {}
+                    for col, column in columns:
+                        text = column.get(row_idx)
+                        if text is not None:
+                            values[col] = text
+                    chunk.append((row_idx, values))
+                yield chunk
+        return len(rows), chunks()
+
+    def process_export(self):
+        # Anki 패키지 출력: 시트마다 덱 하나, 행마다 노트 하나 (필드는 입력 열과 출력 열을 열 순서대로)
+        # 원본 파일과 差分モード의 기록은 건드리지 않는다. 중지되거나 실패하면 만들던 패키지는 지워짐
+        specs = self._source_specs()
+        sources = {src for src, _, _ in specs}
+        field_columns = sorted(sources | {out_col for _, outputs, _ in specs for out_col, _ in outputs})
+        furigana_fields = [number_to_column(out_col) for _, outputs, _ in specs for out_col, output_format in outputs if output_format == 'anki']
+        self.writer = AnkiPackageWriter(os.path.splitext(self.filepath)[0] + '.apkg',
+                                        [number_to_column(col) for col in field_columns], furigana_fields)
+        with self.writer:
+            stem = os.path.splitext(os.path.basename(self.filepath))[0]
+            for sheet_name, session in self.sheets:
+                self._select(sheet_name, session)
+                deck_name = stem if sheet_name is None else f'{stem}::{sheet_name}'
+                deck_id = self.writer.add_deck(deck_name)
+                total, chunks = self._iter_export_rows(sorted(sources), self._chunk_size(PROGRESS_CHUNK_ROWS))
+                reporter = ProgressReporter(self.progress, total)
+                reporter.update(0)
+                rows_done = 0
+                for rows in chunks:
+                    self._check_cancel()
+                    jobs = [] # (행, 출력 열 번호, 원문, 제외 단어, 출력 형식)
+                    for row_idx, values in rows:
+                        for src, outputs, exclude_col in specs:
+                            if values.get(src) is None:
+                                continue
+                            exclude_text = values.get(exclude_col) if exclude_col is not None else ''
+                            for out_col, output_format in outputs:
+                                jobs.append((row_idx, out_col, values[src], exclude_text, output_format))
+                    converted = {(row_idx, out_col): value for (row_idx, out_col, *_), value in zip(jobs, self.convert(jobs))}
+                    notes = []
+                    for row_idx, values in rows:
+                        if all(values.get(src) is None for src in sources):
+                            continue
+                        fields = [values.get(col) if col in sources else converted.get((row_idx, col)) for col in field_columns]
+                        # 첫 필드(정렬 필드)가 빈 노트는 Anki가 가져올 때 거부하므로 넣지 않고 셈
+                        if fields[0] is None or str(fields[0]).strip() == '':
+                            self.skipped_notes += 1
+                            continue
+                        notes.append((f'{deck_name}:{row_idx}', fields))
+                    with furigana_profile.stage('Ankiパッケージ書き込み'):
+                        self.writer.add_notes(deck_id, notes)
+                    self.converted_cells += len(jobs)
+                    rows_done += len(rows)
+                    reporter.update(min(rows_done, reporter.total))
+            self._check_cancel() # 패키지 저장 직전에 한 번 더 확인
+
+# 여러 파일 ------------------------------------------------------------------------
+BATCH_IO_WORKERS = 4 # 여러 파일을 처리할 때 동시에 읽는 최대 파일 수
+
+class FuriganaBatch:
+    """
+    여러 파일(폴더 안의 파일 등)에 한 번에 후리가나를 붙이는 작업. FuriganaJob과 같은 방법으로 쓴다.
+    (run, continue_process, cancel, notify, progress, fault_message)
+
+    모든 파일이 캐시, 프로세스 풀, Tagger를 함께 쓴다. 파일 읽기(출력 열 확인)는 디스크 I/O와 압축 해제가
+    대부분이므로 여러 파일을 스레드로 동시에 하고, 변환과 저장은 파일 순서대로 한다.
+    덮어쓰기 확인(1)은 모든 파일을 모아 한 번만 보내고, 완료 메시지에는 파일별 결과와 합계가 들어간다.
+
+    results : 파일마다 (경로, 상태 코드, 메시지) -- 상태 코드 3이 완료, None은 중지되어 처리하지 않은 파일
+    """
+    fault_message = ''
+
+    def __init__(self, options, filepaths, columns, notify=None, progress=None):
+        self.options = options
+        self.filepaths = list(filepaths)
+        self.columns = columns
+        self.notify = notify or (lambda signal: None)
+        self.progress = progress or (lambda done, total, rate, eta: None)
+        self.resources = JobResources(options)
+        self.jobs = [] # [(FuriganaJob, 그 작업이 보낸 상태 코드 리스트)]
+        self.results = []
+        self.current = None
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+        job = self.current
+        if job is not None:
+            job.cancel()
+
+    def run(self):
+        with profiling(self.resources.profiler):
+            self._run()
+
+    def _run(self):
+        self.jobs = []
+        for filepath in self.filepaths:
+            signals = []
+            job = FuriganaJob(self.options, filepath, self.columns, notify=signals.append, progress=self.progress, resources=self.resources)
+            # 열 수 없는 파일은 건너뛰고 나머지 파일은 계속 처리
+            if not os.path.exists(filepath):
+                job.fault_message = 'ファイルを開けません。\nファイルの経路や名前を確認してください。'
+                signals.append(2)
+            elif check_file_is_open(filepath):
+                job.fault_message = 'ファイルが開けています。閉じてください。'
+                signals.append(2)
+            self.jobs.append((job, signals))
+
+        pending = [job for job, signals in self.jobs if not signals]
+
+        def prepare(job):
+            # 계측 대상은 스레드마다 따로이므로 읽기 스레드에서도 이 묶음의 profiler로 기록
+            with profiling(self.resources.profiler):
+                return job.prepare()
+
+        with ThreadPoolExecutor(max_workers=max(1, min(BATCH_IO_WORKERS, len(pending)))) as executor:
+            existing = dict(zip(pending, executor.map(prepare, pending)))
+
+        Existed_file_list = []
+        for job in pending:
+            if existing[job]:
+                Existed_file_list.append(os.path.basename(job.filepath) + '：' + '、'.join(existing[job]) + '列')
+
+        if Existed_file_list and self.options.overWrite_mode == True:
+            self.fault_message = '出力しようとする列に既にデータがあります。進めますか？\n\n' + '\n'.join(Existed_file_list)
+            self.notify(1)
+        else:
+            self.continue_process()
+
+    def continue_process(self):
+        with profiling(self.resources.profiler):
+            self._continue_process()
+
+    def _continue_process(self):
+        try:
+            self.resources.open()
+        except (OSError, UnicodeDecodeError):
+            self.fault_message = '読み方辞書を開けません。\nファイルの経路や名前、文字コード（UTF-8）を確認してください。'
+            self.results = [(job.filepath, signals[-1] if signals else 2, job.fault_message if signals else self.fault_message)
+                            for job, signals in self.jobs]
+            self.notify(2)
+            return
+        cancelled = False
+        lines = []
+        try:
+            for job, signals in self.jobs:
+                if signals: # 준비 단계에서 실패한 파일
+                    lines.append(f'・{os.path.basename(job.filepath)}：' + job.fault_message.replace('\n', ''))
+                    continue
+                self.current = job
+                if self._cancel_event.is_set():
+                    cancelled = True
+                    break
+                job.continue_process()
+                self.current = None
+                if 5 in signals:
+                    cancelled = True
+                    break
+                lines.append(self._file_line(job, signals))
+                job.release()
+        finally:
+            self.current = None
+            self.resources.close()
+
+        self.results = [(job.filepath, signals[-1] if signals and signals[-1] != 5 else None, job.fault_message)
+                        for job, signals in self.jobs]
+        done = [job for job, signals in self.jobs if 3 in signals]
+        total_cells = sum(job.converted_cells for job in done)
+
+        if cancelled:
+            self.fault_message = f'中止しました。{len(done)}件のファイルは完了し、残りのファイルは変更されていません。\n\n' + '\n'.join(lines)
+            self.notify(5)
+            return
+        if not done:
+            self.fault_message = 'ファイルを処理できませんでした。\n\n' + '\n'.join(lines)
+            self.notify(2)
+            return
+
+        self.fault_message = f'完了しました。（{len(done)}/{len(self.jobs)}ファイル、{total_cells}セル）\n\n' + '\n'.join(lines)
+        if self.resources.cache is not None:
+            self.fault_message += '\n\n' + self.resources.cache.summary()
+        profiler = self.resources.profiler
+        if profiler is not None:
+            self.fault_message += '\n\n' + profiler.summary()
+            if self.options.trace_path:
+                profiler.write_trace(self.options.trace_path)
+        self.notify(3)
+
+    @staticmethod
+    def _file_line(job, signals):
+        # 파일 하나의 결과 한 줄
+        name = os.path.basename(job.filepath)
+        if 3 not in signals:
+            return f'・{name}：' + job.fault_message.replace('\n', '')
+        line = f'・{name}：{job.converted_cells}セル'
+        if len(job.sheets) > 1:
+            line += f'（{len(job.sheets)}シート）'
+        unchanged = sum(fingerprints.unchanged for _, fingerprints in job.sheet_fingerprints)
+        if job.sheet_fingerprints:
+            line += f'、変更なし{unchanged}件をスキップ'
+        if job.writer is not None:
+            line += f'、{os.path.basename(job.writer.path)}に{job.writer.note_count}件のノート'
+        return line
@@ -0,0 +1,166 @@
+import os, json, hashlib, tempfile, jaconv
+
+# 읽기 덮어쓰기 사전 --------------------------------------------------------------------
+# MeCab/UniDic이 잘못 읽는 이름, 전문 용어 등을 "표기 -> 읽기"로 적어 두면 형태소 분석 결과 대신 그 읽기를 쓴다.
+# 항목이 수천 개여도 셀마다 문자열을 한 번만 훑도록 Aho-Corasick 오토마톤(PhraseMatcher)으로 컴파일하고,
+# 컴파일한 결과는 캐시 폴더에 JSON으로 저장해 두어 다음 실행(과 병렬 처리의 작업자 프로세스)에서는 다시 만들지 않는다.
+# 사전은 형태소 분석 결과에 덧씌우므로, 양 끝이 토큰 경계에 맞는 곳만 바꾼다. (京都 -> 東京都의 京都는 바꾸지 않음)
+#
+# 파일 형식 (utf-8, BOM 허용): 한 줄에 "표기<TAB>읽기" 또는 "表記,読み". 빈 줄과 #으로 시작하는 줄은 무시
+#   小鳥遊	たかなし
+#   御手洗,みたらい
+OVERRIDES_FORMAT_VERSION = 3 # 컴파일 형식이나 적용 방식이 바뀌면 올려서 예전 캐시 파일과 결과를 쓰지 않게 함
+
+def parse_overrides(text):
+    # 파일 내용 -> {표기: 읽기(히라가나)}. 같은 표기가 여러 번 나오면 뒤의 것
+    entries = {}
+    for line in text.lstrip('\ufeff').splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        surface, sep, reading = line.partition('\t') if '\t' in line else line.partition(',')
+        surface, reading = surface.strip(), reading.strip()
+        if sep and surface and reading:
+            entries[surface] = jaconv.kata2hira(reading)
+    return entries
+
+class PhraseMatcher:
+    """
+    여러 패턴을 한 번에 찾는 Aho-Corasick 오토마톤. 패턴은 문자열이나 기호(토큰의 기본형 등)의 튜플.
+
+    spans(sequence)        : sequence를 한 번 훑어, 왼쪽부터 가장 긴 일치를 겹치지 않게 [(시작, 끝)]으로 반환
+    spans(sequence, True)  : 겹치는 것도 포함해 모든 일치를 반환
+    boundaries             : 위치 집합을 주면 시작과 끝이 모두 그 안에 있는 일치만 찾음 (토큰 경계 등)
+    """
+    def __init__(self, patterns):
+        self.goto = [{}]      # 상태 -> {기호: 다음 상태}
+        self.fail = [0]       # 상태 -> 실패 링크
+        self.length = [0]     # 상태 -> 이 상태에서 끝나는 패턴의 길이 (없으면 0)
+        self.output = [0]     # 상태 -> 실패 링크를 따라가며 처음 만나는 패턴이 끝나는 상태 (없으면 0)
+
+        for pattern in patterns:
+            state = 0
+            for symbol in pattern:
+                next_state = self.goto[state].get(symbol)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][symbol] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.length.append(0)
+                    self.output.append(0)
+                state = next_state
+            self.length[state] = len(pattern)
+
+        # 너비 우선으로 실패 링크와 출력 링크를 채움
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for symbol, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and symbol not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(symbol, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.output[next_state] = target if self.length[target] else self.output[target]
+
+    def spans(self, sequence, overlapping=False, boundaries=None):
+        goto, fail, length, output = self.goto, self.fail, self.length, self.output
+        found = [] if overlapping else None
+        longest = {} # 시작 위치 -> 가장 긴 일치의 끝 위치
+        state = 0
+        for i, symbol in enumerate(sequence):
+            while state and symbol not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(symbol, 0)
+            match = state if length[state] else output[state]
+            while match:
+                start = i + 1 - length[match]
+                match = output[match]
+                if boundaries is not None and (start not in boundaries or i + 1 not in boundaries):
+                    continue
+                if overlapping:
+                    found.append((start, i + 1))
+                elif longest.get(start, -1) < i + 1:
+                    longest[start] = i + 1
+        if overlapping or not longest:
+            return found or []
+
+        matches = []
+        pos = 0
+        for start in sorted(longest):
+            if start >= pos:
+                matches.append((start, longest[start]))
+                pos = longest[start]
+        return matches
+
+class ReadingOverrides(PhraseMatcher):
+    """
+    표기 -> 읽기 덮어쓰기 사전.
+
+    find(text, boundaries) : text를 한 번 훑어, 왼쪽부터 가장 긴 일치를 겹치지 않게 [(시작, 끝, 읽기)]로 반환
+                             (boundaries는 PhraseMatcher.spans와 같음)
+    digest                 : 사전 내용의 해시 (결과 캐시의 키에 넣어 사전이 바뀌면 예전 결과를 쓰지 않게 함)
+    """
+    def __init__(self, entries, digest=''):
+        self.entries = dict(entries)
+        self.digest = digest
+        super().__init__(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def find(self, text, boundaries=None):
+        return [(start, end, self.entries[text[start:end]]) for start, end in self.spans(text, boundaries=boundaries)]
+
+    def dump(self, f):
+        # 컴파일 결과를 JSON으로 저장 (pickle과 달리 읽을 때 코드를 실행하지 않음)
+        json.dump({'digest': self.digest, 'entries': self.entries, 'goto': self.goto, 'fail': self.fail,
+                   'length': self.length, 'output': self.output}, f, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, f, digest):
+        """dump()로 저장한 파일 -> ReadingOverrides. 해시가 다르거나 형식이 맞지 않으면 ValueError"""
+        state = json.load(f)
+        if not isinstance(state, dict) or state.get('digest') != digest:
+            raise ValueError('digest mismatch')
+        overrides = cls.__new__(cls)
+        overrides.digest = digest
+        overrides.entries = state['entries']
+        overrides.goto, overrides.fail = state['goto'], state['fail']
+        overrides.length, overrides.output = state['length'], state['output']
+        states = len(overrides.goto)
+        if not (isinstance(overrides.entries, dict) and len(overrides.fail) == len(overrides.length) == len(overrides.output) == states
+                and all(isinstance(targets, dict) for targets in overrides.goto)):
+            raise ValueError('broken automaton')
+        return overrides
+
+def load_overrides(path, cache_dir=None):
+    """
+    덮어쓰기 사전 파일을 읽어 ReadingOverrides를 반환. (읽을 수 없으면 OSError, UnicodeDecodeError)
+    cache_dir가 있으면 파일 내용의 해시로 컴파일 결과(JSON)를 찾아 쓰고, 없으면 만들어서 저장한다.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.blake2b(data + f'\x00{OVERRIDES_FORMAT_VERSION}'.encode(), digest_size=12).hexdigest()
+    cache_path = os.path.join(cache_dir, f'overrides-{digest}.json') if cache_dir else None
+
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, encoding='utf-8') as f:
+                return ReadingOverrides.load(f, digest)
+        except (OSError, ValueError, KeyError, TypeError):
+            pass # 깨진 캐시는 다시 만듦
+
+    overrides = ReadingOverrides(parse_overrides(data.decode('utf-8')), digest)
+    if cache_path:
+        # 다른 프로세스가 반쯤 쓴 파일을 읽지 않도록 임시 파일에 쓰고 바꿈. 저장하지 못해도 이번 실행에는 지장 없음
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            handle, temp_path = tempfile.mkstemp(suffix='.json', dir=cache_dir)
+            with os.fdopen(handle, 'w', encoding='utf-8') as f:
+                overrides.dump(f)
+            os.replace(temp_path, cache_path)
+        except OSError:
+            pass
+    return overrides
@@ -0,0 +1,84 @@
+import json, threading, time
+
+from contextlib import contextmanager, nullcontext
+
+# 단계별 시간 측정 --------------------------------------------------------------------
+# 실행이 느릴 때 어디에서 시간이 드는지(파일 읽기, 형태소 분석, segment_japanese_text, 셀 쓰기, 저장 등) 보기 위한 계측.
+# 켜지 않으면(current()가 None) 각 지점에서 None 확인 한 번만 하고 넘어간다.
+# 계측 대상은 스레드마다 따로 정하므로, 한 프로세스에서 여러 작업이 동시에 돌아도 서로의 기록에 섞이지 않는다.
+#
+#   with profiling(StageProfiler()) as profiler:
+#       ... 작업 ...
+#   print(profiler.summary())
+#   profiler.write_trace('trace.json')   # chrome://tracing, Perfetto에서 열 수 있는 형식
+
+class StageProfiler:
+    """
+    단계 이름마다 걸린 시간과 호출 횟수를 모은다.
+
+    stage(name) : with 블록 하나를 한 번으로 기록 (트레이스에도 구간으로 남김)
+    add(name, seconds) : 셀 단위처럼 자주 부르는 곳에서 시간만 더함 (트레이스에는 남기지 않음)
+    """
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.totals = {} # 단계 이름 -> [걸린 시간(초), 호출 횟수] (처음 기록된 순서 유지)
+        self.events = [] # (단계 이름, 시작 시각, 걸린 시간, 스레드) -- 트레이스용
+        self._lock = threading.Lock() # 여러 파일을 스레드로 동시에 읽을 때도 합계가 어긋나지 않도록
+
+    def add(self, name, seconds, calls=1):
+        with self._lock:
+            total = self.totals.get(name)
+            if total is None:
+                self.totals[name] = [seconds, calls]
+            else:
+                total[0] += seconds
+                total[1] += calls
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.add(name, seconds)
+            self.events.append((name, start, seconds, threading.get_ident()))
+
+    def summary(self):
+        lines = ['処理時間の内訳']
+        for name, (seconds, calls) in self.totals.items():
+            lines.append(f'  {name}：{seconds:.3f}秒（{calls}回）')
+        return '\n'.join(lines)
+
+    def to_dict(self):
+        # Chrome Trace Event 형식 (시간 단위: 마이크로초) + 단계별 합계
+        events = [{'name': name, 'ph': 'X', 'pid': 0, 'tid': thread,
+                   'ts': round((start - self.origin) * 1e6, 1), 'dur': round(seconds * 1e6, 1)}
+                  for name, start, seconds, thread in self.events]
+        totals = {name: {'seconds': round(seconds, 6), 'calls': calls} for name, (seconds, calls) in self.totals.items()}
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'stages': totals}
+
+    def write_trace(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+_state = threading.local() # 스레드마다 지금 계측 중인 StageProfiler (profiler 속성)
+
+def current():
+    # 현재 스레드에서 계측 중인 StageProfiler (없으면 None)
+    return getattr(_state, 'profiler', None)
+
+@contextmanager
+def profiling(profiler):
+    # 현재 스레드에서 이 블록 안에서만 profiler로 기록 (None이면 계측하지 않음)
+    previous = current()
+    _state.profiler = profiler
+    try:
+        yield profiler
+    finally:
+        _state.profiler = previous
+
+def stage(name):
+    # 계측 중이면 profiler.stage(name), 아니면 아무것도 하지 않는 with 블록
+    profiler = current()
+    return nullcontext() if profiler is None else profiler.stage(name)